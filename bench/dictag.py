@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""measure the throughput (sentences/second) of fnldictag using stand-in taggers"""
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+
+from argparse import ArgumentParser
+from subprocess import Popen, DEVNULL
+from tempfile import mkdtemp
+from time import time
+
+__author__ = 'Florian Leitner'
+__version__ = '1.0'
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+STANDINS = os.path.join(BENCH, 'bin')
+DICTAG = os.path.join(ROOT, 'scripts', 'fnldictag.py')
+
+MODES = {'a': 'align', 't': 'tabular', 'n': 'normalize'}
+QUALIFIERS = ('official_symbol', 'symbol', 'name', 'synonym')
+GENES = ('p53', 'TP53', 'BRCA1', 'NF-kappaB', 'IL-2', 'TNF-alpha', 'CD4',
+         'MAPK1', 'c-Jun', 'Smad3', 'HER2', 'EGFR', 'p21', 'Cdc42', 'IFN-gamma')
+WORDS = ('the', 'of', 'in', 'and', 'cells', 'expression', 'protein', 'was',
+         'induced', 'by', 'binding', 'to', 'activity', 'we', 'found', 'that',
+         'levels', 'increased', 'mutant', 'human', 'receptor', "doesn't",
+         'kinase', 'pathway', 'signaling', 'a', 'with', 'in vitro', 'β-cells',
+         'not', 'these', 'results', 'suggest', 'role', 'novel', '"active"')
+
+
+def sentences(n, seed=42) -> iter:
+    """Yield *n* random, but reproducible, biomedical-looking sentences."""
+    rng = random.Random(seed)
+
+    for dummy in range(n):
+        words = [rng.choice(GENES) if rng.random() < 0.15 else rng.choice(WORDS)
+                 for dummy in range(rng.randint(8, 40))]
+        words[0] = words[0][0].upper() + words[0][1:]
+        yield '{} ({}).'.format(' '.join(words[:-2]), ', '.join(words[-2:]))
+
+
+def prepare(workdir, n, seed) -> dict:
+    """
+    Set up a fake GENIA tagger directory, a model, a dictionary, and the
+    qualifier ranks in the *workdir* and write *n* input sentences.
+
+    :return: a dict of the paths of all files
+    """
+    genia = os.path.join(workdir, 'geniatagger')
+    os.makedirs(os.path.join(genia, 'morphdic'))
+    shutil.copy(os.path.join(STANDINS, 'geniatagger'), genia)
+    files = {'genia': genia}
+
+    for name in ('model', 'qranks', 'dictionary', 'input'):
+        files[name] = os.path.join(workdir, name)
+
+    with open(files['model'], 'w') as model:
+        model.write('stand-in model\n')
+
+    with open(files['qranks'], 'w') as qranks:
+        qranks.write('\n'.join(QUALIFIERS))
+        qranks.write('\n')
+
+    with open(files['dictionary'], 'w') as dictionary:
+        for idx, gene in enumerate(GENES):
+            print('gene:{}'.format(idx), 10 * idx + 1, QUALIFIERS[idx % len(QUALIFIERS)],
+                  gene, sep='\t', file=dictionary)
+
+    with open(files['input'], 'w') as input:
+        for idx, text in enumerate(sentences(n, seed)):
+            print(idx, text, sep='\t', file=input)
+
+    return files
+
+
+def shard(path, jobs) -> list:
+    """Split the lines of the file at *path* into *jobs* files of equal size."""
+    with open(path) as stream:
+        lines = stream.readlines()
+
+    size = -(-len(lines) // jobs)
+    shards = []
+
+    for idx in range(jobs):
+        shards.append('{}.{}'.format(path, idx))
+
+        with open(shards[-1], 'w') as out:
+            out.writelines(lines[idx * size:(idx + 1) * size])
+
+    return shards
+
+
+def run(files, mode, jobs, env, extra_args) -> float:
+    """
+    Run *jobs* concurrent fnldictag processes in the given output *mode*,
+    each on its own shard of the input; return the wall-clock time.
+    """
+    procs = []
+    start = time()
+
+    for path in shard(files['input'], jobs):
+        cmd = [sys.executable, DICTAG, '-' + mode, '-q', '-d', files['dictionary']]
+        cmd.extend(extra_args)
+        cmd.extend([files['qranks'], files['model'], path])
+        logging.debug('executing %s', ' '.join(cmd))
+        procs.append(Popen(cmd, env=env, stdout=DEVNULL))
+
+    for p in procs:
+        if p.wait():
+            raise RuntimeError('fnldictag exited with status %i' % p.returncode)
+
+    return time() - start
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.set_defaults(loglevel=logging.WARNING)
+    parser.add_argument(
+        '-n', '--sentences', metavar='N', type=int, default=1000,
+        help='number of input sentences [%(default)s]'
+    )
+    parser.add_argument(
+        '-j', '--jobs', metavar='J', type=int, nargs='+', default=[1, 2, 4],
+        help='numbers of concurrent fnldictag processes to measure [%(default)s]'
+    )
+    parser.add_argument(
+        '-m', '--modes', metavar='M', nargs='+', choices=sorted(MODES),
+        default=sorted(MODES), help='output modes to measure [%(default)s]'
+    )
+    parser.add_argument(
+        '-r', '--repeat', metavar='R', type=int, default=1,
+        help='measurements per configuration; the fastest is reported [%(default)s]'
+    )
+    parser.add_argument(
+        '--latency', metavar='SECONDS', type=float, default=0.0,
+        help='per-token latency of the stand-in taggers [%(default)s]'
+    )
+    parser.add_argument(
+        '--startup', metavar='SECONDS', type=float, default=0.0,
+        help='startup delay of the stand-in taggers [%(default)s]'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=42, help='random seed [%(default)s]'
+    )
+    parser.add_argument(
+        'args', metavar='ARG', nargs='*',
+        help='additional fnldictag options (after a "--")'
+    )
+    parser.add_argument(
+        '--debug', action='store_const', const=logging.DEBUG,
+        dest='loglevel', help='debug log level (default: warn)'
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=args.loglevel, format='%(levelname)s: %(message)s')
+
+    workdir = mkdtemp(prefix='fnlbench-')
+    files = prepare(workdir, args.sentences, args.seed)
+    env = dict(os.environ)
+    env['PATH'] = os.pathsep.join([STANDINS, env.get('PATH', '')])
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(ROOT, 'src'), env.get('PYTHONPATH', '')])
+    env['GENIATAGGER_DIR'] = files['genia']
+    env['FNL_STANDIN_LATENCY'] = str(args.latency)
+    env['FNL_STANDIN_STARTUP'] = str(args.startup)
+
+    try:
+        for mode in args.modes:
+            for jobs in args.jobs:
+                seconds = min(run(files, mode, jobs, env, args.args)
+                              for dummy in range(args.repeat))
+                print(json.dumps({
+                    'benchmark': 'fnldictag',
+                    'mode': MODES[mode],
+                    'jobs': jobs,
+                    'sentences': args.sentences,
+                    'latency': args.latency,
+                    'seconds': round(seconds, 3),
+                    'sentences_per_second': round(args.sentences / seconds, 1),
+                }))
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(workdir)
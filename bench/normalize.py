@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""measure the per-sentence cost of the text normalization steps"""
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import sys
+
+from argparse import ArgumentParser
+from io import BytesIO
+from timeit import timeit
+from unicodedata import normalize
+from unidecode import unidecode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from dictag import sentences
+from fnl.nlp.strtok import WordTokenizer
+from fnl.text.normalize import Ascii, AsciiProjection, ExpandGreek, NFC
+from fnl.text.symbols import LATIN
+
+__author__ = 'Florian Leitner'
+__version__ = '1.0'
+
+
+def greekBefore(texts):
+    # as in TextAnalytics.analyze
+    for text in texts:
+        ''.join(LATIN[c] if c in LATIN else c for c in text)
+
+
+def greekAfter(texts):
+    for text in texts:
+        ExpandGreek(text)
+
+
+def asciiBefore(token_lists):
+    # as in NerSuite.send
+    stdin = BytesIO()
+
+    for tokens in token_lists:
+        for t in tokens:
+            stdin.write("0\t{}\t".format(len(t)).encode('ASCII'))
+            stdin.write(unidecode('\t'.join((t, t, 'NN', 'B-NP'))).encode('ASCII'))
+            stdin.write("\n".encode('ASCII'))
+
+        stdin.write("\n".encode('ASCII'))
+
+
+def asciiAfter(token_lists):
+    stdin = BytesIO()
+
+    for tokens in token_lists:
+        lines = ["0\t{}\t{}\n".format(len(t), '\t'.join((t, t, 'NN', 'B-NP'))) for t in tokens]
+        lines.append("\n")
+        stdin.write(Ascii(''.join(lines)).encode('ASCII'))
+
+
+def projectBefore(token_lists):
+    # as in TextAnalytics._alignToTokens
+    for tokens in token_lists:
+        for t in tokens:
+            unidecode(t)
+
+
+def projectAfter(token_lists):
+    for tokens in token_lists:
+        for t in tokens:
+            AsciiProjection(t)
+
+
+def nfcBefore(texts):
+    # as in HtmlExtractor
+    for text in texts:
+        normalize('NFC', text)
+
+
+def nfcAfter(texts):
+    for text in texts:
+        NFC(text)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--sentences', metavar='N', type=int, default=1000,
+        help='number of sentences [%(default)s]'
+    )
+    parser.add_argument(
+        '-r', '--repeat', metavar='R', type=int, default=5,
+        help='passes over all sentences per measurement [%(default)s]'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=42, help='random seed [%(default)s]'
+    )
+    args = parser.parse_args()
+
+    texts = list(sentences(args.sentences, args.seed))
+    tokenizer = WordTokenizer(skipTags={'space'}, skipOrthos={'e'})
+    token_lists = [list(tokenizer.split(ExpandGreek(t))) for t in texts]
+    steps = [
+        ('greek', greekBefore, greekAfter, texts),
+        ('ascii', asciiBefore, asciiAfter, token_lists),
+        ('project', projectBefore, projectAfter, token_lists),
+        ('nfc', nfcBefore, nfcAfter, texts),
+    ]
+
+    for name, before, after, data in steps:
+        times = [timeit(lambda: fun(data), number=args.repeat) / (args.repeat * len(data))
+                 for fun in (before, after)]
+        print(json.dumps({
+            'benchmark': 'normalize',
+            'step': name,
+            'sentences': len(data),
+            'before_us': round(times[0] * 1e6, 2),
+            'after_us': round(times[1] * 1e6, 2),
+            'speedup': round(times[0] / times[1], 1),
+        }))
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+"""measure the time and peak memory of the fnl.stat.textclass pipeline steps"""
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tracemalloc
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from subprocess import check_output, CalledProcessError, DEVNULL
+from tempfile import mkdtemp
+from time import perf_counter
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from sklearn.externals import joblib
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from fnl.stat.textclass import \
+    asDict, Classify, Data, HashingMinFreqVectorizer, MinFreqDictVectorizer, \
+    Predict, PredictStream, Report
+from fnl.text.sentence import SentenceParser
+
+__author__ = 'Florian Leitner'
+__version__ = '1.0'
+
+FORMATS = ('plain', 'bio')
+CLASSIFIERS = {
+    'svm': LinearSVC,
+    'maxent': LogisticRegression,
+    'sgd': SGDClassifier,
+    'bernoulli': BernoulliNB,
+}
+GENES = ('p53', 'TP53', 'BRCA1', 'NF-kappaB', 'IL-2', 'TNF-alpha', 'CD4',
+         'MAPK1', 'c-Jun', 'Smad3', 'HER2', 'EGFR', 'p21', 'Cdc42', 'IFN-gamma')
+WORDS = ('the', 'of', 'in', 'and', 'cells', 'expression', 'protein', 'was',
+         'induced', 'by', 'binding', 'to', 'activity', 'we', 'found', 'that',
+         'levels', 'increased', 'mutant', 'human', 'receptor', 'kinase',
+         'pathway', 'signaling', 'a', 'with', 'not', 'these', 'results',
+         'suggest', 'role', 'novel', 'tissue', 'mice', 'patients', 'observed')
+# words that (weakly) signal the positive group
+TRIGGERS = ('binds', 'activates', 'regulates', 'promoter', 'transcription',
+            'induces', 'represses', 'target')
+POS_TAGS = {'the': 'DT', 'a': 'DT', 'of': 'IN', 'in': 'IN', 'by': 'IN', 'to': 'TO',
+            'with': 'IN', 'and': 'CC', 'was': 'VBD', 'we': 'PRP', 'that': 'IN',
+            'not': 'RB', 'these': 'DT'}
+
+
+def tokens(rng, positive) -> list:
+    """Return a random token list; positive instances use trigger words more often."""
+    triggers = 0.08 if positive else 0.02
+    words = []
+
+    for dummy in range(rng.randint(8, 40)):
+        r = rng.random()
+
+        if r < 0.12:
+            words.append(rng.choice(GENES))
+        elif r < 0.12 + triggers:
+            words.append(rng.choice(TRIGGERS))
+        else:
+            words.append(rng.choice(WORDS))
+
+    return words
+
+
+def plainText(n, seed, positive) -> iter:
+    """Yield *n* reproducible, ID-prefixed plain-text lines."""
+    rng = random.Random(seed)
+
+    for idx in range(n):
+        yield '{}\t{}\n'.format(idx, ' '.join(tokens(rng, positive)))
+
+
+def bioNer(n, seed, positive) -> iter:
+    """Yield *n* reproducible BIO-NER sentences with two ID columns."""
+    rng = random.Random(seed)
+
+    for idx in range(n):
+        words = tokens(rng, positive)
+        genes = [i for i, w in enumerate(words) if w in GENES]
+        factor = genes[0] if genes else -1
+        target = genes[-1] if len(genes) > 1 else -1
+        lines = []
+
+        for i, w in enumerate(words):
+            gene = w in GENES
+            pos = 'NN' if gene else POS_TAGS.get(w, 'NN' if i % 3 else 'VBZ')
+            lines.append('\t'.join((
+                'doc{}'.format(idx // 10), str(idx % 10), w, w.lower(), pos,
+                'B-NP' if pos in ('DT', 'NN') else 'O',
+                'B-gene' if gene else 'O',
+                'B-FACTOR' if i == factor else 'O',
+                'B-TARGET' if i == target else 'O',
+            )))
+
+        yield '\n'.join(lines) + '\n\n'
+
+
+def prepare(workdir, fmt, n, seed) -> list:
+    """
+    Write a positive (a quarter of *n*) and a negative group file of *n*
+    instances in total and in the given *fmt* to the *workdir*.
+
+    :return: the paths of the group files
+    """
+    generate = plainText if fmt == 'plain' else bioNer
+    paths = []
+
+    for name, size, positive in (('pos', n // 4, True), ('neg', n - n // 4, False)):
+        paths.append(os.path.join(workdir, '{}.{}'.format(name, fmt)))
+
+        with open(paths[-1], 'w') as out:
+            out.writelines(generate(size, seed + positive, positive))
+
+    return paths
+
+
+def measure(fun, repeat, memory) -> (float, float):
+    """
+    Call *fun* *repeat* times and return the fastest time in seconds and,
+    if *memory* is set, the peak memory (MB) of an extra, traced call.
+
+    Only allocations in this process are traced, not in worker processes.
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        seconds = []
+
+        for dummy in range(repeat):
+            start = perf_counter()
+            fun()
+            seconds.append(perf_counter() - start)
+
+        peak = None
+
+        if memory:
+            tracemalloc.start()
+
+            try:
+                fun()
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+            finally:
+                tracemalloc.stop()
+
+    return min(seconds), peak
+
+
+def loadData(paths, fmt) -> Data:
+    files = [open(path) for path in paths]
+
+    try:
+        return Data(*files, columns=2 if fmt == 'bio' else None)
+    finally:
+        for f in files:
+            f.close()
+
+
+def toDicts(paths):
+    # parse the sentences up front, so only the conversion is measured
+    sentences = []
+
+    for path in paths:
+        with open(path) as f:
+            sentences.extend(s for dummy, s in SentenceParser(f, ('FACTOR', 'TARGET'),
+                                                              id_columns=2))
+
+    return lambda: [asDict(s) for s in sentences]
+
+
+def vectorizers(fmt) -> list:
+    if fmt == 'plain':
+        return [('count', CountVectorizer),
+                ('hashing', lambda: HashingMinFreqVectorizer(vectorizer=CountVectorizer()))]
+    else:
+        return [('dict', MinFreqDictVectorizer),
+                ('hashing', HashingMinFreqVectorizer)]
+
+
+def steps(workdir, paths, fmt, args) -> iter:
+    """Yield the (step, variant, function) tuples to measure for a *fmt*."""
+    yield 'data', 'cpus={}'.format(os.cpu_count()), lambda: loadData(paths, fmt)
+
+    if fmt == 'bio':
+        yield 'asdict', 'ngrams=2', toDicts(paths)
+
+    data = loadData(paths, fmt)
+    report = Report(False, 0, 0, False, False, False, args.folds)
+    vectorizer = None
+
+    for name, make in vectorizers(fmt):
+        yield 'vectorize', name, lambda: data.extract(make())
+        vectorizer = make()
+        data.extract(vectorizer)
+
+        for jobs in args.jobs:
+            classifier = CLASSIFIERS[args.classifier]()
+            yield 'classify', '{} jobs={}'.format(name, jobs), \
+                lambda: Classify(data, classifier, report, n_jobs=jobs)
+
+    # predict with the last vectorizer and a classifier fitted on all data
+    classifier = CLASSIFIERS[args.classifier]().fit(data.features, data.labels)
+    pipeline = Pipeline([('extract', vectorizer), ('classifier', classifier)])
+    model = os.path.join(workdir, 'model.pkl')
+    joblib.dump(pipeline, model)
+    yield 'predict', 'batch', lambda: Predict(data, pipeline)
+
+    for jobs in args.jobs:
+        yield 'predict', 'stream jobs={}'.format(jobs), lambda: PredictStream(
+            paths, model, output=sys.stdout, chunk_size=1000, n_jobs=jobs,
+            columns=2 if fmt == 'bio' else None
+        )
+
+
+def commit() -> str:
+    """Return the current (short) git commit ID, or ``None`` outside a repository."""
+    try:
+        return check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                            stderr=DEVNULL).decode('ascii').strip()
+    except (CalledProcessError, OSError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.set_defaults(loglevel=logging.WARNING)
+    parser.add_argument(
+        '-n', '--instances', metavar='N', type=int, default=10000,
+        help='number of instances over both groups [%(default)s]'
+    )
+    parser.add_argument(
+        '-f', '--formats', metavar='F', nargs='+', choices=FORMATS,
+        default=list(FORMATS), help='input formats to measure [%(default)s]'
+    )
+    parser.add_argument(
+        '-c', '--classifier', choices=sorted(CLASSIFIERS), default='svm',
+        help='classifier to measure [%(default)s]'
+    )
+    parser.add_argument(
+        '-j', '--jobs', metavar='J', type=int, nargs='+', default=[1],
+        help='numbers of parallel jobs to measure for classification '
+             'and streamed prediction [%(default)s]'
+    )
+    parser.add_argument(
+        '--folds', metavar='K', type=int, default=5,
+        help='cross-validation folds [%(default)s]'
+    )
+    parser.add_argument(
+        '-r', '--repeat', metavar='R', type=int, default=1,
+        help='measurements per step; the fastest is reported [%(default)s]'
+    )
+    parser.add_argument(
+        '--no-memory', action='store_true',
+        help='skip the (slow) traced run that measures peak memory'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=42, help='random seed [%(default)s]'
+    )
+    parser.add_argument(
+        '--debug', action='store_const', const=logging.DEBUG,
+        dest='loglevel', help='debug log level (default: warn)'
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=args.loglevel, format='%(levelname)s: %(message)s')
+
+    workdir = mkdtemp(prefix='fnlbench-')
+    revision = commit()
+
+    try:
+        for fmt in args.formats:
+            paths = prepare(workdir, fmt, args.instances, args.seed)
+
+            for step, variant, fun in steps(workdir, paths, fmt, args):
+                logging.debug('measuring %s %s on %s input', step, variant, fmt)
+                seconds, peak = measure(fun, args.repeat, not args.no_memory)
+                print(json.dumps({
+                    'benchmark': 'textclass',
+                    'commit': revision,
+                    'format': fmt,
+                    'step': step,
+                    'variant': variant,
+                    'classifier': args.classifier,
+                    'instances': args.instances,
+                    'seconds': round(seconds, 3),
+                    'instances_per_second': round(args.instances / seconds, 1),
+                    'peak_mb': None if peak is None else round(peak, 1),
+                }))
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(workdir)
@@ -23,7 +23,7 @@ import warnings
 from sklearn.externals import joblib
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.feature_extraction.text import TfidfTransformer
-from sklearn.linear_model import RidgeClassifier, LogisticRegression
+from sklearn.linear_model import RidgeClassifier, LogisticRegression, SGDClassifier
 from sklearn.naive_bayes import BernoulliNB
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
@@ -33,8 +33,10 @@ from sklearn.feature_selection import chi2
 from sklearn.feature_selection import f_classif
 
 from fnl.stat.textclass import \
-    Classify, Data, GridSearch, Predict, \
-    PrintParams, Report, STOP_WORDS, PrintFeatures, MinFreqDictVectorizer
+    CachedData, Classify, Data, GridSearch, IncrementalClassify, Predict, PredictStream, \
+    PrintParams, Report, STOP_WORDS, PrintFeatures, MinFreqDictVectorizer, \
+    HashingMinFreqVectorizer
+from fnl.stat.scorer import ExportLinearModel
 
 
 __author__ = "Florian Leitner <florian.leitner@gmail.com>"
@@ -49,7 +51,7 @@ parser = argparse.ArgumentParser(
 )
 
 parser.add_argument("classifier", metavar='CLASS',
-                    help="choices: ridge, svm, maxent, multinomial, bernoulli, "
+                    help="choices: ridge, svm, maxent, sgd, multinomial, bernoulli, "
                     "or load a saved model FILE")
 parser.add_argument("groups", metavar='GROUP', nargs='+', # using type=open a BadIdeaTM in 3.4...
                     help="file containing all the instances "
@@ -67,8 +69,30 @@ parser.add_argument("--feature-grid-search", action='store_true',
                     help="run a grid search for the optimal feature parameters")
 parser.add_argument("--classifier-grid-search", action='store_true',
                     help="run a grid search for the optimal classifier parameters")
+parser.add_argument("--grid-cache", metavar='DIR', type=str,
+                    help="keep the features extracted during grid searches "
+                    "in DIR and reuse them in later searches")
+parser.add_argument("--feature-cache", metavar='DIR', type=str,
+                    help="keep the extracted features in DIR and reload them "
+                    "in later runs on the same input with the same feature "
+                    "settings (not used for grid searches and predictions)")
 parser.add_argument("--save", metavar='FILE', type=str,
                     help="store the fitted classifier pipeline on disk")
+parser.add_argument("--export", metavar='DIR', type=str,
+                    help="export the fitted (linear) classifier pipeline to DIR "
+                    "as a compact model for fnl.stat.scorer.LinearScorer")
+parser.add_argument("--out-of-core", action='store_true',
+                    help="stream the instances in mini-batches through a hashing "
+                    "vectorizer into an incremental classifier (sgd, multinomial, "
+                    "or bernoulli) instead of loading them all into memory; "
+                    "CV folds are assigned by hashing the instance IDs")
+parser.add_argument("--batch-size", metavar='N', default=1000, type=int,
+                    help="number of instances per mini-batch in out-of-core "
+                    "and streaming mode; defaults to 1000")
+parser.add_argument("--stream", action='store_true',
+                    help="predict with a saved CLASS pipeline by streaming the "
+                    "instances in mini-batches, using --jobs worker processes, "
+                    "instead of loading them all into memory")
 
 pt_feats = parser.add_argument_group('feature generation from plain-text files')
 pt_feats.add_argument("--token-pattern", default=r"(?u)\b\w\w+\b",
@@ -93,6 +117,11 @@ selects.add_argument("--cutoff", default=3, type=int,
                      help="min. doc. frequency required to use a feature; "
                      "value must be a positive integer; defaults to 3 "
                      "(only use features seen at least in 3 documents)")
+selects.add_argument("--hash-features", metavar='BITS', default=0, type=int,
+                     help="hash the features to 2^BITS columns instead of "
+                     "keeping a vocabulary in memory; the cutoff is then "
+                     "approximated with a count-min sketch of at most 2^22 "
+                     "counters per row; default: off")
 selects.add_argument("--max-fpr", metavar='FPR', default=1.0, type=float,
                      help="select features having a min. FPR in (0,1]; "
                      "default 1.0 - use all features")
@@ -119,6 +148,10 @@ evrep.add_argument("--classification-reports", action='store_true',
 evrep.add_argument("--folds", metavar='N', default=5, type=int,
                    help="do N-fold cross-validation for internal evaluations; "
                    "N must be an integer > 1; defaults to 5")
+evrep.add_argument("--jobs", metavar='N', default=1, type=int,
+                   help="evaluate N cross-validation folds (or predict N "
+                   "mini-batches with --stream) in parallel; "
+                   "0 for one job per CPU; defaults to 1")
 
 # Argument Parsing
 # ================
@@ -128,6 +161,9 @@ args = parser.parse_args()
 if 2 > args.folds:
     parser.error("the CV fold value must be > 1")
 
+if 0 > args.jobs:
+    parser.error("the number of jobs must not be negative")
+
 if 1 > args.cutoff:
     parser.error("the cutoff value must be positive")
 
@@ -137,6 +173,34 @@ if 1 > args.n_grams:
 if not (0.0 < args.max_fpr <= 1.0):
     parser.error("max. FPR must be in (0,1] range")
 
+if not (0 <= args.hash_features <= 31):
+    parser.error("the number of hash bits must be in [0,31] (0: off)")
+
+if args.export and (args.classifier not in ('ridge', 'svm', 'maxent', 'sgd') or
+                    args.feature_grid_search or args.classifier_grid_search or
+                    args.tfidf or args.hash_features or args.out_of_core):
+    parser.error("only linear classifiers without grid searches, TF-IDF, "
+                 "or hashed features can be exported")
+
+out_of_core = args.out_of_core and not os.path.isfile(args.classifier)
+stream = args.stream and os.path.isfile(args.classifier)
+feature_cache = args.feature_cache and not (
+    out_of_core or os.path.isfile(args.classifier) or
+    args.feature_grid_search or args.classifier_grid_search
+)
+
+if (out_of_core or stream) and 1 > args.batch_size:
+    parser.error("the batch size must be positive")
+
+if out_of_core:
+    if args.feature_grid_search or args.classifier_grid_search or args.tfidf or \
+            args.max_fpr != 1.0 or args.num_features:
+        parser.error("grid searches, TF-IDF, and feature selection "
+                     "are not available in out-of-core mode")
+
+    # only a stateless vectorizer can be used on streamed instances
+    args.hash_features = args.hash_features or 20
+
 
 patterns = None
 
@@ -152,9 +216,12 @@ for path in args.groups:
     except Exception as e:
         parser.error('failed to open "{}": {}'.format(path, e))
 
-data = Data(*filehandles,
-            columns=args.column, ngrams=args.n_grams,  # BIO-NER input
-            decap=args.decapitalize, patterns=patterns, mask=args.mask)  # plain-text input
+data = None
+
+if not out_of_core and not stream and not feature_cache:
+    data = Data(*filehandles,
+                columns=args.column, ngrams=args.n_grams,  # BIO-NER input
+                decap=args.decapitalize, patterns=patterns, mask=args.mask)  # plain-text input
 
 for fh in filehandles:
     fh.close()
@@ -195,6 +262,13 @@ elif args.classifier == 'maxent':
         parameters['classifier__intercept_scaling'] = [10., 5., 1., .5]
         parameters['classifier__penalty'] = ['l1', 'l2']
         parameters['classifier__tol'] = [.1, .01, 1e-4, 1e-8]
+elif args.classifier == 'sgd':
+    classifier = SGDClassifier()
+
+    if args.classifier_grid_search:
+        parameters['classifier__alpha'] = [1e-3, 1e-4, 1e-5, 1e-6]
+        parameters['classifier__loss'] = ['hinge', 'log', 'modified_huber']
+        parameters['classifier__penalty'] = ['l1', 'l2', 'elasticnet']
 elif args.classifier == 'multinomial':
     classifier = MultinomialNB()
 
@@ -212,13 +286,23 @@ elif os.path.isfile(args.classifier):
 
     # Prediction [with an existing pipeline]
     # ==========
-    Predict(data, joblib.load(args.classifier))
+    if stream:
+        PredictStream(args.groups, args.classifier, chunk_size=args.batch_size,
+                      n_jobs=args.jobs or None,
+                      columns=args.column, ngrams=args.n_grams,  # BIO-NER input
+                      decap=args.decapitalize, patterns=patterns, mask=args.mask)
+    else:
+        Predict(data, joblib.load(args.classifier))
+
     import sys
     sys.exit(0)
 
 else:
     parser.error("unrecognized classifier '%s'" % args.classifier)
 
+if out_of_core and not hasattr(classifier, 'partial_fit'):
+    parser.error("classifier '%s' cannot be trained incrementally" % args.classifier)
+
 report = Report(args.parameters, args.top, args.worst,
                 args.false_negatives, args.false_positives,
                 args.classification_reports, args.folds)
@@ -249,13 +333,31 @@ else:
     if args.feature_grid_search:
         parameters['extract__min_freq'] = [1, 2, 3, 5]
 
+if args.hash_features:
+    vec = HashingMinFreqVectorizer(n_features=1 << args.hash_features,
+                                   min_freq=args.cutoff,
+                                   vectorizer=vec if args.column is None else None)
+
+    if args.feature_grid_search:
+        # the text options are set on the wrapped CountVectorizer
+        for name in list(parameters):
+            if name == 'extract__min_df':
+                parameters['extract__min_freq'] = parameters.pop(name)
+            elif name.startswith('extract__') and name != 'extract__min_freq':
+                parameters[name.replace('extract__', 'extract__vectorizer__')] = \
+                    parameters.pop(name)
 
 pipeline.append(('extract', vec))
 
 if report.parameters:
     PrintParams(vec, report)
 
-if not grid_search:
+if feature_cache:
+    data, vec = CachedData(args.feature_cache, args.groups, vec,
+                           columns=args.column, ngrams=args.n_grams,  # BIO-NER input
+                           decap=args.decapitalize, patterns=patterns, mask=args.mask)
+    pipeline[-1] = ('extract', vec)
+elif not grid_search and not out_of_core:
     data.extract(vec)
 
 # Feature Transformation
@@ -326,7 +428,7 @@ elif args.num_features != 0:
     elif args.feature_grid_search:
         parameters['select__k'] = [1e2, 1e3, 1e4, 1e5]
 
-if not grid_search and args.features:
+if not grid_search and not out_of_core and args.features:
     print('\ngroup sizes:', ', '.join(map(str, data.sizes)))
     print('extracted {} features from {} instances'.format(
         data.n_features, data.n_instances
@@ -346,13 +448,23 @@ if grid_search:
     print('\n'.join(
         '{}: {}'.format(k, repr(v)) for k, v in parameters.items()
     ))
-    GridSearch(data, pipeline, parameters, report)
+    GridSearch(data, pipeline, parameters, report, cache=args.grid_cache)
+elif out_of_core:
+    classifier = IncrementalClassify(
+        args.groups, vec, classifier, report, args.batch_size,
+        columns=args.column, ngrams=args.n_grams,  # BIO-NER input
+        decap=args.decapitalize, patterns=patterns, mask=args.mask  # plain-text input
+    )
+    pipeline.steps[-1] = ('classifier', classifier)
 else:
-    Classify(data, classifier, report)
+    Classify(data, classifier, report, n_jobs=args.jobs or -1)
 
 if args.save:
-    if (report.top or report.worst):
+    if (report.top or report.worst) and not out_of_core:
         print()
         PrintFeatures(classifier, data, report)
 
-    joblib.dump(pipeline, args.save)
\ No newline at end of file
+    joblib.dump(pipeline, args.save)
+
+if args.export:
+    ExportLinearModel(pipeline, args.export)
\ No newline at end of file
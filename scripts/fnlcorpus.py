@@ -31,7 +31,8 @@ ANNOTATORS = {
     'genia': 'http://www-tsujii.is.s.u-tokyo.ac.jp/GENIA'
 }
 
-def read(encoding, update, reader, annotator, couchdb_url, db_name, file_name):
+def read(encoding, update, reader, annotator, couchdb_url, db_name, file_name,
+         jobs=None):
     #noinspection PyBroadException
     try:
         couch = Server(couchdb_url)
@@ -41,7 +42,12 @@ def read(encoding, update, reader, annotator, couchdb_url, db_name, file_name):
             basename = os.path.basename(file_name)
             logging.info("parsing %s", basename)
 
-            for article_id, article in reader.toText(stream):
+            if jobs:
+                articles = reader.toTextParallel(file_name, jobs)
+            else:
+                articles = reader.toText(stream)
+
+            for article_id, article in articles:
                 json = article.toJson()
                 json['tags'] = article.tagsAsDict()
                 json['annotator'] = annotator
@@ -58,12 +64,14 @@ def read(encoding, update, reader, annotator, couchdb_url, db_name, file_name):
 
 def main(corpus_files, update:bool=False, corpus:str=DEFAULT_CORPUS,
          encoding:str=DEFAULT_ENCODING, couchdb_url:str=COUCHDB_URL,
-         database:str=DEFAULT_CORPUS):
+         database:str=DEFAULT_CORPUS, jobs:int=None):
     """
     :param corpus_files: A list of file names to parse.
     :param update:
     :param corpus: The name of the corpus type to parse.
     :param encoding: The encoding used by the corpus files.
+    :param jobs: Parse the articles of each file in this many processes
+                 (one file after the other) instead of one process per file.
     """
     try:
         fnl = __import__("fnl.nlp.{}.corpus".format(corpus), globals())
@@ -71,12 +79,18 @@ def main(corpus_files, update:bool=False, corpus:str=DEFAULT_CORPUS,
     except ImportError:
         raise ValueError("no corpus reader for {}".format(corpus))
 
-    pool = Pool()
-    read_file = partial(read, encoding, update, C.CorpusReader(),
+    read_file = partial(read, encoding, update, C.Reader(),
                         ANNOTATORS[corpus], couchdb_url, database)
-    pool.map(read_file, corpus_files)
-    pool.close()
-    pool.join()
+
+    if jobs:
+        for file_name in corpus_files:
+            read_file(file_name, jobs)
+    else:
+        pool = Pool()
+        pool.map(read_file, corpus_files)
+        pool.close()
+        pool.join()
+
     return 0
 
 if __name__ == '__main__':
@@ -101,6 +115,11 @@ if __name__ == '__main__':
         "-u", "--update", action="store_true", default=False,
         help="update files already in the database"
     )
+    parser.add_option(
+        "-j", "--jobs", type="int", metavar="N",
+        help="split each file at article boundaries and parse the articles "
+             "in N processes (default: one process per file)"
+    )
     parser.add_option(
         "--genia", action="store_const", const='genia',
         dest="corpus", help="parse GENIA XML corpus type [default]"
@@ -15,12 +15,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 import logging
+import os
+
 from fnl.nlp.analysis import TextAnalytics
-from fnl.nlp.genia.nersuite import NerSuite
-from fnl.nlp.genia.tagger import GeniaTagger
+from fnl.nlp.cache import AnalysisCache, TaggerVersion
+from fnl.nlp.genia.daemon import GeniaTaggerProxy, NerSuiteProxy, TAGGERD_SOCKET
+from fnl.nlp.genia.nersuite import NerSuite, NERSUITE_TAGGER
+from fnl.nlp.genia.supervisor import SupervisedTagger
+from fnl.nlp.genia.tagger import GeniaTagger, GENIATAGGER
 from fnl.nlp.dictionary import Dictionary
 from fnl.nlp.strtok import WordTokenizer
+from fnl.utils.timing import Profile
 
 
 __author__ = 'Florian Leitner'
@@ -139,10 +146,9 @@ def dictionaryReader(instream, qualifier_list, sep='\t') -> iter:
 
 
 if __name__ == '__main__':
-    import os
     import sys
 
-    from argparse import ArgumentParser
+    from argparse import ArgumentParser, FileType
 
     ALIGNED = 1
     NORMALIZED = 2
@@ -185,6 +191,35 @@ if __name__ == '__main__':
         help='do not regularize Greek letters to Latin names; '
              'has to be repeated once for each dictionary (in same order)'
     )
+    parser.add_argument(
+        '--daemon', metavar='SOCKET', nargs='?', const=TAGGERD_SOCKET,
+        help='use the taggers of a running fnltaggerd instead of starting '
+             'new tagger processes (default socket: %s)' % TAGGERD_SOCKET
+    )
+    parser.add_argument(
+        '--timeout', metavar='SECONDS', type=float,
+        help='restart the taggers if they do not respond to a sentence '
+             'within this time (default: wait forever)'
+    )
+    parser.add_argument(
+        '--cache', metavar='FILE',
+        help='SQLite file caching the tagger results of each sentence '
+             '(for re-runs over [partially] annotated input)'
+    )
+    parser.add_argument(
+        '--cache-size', metavar='N', type=int,
+        help='max. number of sentences to keep in the cache (default: no limit)'
+    )
+    parser.add_argument(
+        '--profile', metavar='FILE', type=FileType('w'),
+        help='write the number of sentences and tokens and the time spent in each '
+             'stage of the analysis as JSON to this file when done'
+    )
+    parser.add_argument(
+        '--progress', metavar='SECONDS', type=float,
+        help='write a progress line with the sentences/second to STDERR '
+             'every SECONDS'
+    )
     parser.add_argument(
         '-s', '--separator', default="\t",
         help='separator used in input files (default: tab)'
@@ -231,8 +266,20 @@ if __name__ == '__main__':
         method = lambda *args: None
 
     try:
-        pos_tagger = GeniaTagger()
-        ner_tagger = NerSuite(args.model)
+        if args.daemon:
+            make_pos_tagger = lambda: GeniaTaggerProxy(path=args.daemon)
+            make_ner_tagger = lambda: NerSuiteProxy(args.model, path=args.daemon)
+        else:
+            make_pos_tagger = GeniaTagger
+            make_ner_tagger = lambda: NerSuite(args.model)
+
+        if args.timeout:
+            pos_tagger = SupervisedTagger(make_pos_tagger, args.timeout)
+            ner_tagger = SupervisedTagger(make_ner_tagger, args.timeout)
+        else:
+            pos_tagger = make_pos_tagger()
+            ner_tagger = make_ner_tagger()
+
         qualifier_list = [l.strip() for l in args.qranks]
         raw_dict_data = [dictionaryReader(d, qualifier_list, args.separator)
                          for d in args.dictionary]
@@ -245,6 +292,20 @@ if __name__ == '__main__':
                     tag_all_nouns=args.nouns,
                     use_greek_letters=args.greek)
 
+        if args.cache:
+            if args.daemon:
+                # identify the taggers the daemon is actually running
+                proxy = GeniaTaggerProxy(path=args.daemon)
+                version = ' '.join((proxy.version(), TaggerVersion(args.model)))
+                proxy.close()
+            else:
+                version = TaggerVersion(GENIATAGGER, NERSUITE_TAGGER, args.model)
+
+            kwds['cache'] = AnalysisCache(args.cache, version, max_size=args.cache_size)
+
+        if args.profile or args.progress:
+            kwds['profile'] = Profile(args.progress)
+
         if args.files:
             lst.append(args.files)
         else:
@@ -252,6 +313,19 @@ if __name__ == '__main__':
 
         method(*lst, **kwds)
 
+        if args.timeout:
+            logging.info('PoS tagger stats: %s', pos_tagger.stats.asDict())
+            logging.info('NER tagger stats: %s', ner_tagger.stats.asDict())
+
+        if args.cache:
+            logging.info('cache stats: %s', kwds['cache'].stats.asDict())
+            kwds['cache'].close()
+
+        if args.profile:
+            json.dump(kwds['profile'].asDict(), args.profile, indent=2, sort_keys=True)
+            args.profile.write('\n')
+            args.profile.close()
+
         del ner_tagger
         del pos_tagger
     except:
@@ -22,6 +22,7 @@ from sklearn.naive_bayes import BernoulliNB
 from sklearn.pipeline import Pipeline
 from sklearn.svm import LinearSVC
 
+from fnl.stat.scorer import ExportLinearModel
 from fnl.text.sentence import SentenceParser
 
 
@@ -472,6 +473,11 @@ parser.add_argument(
          'training and defines the location where the trained model will be stored; '
          'requires a feature function'
 )
+parser.add_argument(
+    '--export', metavar='DIR',
+    help='also export the trained (maxent or svm) model to DIR as a compact '
+         'linear model for fnl.stat.scorer.LinearScorer'
+)
 parser.add_argument(
     '-t', '--truth', metavar='FILE', type=open,
     help='ground truth: per (doc_id, s_idx) relationships; '
@@ -529,6 +535,9 @@ try:
     elif args.classifier:
         parser.error('classifier chosen, but no ground truth given')
 
+    if args.export and (args.classifier not in ('maxent', 'svm') or not args.model):
+        parser.error('only trained maxent or svm models can be exported')
+
     if args.feature_function:
         fg = FeatureGenerator(sentences, args.feature_function.read(), entities)
         data = Data(fg, ground_truth, sparse=not (args.classifier and args.classifier in DENSE))
@@ -577,6 +586,11 @@ try:
             with open(args.model, 'wb') as output_file:
                 # noinspection PyArgumentList
                 pickle.dump(pipeline, output_file)
+
+            if args.export:
+                logging.info('exporting linear model to %s', args.export)
+                kept = ExportLinearModel(pipeline, args.export)
+                logging.info('exported %s of %s features', kept, data.n_features)
     elif args.model and args.feature_function:
         logging.info('loading model for %s', args.model)
         # Do predictions on the given data using the model and feature function
@@ -27,7 +27,8 @@ import sys
 
 from argparse import ArgumentParser
 from nltk.tokenize.punkt import PunktSentenceTokenizer
-from fnl.nlp.split import SplitText, SplitTextInColumn
+from fnl.nlp.split import PrefilteredTokenizer, SplitText, \
+        SplitTextInColumn, SplitTextParallel
 
 __author__ = 'Florian Leitner'
 __version__ = '1.0.1'
@@ -56,6 +57,18 @@ parser.add_argument(
     '-s', '--separator', metavar='SEP', default='\t',
     help='field separator [\\t]'
 )
+parser.add_argument(
+    '-j', '--jobs', metavar='N', type=int, default=1,
+    help='number of segmentation processes; 0 for one per CPU [%(default)s]'
+)
+parser.add_argument(
+    '--chunk-size', metavar='LINES', type=int, default=256,
+    help='number of input lines per segmentation task [%(default)s]'
+)
+parser.add_argument(
+    '-p', '--prefilter', action='store_true',
+    help='only call Punkt for texts with sentence terminals before their end'
+)
 parser.add_argument('--version', action='version', version=__version__)
 parser.add_argument(
     '-v', '--verbose', action='store_const', const=logging.INFO,
@@ -67,6 +80,13 @@ parser.add_argument(
 )
 
 args = parser.parse_args()
+
+if args.jobs < 0:
+    parser.error('the number of jobs must not be negative')
+
+if args.chunk_size < 1:
+    parser.error('the chunk size must be positive')
+
 logging.basicConfig(
     level=args.loglevel,
     format='%(asctime)s %(levelname)s: %(message)s'
@@ -75,6 +95,9 @@ logging.basicConfig(
 try:
     model = pickle.load(open(args.model, 'rb'))
     pst = PunktSentenceTokenizer(model)
+
+    if args.prefilter:
+        pst = PrefilteredTokenizer(pst)
 except:
     logging.exception('failed to unpickle %s', args.model)
     args.error('could not load model')
@@ -83,7 +106,13 @@ streams = args.files if args.files else (sys.stdin,)
 
 for input in streams:
     try:
-        if args.column is None:
+        if args.jobs != 1:
+            SplitTextParallel(input, args.model, args.column,
+                              sep=args.separator,
+                              processes=args.jobs or None,
+                              chunksize=args.chunk_size,
+                              prefilter=args.prefilter)
+        elif args.column is None:
             SplitText(input, pst)
         else:
             SplitTextInColumn(input, pst, args.column,
@@ -20,35 +20,61 @@
 # Boundary Detection. Computational Linguistics 32: 485-525.
 
 import fileinput
+import logging
 import pickle
 import sys
 
+from argparse import ArgumentParser
 from os.path import basename
-from nltk.tokenize.punkt import PunktTrainer
+from fnl.nlp.split import TrainPunkt
 
 __author__ = 'Florian Leitner'
-__version__ = '1.0'
-
-if len(sys.argv) == 2 and sys.argv[1] in ('-h', '--help'):
-    print('usage: {} < TEXT > MODEL'.format(basename(sys.argv[0])))
-    sys.exit(1)
-
-trainer = PunktTrainer()
-# configuration
-trainer.ABBREV = 0.3  # cut-off value whether a ‘token’ is an abbreviation
-trainer.ABBREV_CUTOFF = 5  # upper cut-off for Mikheev’s (2002) abbreviation detection algorithm
-trainer.COLLOCATION = 7.88  # minimal log-likelihood value that two tokens need to be considered as a collocation
-trainer.IGNORE_ABBREV_PENALTY = False  # disables the abbreviation penalty heuristic, which exponentially disadvantages words that are found at times without a final period
-trainer.INCLUDE_ABBREV_COLLOCS = True  # include as potential collocations all word pairs where the first word is an abbreviation - such collocations override the orthographic heuristic, but not the sentence starter heuristic
-trainer.INCLUDE_ALL_COLLOCS = False  # this includes as potential collocations all word pairs where the first word ends in a period - it may be useful in corpora where there is a lot of variation that makes abbreviations like Mr difficult to identify
-trainer.MIN_COLLOC_FREQ = 3  # minimum bound on the number of times a bigram needs to appear before it can be considered a collocation - useful when INCLUDE_*_COLLOCS are used
-trainer.SENT_STARTER = 30  # minimal log-likelihood value that a token requires to be considered as a frequent sentence starter
-
-for line in fileinput.input():
-    trainer.train(line)
-    #print(line)
-
-#trainer.freq_threshold()
-trainer.finalize_training()
-params = trainer.get_params()
+__version__ = '1.1'
+
+parser = ArgumentParser(
+    usage='%(prog)s [options] [FILE ...] > MODEL',
+    description=__doc__, prog=basename(sys.argv[0])
+)
+parser.set_defaults(loglevel=logging.WARNING)
+parser.add_argument(
+    'files', metavar='FILE', nargs='*',
+    help='text input file(s); if absent, read from <STDIN>'
+)
+parser.add_argument(
+    '-j', '--jobs', metavar='N', type=int, default=1,
+    help='number of training processes; 0 for one per CPU [%(default)s]'
+)
+parser.add_argument(
+    '--shard-size', metavar='LINES', type=int, default=10000,
+    help='number of input lines per training process task [%(default)s]'
+)
+parser.add_argument(
+    '--prune-every', metavar='LINES', type=int,
+    help='drop rare types from the frequency tables after every LINES lines'
+)
+parser.add_argument('--version', action='version', version=__version__)
+parser.add_argument(
+    '-v', '--verbose', action='store_const', const=logging.INFO,
+    dest='loglevel', help='INFO log level [WARN]'
+)
+parser.add_argument(
+    '-q', '--quiet', action='store_const', const=logging.ERROR,
+    dest='loglevel', help='ERROR log level [WARN]'
+)
+
+args = parser.parse_args()
+
+if args.jobs < 0:
+    parser.error('the number of jobs must not be negative')
+
+if args.shard_size < 1:
+    parser.error('the shard size must be positive')
+
+logging.basicConfig(
+    level=args.loglevel,
+    format='%(asctime)s %(levelname)s: %(message)s'
+)
+
+params = TrainPunkt(fileinput.input(args.files), processes=args.jobs or None,
+                    shard_size=args.shard_size, prune_every=args.prune_every)
 pickle.dump(params, sys.stdout.buffer)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""taggerd keeps warm GENIA and NER Suite taggers for concurrent clients"""
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+import signal
+import sys
+
+from argparse import ArgumentParser
+from threading import Thread
+
+from fnl.nlp.cache import TaggerVersion
+from fnl.nlp.genia.daemon import TaggerDaemon, TAGGERD_SOCKET, GENIA, GENIA_NT, NERSUITE
+from fnl.nlp.genia.nersuite import NerSuite, NERSUITE_TAGGER
+from fnl.nlp.genia.tagger import GeniaTagger, GENIATAGGER, GENIATAGGER_DIR
+
+__author__ = 'Florian Leitner'
+__version__ = '1.0'
+
+epilog = 'system (default) encoding: {}'.format(sys.getdefaultencoding())
+parser = ArgumentParser(
+    usage='%(prog)s [options] [MODEL ...]',
+    description=__doc__, epilog=epilog,
+    prog=os.path.basename(sys.argv[0])
+)
+
+parser.set_defaults(loglevel=logging.WARNING)
+parser.add_argument(
+    'models', metavar='MODEL', nargs='*',
+    help='NER Suite model file(s) to load at startup; '
+         'other models are loaded on their first request'
+)
+parser.add_argument(
+    '-s', '--socket', metavar='PATH', default=TAGGERD_SOCKET,
+    help='Unix domain socket to listen on [%(default)s]'
+)
+parser.add_argument(
+    '-n', '--size', metavar='N', type=int, default=2,
+    help='max. number of processes per tagger pool [%(default)s]'
+)
+parser.add_argument(
+    '--no-tokenize', action='store_true',
+    help='warm up the GENIA tagger pool running without tokenization (-nt)'
+)
+parser.add_argument(
+    '--geniatagger', metavar='BIN', default=GENIATAGGER,
+    help='path to the geniatagger binary [%(default)s]'
+)
+parser.add_argument(
+    '--morphdic', metavar='DIR', default=GENIATAGGER_DIR,
+    help='directory containing the morphdic directory [%(default)s]'
+)
+parser.add_argument(
+    '--nersuite', metavar='BIN', default=NERSUITE_TAGGER,
+    help='path to the nersuite binary [%(default)s]'
+)
+parser.add_argument('--version', action='version', version=__version__)
+parser.add_argument(
+    '-q', '--quiet', action='store_const', const=logging.CRITICAL,
+    dest='loglevel', help='critical log level only (default: warn)'
+)
+parser.add_argument(
+    '-v', '--verbose', action='store_const', const=logging.INFO,
+    dest='loglevel', help='info log level (default: warn)'
+)
+parser.add_argument(
+    '--debug', action='store_const', const=logging.DEBUG,
+    dest='loglevel', help='debug log level (default: warn)'
+)
+
+args = parser.parse_args()
+
+if args.size < 1:
+    parser.error('the pool size must be positive')
+
+logging.basicConfig(
+    level=args.loglevel, format='%(asctime)s %(name)s %(levelname)s: %(message)s'
+)
+
+try:
+    daemon = TaggerDaemon(
+        args.socket, args.size,
+        genia=lambda tokenize: GeniaTagger(args.geniatagger, args.morphdic, tokenize),
+        nersuite=lambda model: NerSuite(model, args.nersuite),
+        version=TaggerVersion(args.geniatagger, args.morphdic, args.nersuite)
+    )
+except OSError as e:
+    parser.error(str(e))
+
+# shut down cleanly on SIGTERM, too (serve_forever must stop in another thread)
+signal.signal(signal.SIGTERM, lambda *_: Thread(target=daemon.shutdown).start())
+
+try:
+    daemon.warm(GENIA_NT if args.no_tokenize else GENIA)
+
+    for model in args.models:
+        daemon.warm(NERSUITE, os.path.abspath(model))
+
+    logging.info('listening on %s', args.socket)
+    daemon.serve_forever()
+except KeyboardInterrupt:
+    pass
+except:
+    logging.exception("unexpected program error")
+    daemon.server_close()
+    sys.exit(1)
+
+daemon.server_close()
+sys.exit(0)
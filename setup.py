@@ -47,6 +47,7 @@ setup(
         'scripts/fnlrelex.py',
         'scripts/fnlsegment.py',
         'scripts/fnlsegtrain.py',
+        'scripts/fnltaggerd.py',
         'scripts/fnltok.py',
         'scripts/genia_ner.sh',
         'scripts/uniq_tokens_on_line.py',
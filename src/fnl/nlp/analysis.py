@@ -1,10 +1,35 @@
 import logging
+import re
+from functools import lru_cache
 from unicodedata import category
-from unidecode import unidecode
 from fnl.nlp.dictionary import Dictionary
 from fnl.nlp.strtok import Category
-from fnl.text.symbols import LATIN
+from fnl.text.normalize import Ascii, AsciiProjection, ExpandGreek
 from fnl.text.token import Token
+from fnl.utils.timing import Counters
+
+IGNORED = re.compile(r'[\s-]+')
+"""Characters (whitespace and dashes) ignored when aligning tags to tokens."""
+
+QUOTES = frozenset({"``", "''"})
+"""The quote tokens the GENIA tagger converts double quotes to."""
+
+
+@lru_cache(maxsize=1 << 16)
+def project(word:str) -> str:
+    """
+    Return the (cached) ASCII projection of a word used to align tags to tokens:
+    the ``unidecode``'d word without whitespaces and dashes.
+    """
+    return '"' if word in QUOTES else IGNORED.sub('', AsciiProjection(word)[0])
+
+
+class AlignmentStats(Counters):
+    """
+    Counters for the tag-to-token alignments made by :class:`.TextAnalytics`.
+    """
+
+    COUNTERS = ('aligned', 'joined', 'split', 'dropped', 'rescued', 'fallbacks')
 
 
 class TextAnalytics:
@@ -20,7 +45,8 @@ class TextAnalytics:
 
     logger = logging.getLogger("TextAnalytics")
 
-    def __init__(self, tokenizer, pos_tagger, tag_all_nouns=0, use_greek_letters=False):
+    def __init__(self, tokenizer, pos_tagger, tag_all_nouns=0, use_greek_letters=False,
+                 cache=None, profile=None):
         """
         Create a new text analytics instance.
 
@@ -31,7 +57,14 @@ class TextAnalytics:
                e.g., if three dictionaries are added and this value is set to 1, only for the
                first dictionary nouns will be matched, too)
         :param use_greek_letters: do not expand/regularize Greek letters to their Latin words
+        :param cache: an optional :class:`fnl.nlp.cache.AnalysisCache` of tagger results;
+               if a sentence is found in the cache, the taggers are skipped
+        :param profile: an optional :class:`fnl.utils.timing.Profile` to record the time
+               spent in each stage of the analysis
         """
+        self.alignment_stats = AlignmentStats()
+        self.cache = cache
+        self.profile = profile
         self.tag_all_nouns = tag_all_nouns
         self.use_greek_letters = use_greek_letters
         self._ner_dictionaries = []
@@ -66,16 +99,64 @@ class TextAnalytics:
         :return a triple of (tokens, [ner_tags..], [normalizations...]);
                 if no NER tagger was set, the PoS tagger's tags are returned.
         """
+        profile = self.profile
+        start = now = profile.clock() if profile else None
+
         # TOKENIZATION
         if not self.use_greek_letters:
-            text = ''.join(LATIN[c] if c in LATIN else c for c in text)
+            text = ExpandGreek(text)
 
         tokens = list(self.tokenizer.split(text))
 
+        if profile:
+            now = profile.record('tokenize', now, len(tokens))
+
+        ner_tags = None if self.cache is None else self.cache.get(text)
+
+        if profile and self.cache is not None:
+            now = profile.record('cache', now)
+
+        if ner_tags is None:
+            ner_tags = self._tag(text, tokens)
+
+            if self.cache is not None:
+                self.cache.put(text, ner_tags)
+
+            if profile:
+                now = profile.clock()
+
+        # DICTIONARY NORMALIZATION
+        mappings = [list(d.walk(tokens)) for d in self._ner_dictionaries]
+
+        if profile:
+            now = profile.record('dictionary', now, len(tokens))
+
+        # ALIGN NER TAGS AND NORMALIZATIONS
+        normalizations = [
+            list(self._matchMappingToNerTags(m, ner_tags, i)) for i, m in enumerate(mappings)
+        ]
+
+        if profile:
+            profile.record('normalize', now, len(tokens))
+            profile.record('sentences', start, len(tokens))
+
+        return tokens, ner_tags, normalizations
+
+    def _tag(self, text, tokens):
+        """
+        Tag the text with the PoS and all NER taggers and return the list of NER tags
+        aligned to the tokens (or the PoS tags, if no NER tagger was set).
+        """
+        profile = self.profile
+        now = profile.clock() if profile else None
+
         # POS TAGGING
         self.pos_tagger.send(text)
         part_of_speech = list(self.pos_tagger)
 
+        if profile:
+            now = profile.record('pos', now, len(part_of_speech))
+
         # NER TAGGING
         ner_tags = [] if self._ner_taggers else [part_of_speech, ]
 
@@ -83,24 +164,118 @@ class TextAnalytics:
             tagger.send(part_of_speech)
             entities = list(tagger)
 
+            if profile:
+                now = profile.record('ner', now, len(entities))
+
             if len(entities) != len(tokens):
                 entities = self._alignToTokens(entities, tokens)
 
-            ner_tags.append(entities)
-
-        # DICTIONARY NORMALIZATION
-        mappings = [list(d.walk(tokens)) for d in self._ner_dictionaries]
+                if profile:
+                    now = profile.record('align', now, len(entities))
 
-        # ALIGN NER TAGS AND NORMALIZATIONS
-        normalizations = [
-            list(self._matchMappingToNerTags(m, ner_tags, i)) for i, m in enumerate(mappings)
-        ]
+            ner_tags.append(entities)
 
-        return tokens, ner_tags, normalizations
+        return ner_tags
 
     def _alignToTokens(self, tags, tokens):
         """
         Align the tags to the tokens.
+
+        Both sequences are projected onto the same ASCII string (see :func:`.project`)
+        and aligned by the offsets of their words in a single pass; if the projections
+        differ, the slower, heuristic alignment is used.
+        """
+        tag_ends = list(self._offsets(t.word for t in tags))
+        token_ends = list(self._offsets(tokens))
+
+        if tag_ends and token_ends and tag_ends[-1] == token_ends[-1] and \
+                ''.join(project(t.word) for t in tags) == ''.join(map(project, tokens)):
+            self.alignment_stats.aligned += 1
+            return self._alignByOffsets(tags, tag_ends, tokens, token_ends)
+
+        self.logger.debug('projections of tags %s and tokens %s differ',
+                          repr([t.word for t in tags]), repr(tokens))
+        self.alignment_stats.fallbacks += 1
+        return self._alignByHeuristics(tags, tokens)
+
+    @staticmethod
+    def _offsets(words):
+        # yield the end offsets of the words' projections
+        end = 0
+
+        for w in words:
+            end += len(project(w))
+            yield end
+
+    def _alignByOffsets(self, tags, tag_ends, tokens, token_ends):
+        # alignment helper: group tags and tokens into clusters that end at the same offset
+        aligned_tags = []
+        i = j = 0  # of the token and tag currently being aligned
+        stats = self.alignment_stats
+
+        while i < len(tokens):
+            start = token_ends[i - 1] if i else 0
+            word = tokens[i]
+
+            if j < len(tags) and tag_ends[j] == (tag_ends[j - 1] if j else 0) and \
+                    token_ends[i] != start:
+                # a tag without projection (dash) where the token has one
+                self.logger.debug('dropping dash "%s" [%s]', tags[j].word, tags[j][-1])
+                stats.dropped += 1
+                j += 1
+            elif token_ends[i] == start and (j == len(tags) or tag_ends[j] != start):
+                # a token without a projection to any tag
+                prev = tags[j - 1] if j else tags[j]
+                rescue = Token(word, word, *prev[2:])
+                self.logger.info(
+                    "word '%s' not recognized by tagger (probably due to NERSuite's "
+                    "shortcoming of only working with ASCII); assigning it the "
+                    "last token: %s", word, repr(rescue))
+                stats.rescued += 1
+                aligned_tags.append(rescue)
+                i += 1
+            else:
+                k, l = i + 1, j + 1
+
+                while token_ends[k - 1] != tag_ends[l - 1]:
+                    if token_ends[k - 1] < tag_ends[l - 1]:
+                        k += 1
+                    else:
+                        l += 1
+
+                tag = tags[j]
+
+                if k - i == 1 and l - j == 1:
+                    aligned_tags.append(tag if tag.word == word else Token(word, *tag[1:]))
+                elif k - i == 1:
+                    self.logger.debug('dropping tags "%s" and adding %s [%s]',
+                                      ' '.join(t.word for t in tags[j:l]), repr(word), tag[-1])
+                    stats.joined += 1
+                    aligned_tags.append(Token(word, Ascii(word), *tag[2:]))
+                else:
+                    self.logger.debug('dropping tag(s) "%s" [%s] for words "%s"',
+                                      ' '.join(t.word for t in tags[j:l]), tag[-1],
+                                      ' '.join(tokens[i:k]))
+                    stats.split += 1
+                    tmp = list(tag)
+
+                    for w in tokens[i:k]:
+                        tmp[0] = w
+                        tmp[1] = Ascii(w).replace('-', '')
+                        aligned_tags.append(Token(*tmp))
+
+                        for p in (3, 4):
+                            if tmp[p].startswith('B-'):
+                                tmp[p] = 'I' + tmp[p][1:]
+
+                i, j = k, l
+
+        stats.dropped += len(tags) - j
+        return aligned_tags
+
+    def _alignByHeuristics(self, tags, tokens):
+        """
+        Align the tags to the tokens by comparing their words.
         """
         # in this code, each token to align to is called a "word"
         aligned_tags = []
@@ -120,7 +295,7 @@ class TextAnalytics:
             if word == '"' and tag.word in ("``", "''"):
                 # " is a special case (gets converted to `` or '' by GENIA)
                 aligned_tags.append(Token('"', *tag[1:]))
-            elif tag.word == unidecode(word):
+            elif tag.word == Ascii(word):
                 if tag.word == word:
                     aligned_tags.append(tag)
                 else:
@@ -139,7 +314,7 @@ class TextAnalytics:
                 try:
                     next_word = next(t_iter)
 
-                    if tag.word == unidecode(next_word):
+                    if tag.word == Ascii(next_word):
                         rescue = Token(word, word, *tags[index-1][2:])
                         self.logger.info(
                             "word '%s' not recognized by tagger (probably due to NERSuite's "
@@ -167,7 +342,7 @@ class TextAnalytics:
         # alignment helper
         self.logger.debug('word %s exceeds tag %s', repr(word), repr(tag.word))
         tag_words = [tag.word]
-        ascii = unidecode(word)
+        ascii = Ascii(word)
         aligned = lambda: ascii == ''.join(tag_words)
         max_len = len(word)
 
@@ -194,7 +369,7 @@ class TextAnalytics:
         self.logger.debug('tag %s exceeds word %s', repr(tag.word), repr(word))
         tmp = list(tag)
         words = [word]
-        asciis = [unidecode(word).replace('-', '')]
+        asciis = [Ascii(word).replace('-', '')]
         tag_word = ''.join(self.tokenizer.split(tag.word))
         aligned = lambda: ''.join(asciis) == tag_word
         max_len = len(tag_word)
@@ -202,7 +377,7 @@ class TextAnalytics:
 
         while not aligned() and sum(map(len, asciis)) < max_len:
             words.append(next(t_iter))
-            asciis.append(unidecode(words[-1]).replace('-', ''))
+            asciis.append(Ascii(words[-1]).replace('-', ''))
 
         if aligned():
             self.logger.debug('dropping tag %s [%s] for words "%s"',
@@ -0,0 +1,193 @@
+"""
+.. py:module:: fnl.nlp.cache
+   :synopsis: A persistent cache of tagger results keyed by sentence hashes.
+
+An :class:`.AnalysisCache` stores the tokens produced by the PoS and NER
+taggers for a sentence in a SQLite database, so :class:`fnl.nlp.analysis.TextAnalytics`
+can skip the (expensive) tagger round-trips for sentences it has seen before::
+
+    cache = AnalysisCache('analysis.db', version='genia-3.0.1 nersuite:model.m')
+    analytics = TextAnalytics(tokenizer, pos_tagger, cache=cache)
+
+Entries are keyed by the SHA-1 hash of the sentence and the *version* string,
+which should identify the taggers and models used; changing the version
+therefore invalidates all existing entries. If a maximum size is set, the
+least recently used entries are evicted once the cache grows beyond it.
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from hashlib import sha1
+from shutil import which
+
+from fnl.text.token import Token
+from fnl.utils.timing import Counters
+
+
+def TaggerVersion(*paths) -> str:
+    """
+    Identify taggers and models by the absolute paths and modification times
+    of their files; binaries may also be given by their name on the ``PATH``.
+    """
+    version = []
+
+    for path in paths:
+        path = path if os.path.exists(path) else which(path) or path
+
+        try:
+            version.append('{}@{:.0f}'.format(os.path.abspath(path), os.path.getmtime(path)))
+        except OSError:
+            version.append(path)
+
+    return ' '.join(version)
+
+
+class CacheStats(Counters):
+    """
+    Counters for hits, misses, stores, and evictions of a cache.
+    """
+
+    COUNTERS = ('hits', 'misses', 'stores', 'evictions')
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def asDict(self) -> dict:
+        counters = super(CacheStats, self).asDict()
+        counters['hit_rate'] = self.hit_rate
+        return counters
+
+
+class AnalysisCache(object):
+    """
+    A SQLite-backed cache mapping sentences to their (PoS and NER) tagger results.
+    """
+
+    L = logging.getLogger("AnalysisCache")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analysis (
+            key BLOB PRIMARY KEY,
+            tokens TEXT NOT NULL,
+            used INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS analysis_used ON analysis (used);
+    """
+
+    def __init__(self, path, version:str='', max_size:int=None, commit_every:int=100):
+        """
+        :param path: The path of the SQLite database file (created if necessary).
+        :param version: A string identifying the taggers and models in use;
+                        it becomes part of every key.
+        :param max_size: The max. number of sentences to keep; ``None`` for
+                         no limit.
+        :param commit_every: The number of changes after which they are
+                             committed to disk.
+        """
+        self.commit_every = commit_every
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self.version = version
+        self._changes = 0
+        self._db = sqlite3.connect(path, timeout=60.0)
+        self._db.executescript(self.SCHEMA)
+        self._size = self._db.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+        self._clock = self._db.execute('SELECT MAX(used) FROM analysis').fetchone()[0] or 0
+        self.L.debug('opened %s with %i entries', path, self._size)
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, sentence):
+        return self._db.execute(
+            'SELECT 1 FROM analysis WHERE key = ?', (self.key(sentence),)
+        ).fetchone() is not None
+
+    def close(self):
+        """Commit any pending changes and close the database."""
+        if hasattr(self, '_db'):
+            db = self._db
+            delattr(self, '_db')
+            db.commit()
+            db.close()
+
+    def commit(self):
+        """Commit all pending changes to disk."""
+        self._db.commit()
+        self._changes = 0
+
+    def key(self, sentence:str) -> bytes:
+        """Return the (binary) hash key of a *sentence*."""
+        return sha1('{}\0{}'.format(self.version, sentence).encode('utf-8')).digest()
+
+    def get(self, sentence:str) -> list:
+        """
+        Return the list of token lists cached for a *sentence* or ``None``.
+        """
+        key = self.key(sentence)
+        row = self._db.execute('SELECT tokens FROM analysis WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self._clock += 1
+        self._db.execute('UPDATE analysis SET used = ? WHERE key = ?', (self._clock, key))
+        self._changed()
+        return [[Token(*t) for t in tokens] for tokens in json.loads(row[0])]
+
+    def put(self, sentence:str, token_lists:list):
+        """
+        Store the list of token lists for a *sentence*, evicting the least
+        recently used entries if the cache has grown beyond its max. size.
+        """
+        self._clock += 1
+        row = (json.dumps(token_lists, separators=(',', ':')), self._clock, self.key(sentence))
+        cursor = self._db.execute('UPDATE analysis SET tokens = ?, used = ? WHERE key = ?', row)
+
+        if not cursor.rowcount:
+            # only a new entry makes the cache grow
+            self._db.execute(
+                'INSERT OR REPLACE INTO analysis (tokens, used, key) VALUES (?, ?, ?)', row
+            )
+            self._size += 1
+
+        self.stats.stores += 1
+
+        if self.max_size is not None and self._size > self.max_size:
+            # replaced entries and other processes make the own count inexact
+            self._size = self._db.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+
+            if self._size > self.max_size:
+                # make some room to amortize the cost of evicting
+                self.evict(self._size - self.max_size + self.max_size // 10)
+
+        self._changed()
+
+    def evict(self, n:int):
+        """Remove the *n* least recently used entries."""
+        cursor = self._db.execute(
+            'DELETE FROM analysis WHERE key IN '
+            '(SELECT key FROM analysis ORDER BY used LIMIT ?)', (n,)
+        )
+        self.L.debug('evicted %i entries', cursor.rowcount)
+        self._size -= cursor.rowcount
+        self.stats.evictions += cursor.rowcount
+
+    def _changed(self):
+        self._changes += 1
+
+        if self._changes >= self.commit_every:
+            self.commit()
@@ -4,12 +4,43 @@
 
 .. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
 .. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+
+The :class:`.Reader` streams the XML: each article element (and any
+element preceding it) is discarded once the article's :class:`.Text` has
+been yielded, so the memory used does not grow with the size of the corpus.
+If lxml_ is installed, its (faster) ``iterparse`` is used.
+
+To convert a large (uncompressed) corpus file on several cores, use
+:meth:`.Reader.toTextParallel`: it scans the file for the byte ranges of
+the article elements and parses them in a process pool, yielding the
+results in the order of the articles in the file. Only a few chunks of
+articles per process are parsed ahead of the consumer.
+
+.. _lxml: http://lxml.de/
 """
+import gzip
+import logging
+import mmap
+import re
+from array import array
 from io import TextIOBase
+from multiprocessing import Pool
+from xml.etree.ElementTree import fromstring, iterparse, Element
+
 from fnl.text.text import Text
-from fnl.nlp.penn import AMBIGUITY_SEP, AMBIGUOUS, TAGSET, REMAPPED
-import logging
-from xml.etree.ElementTree import iterparse, Element
+from fnl.nlp.penn import AMBIGUITY_SEP, AMBIGUOUS, TAGSET, TAG_IDS, REMAPPED_TAGS
+from fnl.utils.pool import Chunks, Imap
+
+try:
+    from lxml.etree import iterparse as lxml_iterparse
+except ImportError:
+    lxml_iterparse = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+"""The first bytes of a gzip stream."""
+
+XML_DECLARATION = re.compile(br'\s*<\?xml[^>]*\?>')
+"""The XML declaration (with the encoding) at the start of a file."""
 
 DROPPED_TOKENS = frozenset('*')
 """
@@ -41,7 +72,7 @@ class Reader:
                  token_element="w", pos_attribute="c",
                  sentence_element="sentence", title_element="title",
                  abstract_element="abstract", article_element="article",
-                 article_id_path="articleinfo/bibliomisc"):
+                 article_id_path="articleinfo/bibliomisc", use_lxml=True):
         """
         :param section_ns: The tag namespace to use for the article sections
             (abstract, sentence, and title elements).
@@ -61,9 +92,12 @@ class Reader:
             article.
         :param article_id_path: The path to the XML element containing the
             article ID starting from the article element.
+        :param use_lxml: Parse the XML with lxml if it is installed.
         """
         self.pos_tag_ns = pos_tag_ns
-        self.pos_tags = None # will be a list of PoS tags
+        self.pos_ids = None # will be an array of PoS tag IDs
+        self.pos_starts = None # will be an array of PoS tag start offsets
+        self.pos_ends = None # will be an array of PoS tag end offsets
         self.section_tag_ns = section_ns
         self.section_tags = None # will a list of sentence tags
         self.abstract_elem = abstract_element
@@ -73,31 +107,127 @@ class Reader:
         self.title_elem = title_element
         self.token_elem = token_element
         self.article_id_path = article_id_path
+        self.use_lxml = use_lxml and lxml_iterparse is not None
 
     def toText(self, stream:TextIOBase) -> iter([Text]):
         """
-        Read an open XML stream, yielding article ID, :class:`.Text` instance
-        tuples, one per article.
+        Read an XML file path or an open XML stream, yielding article ID,
+        :class:`.Text` instance tuples, one per article. Paths ending in
+        ``.gz`` and binary streams starting with the gzip magic number are
+        decompressed on the fly.
 
         The PoS attributes on the XML token elements are used to create tags on
         the text, using the Penn tag name as tag IDs. The start and end
         positions of the title, abstract, and sentences are stored in the
         section tag namespace, using their XML element name as tag ID.
         """
-        for event, element in iterparse(stream, events=('end',)):
-            if element.tag == self.article_elem:
-                self.article = []
-                self.section_tags = []
-                self.pos_tags = []
+        if isinstance(stream, str):
+            with (gzip.open if stream.endswith('.gz') else open)(stream, 'rb') as file:
+                yield from self.toText(file)
+
+            return
+
+        if hasattr(stream, 'peek') and stream.peek(2)[:2] == GZIP_MAGIC:
+            stream = gzip.GzipFile(fileobj=stream)
+
+        for element in self._iterArticles(stream):
+            result = self._toText(element)
+
+            if result is not None:
+                yield result
+
+    def toTextParallel(self, path:str, processes:int=None,
+                       chunksize:int=16) -> iter([Text]):
+        """
+        Read an (uncompressed) XML file, yielding article ID, :class:`.Text`
+        instance tuples in the order of the articles in the file, just as
+        :meth:`.toText`, but parsing the articles in a pool of *processes*
+        (default: one per core).
+
+        :param chunksize: The number of articles sent to a process at once.
+        """
+        with open(path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header = XML_DECLARATION.match(data)
+            header = header.group(0) if header else b''
+            ranges = self._articleRanges(data)
+
+            tasks = ((chunk,) for chunk in Chunks(ranges, chunksize))
+
+            with Pool(processes, _InitArticleParser, (self, path, header)) as pool:
+                for results in Imap(pool, processes, _ParseArticleRanges, tasks):
+                    for result in results:
+                        if result is not None:
+                            yield result
+
+    def _articleRanges(self, data) -> iter([(int, int)]):
+        # Yield the (start, end) byte offsets of all article elements in *data*.
+        start_tag = re.compile(b'<' + self.article_elem.encode() + b'[\\s>]')
+        end_tag = '</{}>'.format(self.article_elem).encode()
+        offset = 0
+
+        while True:
+            match = start_tag.search(data, offset)
+
+            if match is None:
+                break
+
+            end = data.find(end_tag, match.end())
+
+            if end == -1:
+                raise ValueError('unterminated article at byte %i' % match.start())
+
+            offset = end + len(end_tag)
+            yield match.start(), offset
+
+    def _toText(self, element:Element) -> (str, Text):
+        # Returns the article ID, Text tuple of the article *element* or None
+        # if the article is empty.
+        self.article = []
+        self.section_tags = []
+        self.pos_ids = array('B')
+        self.pos_starts = array('l')
+        self.pos_ends = array('l')
+        result = None
+
+        if self._parseArticle(element):
+            text = Text(''.join(self.article))
+            text.add(self.section_tags, self.section_tag_ns)
+            text.addSpans(self.pos_tag_ns, REMAPPED_TAGS,
+                          self.pos_ids, self.pos_starts, self.pos_ends)
+            result = element.find(self.article_id_path).text.strip(), text
+
+        self.article = self.section_tags = None
+        self.pos_ids = self.pos_starts = self.pos_ends = None
+        return result
+
+    def _iterArticles(self, stream) -> iter([Element]):
+        # Yield the article elements of the *stream*, removing each from the
+        # tree (together with its preceding siblings) once it has been used.
+        if self.use_lxml:
+            for _, element in lxml_iterparse(stream, events=('end',), tag=self.article_elem):
+                yield element
+                element.clear()
+
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        else:
+            parents = []
 
-                length = self._parseArticle(element)
+            for event, element in iterparse(stream, events=('start', 'end')):
+                if event == 'start':
+                    parents.append(element)
+                    continue
 
-                if length:
-                    text = Text(''.join(self.article))
-                    text.add(self.section_tags, self.section_tag_ns)
-                    text.add(self.pos_tags, self.pos_tag_ns)
-                    article_id = element.find(self.article_id_path)
-                    yield article_id.text.strip(), text
+                parents.pop()
+
+                if element.tag == self.article_elem:
+                    yield element
+
+                    if parents:
+                        del parents[-1][:]
+                    else:
+                        element.clear()
 
     def _parseArticle(self, element:Element) -> int:
         # Returns the length of the article, all partial strings of the article
@@ -191,40 +321,34 @@ class Reader:
                     ))
         else:
             offset += inc
+            ambiguous = TAG_IDS[AMBIGUOUS]
+            ids, starts, ends = self.pos_ids, self.pos_starts, self.pos_ends
 
             for idx, word in enumerate(elements):
                 if word.text:
                     if word.text == "n't":
-                        start = None
+                        # extend the previous word's tags over the "n't"
                         offset += 3
                         words.append(word.text)
+                        count = len(tags[idx - 1])
+                        if count > 1: count += 1
 
-                        if len(tags[idx - 1]) > 1: self.pos_tags.pop()
-
-                        for _ in tags[idx - 1]:
-                            tag = self.pos_tags.pop()
-                            start = tag[0][2][0]
-
-                        for tag in tags[idx - 1]:
-                            t = (self.pos_tag_ns, tag, (start, offset))
-                            self.pos_tags.append((t, None))
-
-                        if len(tags[idx - 1]) > 1:
-                            t = (self.pos_tag_ns, AMBIGUOUS, (start, offset))
-                            self.pos_tags.append((t, None))
+                        for i in range(len(ends) - count, len(ends)):
+                            ends[i] = offset
                     else:
                         start = offset
                         offset += len(word.text)
                         words.append(word.text)
 
                         for tag in tags[idx]:
-                            if tag in REMAPPED: tag = REMAPPED[tag]
-                            t = (self.pos_tag_ns, tag, (start, offset))
-                            self.pos_tags.append((t, None))
+                            ids.append(TAG_IDS[tag])
+                            starts.append(start)
+                            ends.append(offset)
 
                         if len(tags[idx]) > 1:
-                            t = (self.pos_tag_ns, AMBIGUOUS, (start, offset))
-                            self.pos_tags.append((t, None))
+                            ids.append(ambiguous)
+                            starts.append(start)
+                            ends.append(offset)
 
                 if word.tail:
                     words.append(word.tail)
@@ -254,3 +378,22 @@ class Reader:
                 yield (pos_tag,)
 
 
+_ARTICLE_PARSER = None
+"""The reader, file, and XML declaration used by a worker process."""
+
+
+def _InitArticleParser(reader, path, header):
+    global _ARTICLE_PARSER
+    _ARTICLE_PARSER = (reader, open(path, 'rb'), header)
+
+
+def _ParseArticleRanges(byte_ranges):
+    # Parse the article elements in the byte ranges of the worker's file.
+    reader, file, header = _ARTICLE_PARSER
+    results = []
+
+    for start, end in byte_ranges:
+        file.seek(start)
+        results.append(reader._toText(fromstring(header + file.read(end - start))))
+
+    return results
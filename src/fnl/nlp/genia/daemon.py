@@ -0,0 +1,428 @@
+"""
+.. py:module:: fnl.nlp.genia.daemon
+   :synopsis: A local daemon keeping warm pools of GENIA and NER Suite taggers.
+
+The daemon listens on a Unix domain socket and serves tagging requests from
+any number of concurrent clients, sharing a pool of already initialized tagger
+processes between them. The proxy classes provided here are drop-in
+replacements for :class:`fnl.nlp.genia.tagger.GeniaTagger` and
+:class:`fnl.nlp.genia.nersuite.NerSuite`::
+
+    tagger = GeniaTaggerProxy()
+    tagger.send(sentence)
+    tokens = [t for t in tagger]
+
+The line protocol used between the proxies and the daemon is::
+
+    request  := <command> TAB <argument> LF [<token> LF ... LF]
+    response := ("OK" | "ERROR" TAB <message>) LF [<token> LF ... | <version> LF] LF
+
+where *command* is one of :data:`GENIA`, :data:`GENIA_NT`, :data:`NERSUITE`,
+or :data:`VERSION`, *argument* is the sentence (GENIA), the model path (NER
+Suite), or empty (version), and each *token* is a tab-separated
+:class:`fnl.text.token.Token`. Only NER Suite requests send tokens,
+terminated by an empty line; the *version* identifies the daemon's taggers.
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import logging
+import os
+import socket
+from queue import Queue, Empty
+from socketserver import ThreadingMixIn, UnixStreamServer, StreamRequestHandler
+from tempfile import gettempdir
+from threading import Lock
+
+from fnl.nlp.genia.nersuite import NerSuite
+from fnl.nlp.genia.tagger import GeniaTagger
+from fnl.text.token import Token
+
+TAGGERD_SOCKET = os.environ.get(
+    'TAGGERD_SOCKET', os.path.join(gettempdir(), 'fnltaggerd-%i.sock' % os.getuid())
+)
+"""
+The path of the daemon's Unix domain socket, defaulting to a per-user socket
+in the temporary directory, or as set in the environment.
+"""
+
+GENIA = 'genia'
+"Request command to tag a sentence with the (tokenizing) GENIA Tagger."
+
+GENIA_NT = 'genia-nt'
+"Request command to tag a sentence with the GENIA Tagger without tokenization."
+
+NERSUITE = 'nersuite'
+"Request command to tag a list of tokens with the NER Suite tagger."
+
+VERSION = 'version'
+"Request command to identify the tagger binaries the daemon is using."
+
+
+class TaggerPool:
+    """
+    A bounded pool of warm tagger instances, created on demand by a factory.
+    """
+
+    L = logging.getLogger("TaggerPool")
+
+    def __init__(self, factory, size=1):
+        """
+        :param factory: A callable returning a new tagger instance.
+        :param size: The max. number of tagger instances in this pool.
+        """
+        self._factory = factory
+        self._idle = Queue()
+        self._lock = Lock()
+        self._created = 0
+        self.size = size
+
+    def __len__(self):
+        return self._created
+
+    def acquire(self):
+        """Lease a tagger, waiting for one to become idle if the pool is exhausted."""
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                return self._factory()
+            except:
+                with self._lock:
+                    self._created -= 1
+
+                raise
+
+        return self._idle.get()
+
+    def release(self, tagger):
+        """Return a leased *tagger* to the pool."""
+        self._idle.put(tagger)
+
+    def discard(self, tagger):
+        """Close and drop a leased *tagger* (e.g., because it failed) from the pool."""
+        with self._lock:
+            self._created -= 1
+
+        if hasattr(tagger, 'close'):
+            try:
+                tagger.close()
+            except Exception as e:
+                self.L.warning('closing a tagger failed: %s', e)
+
+    def close(self):
+        """Close and drop all idle taggers."""
+        while True:
+            try:
+                self.discard(self._idle.get_nowait())
+            except Empty:
+                break
+
+    def tag(self, data) -> list:
+        """Tag *data* (a sentence or tokens) with a leased tagger, returning the tokens."""
+        tagger = self.acquire()
+
+        try:
+            tagger.send(data)
+            tokens = list(tagger)
+        except:
+            self.discard(tagger)
+            raise
+
+        self.release(tagger)
+        return tokens
+
+
+class TaggerRequestHandler(StreamRequestHandler):
+    """
+    Serve the tagging requests of one client connection.
+    """
+
+    L = logging.getLogger("TaggerRequestHandler")
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode().rstrip('\r\n')
+
+            if not line:
+                continue
+
+            command, _, argument = line.partition('\t')
+
+            if command == NERSUITE:
+                data = list(self._readTokens())
+            elif command == VERSION:
+                self.wfile.write('OK\n{}\n\n'.format(self.server.version).encode())
+                self.wfile.flush()
+                continue
+            else:
+                data = argument
+
+            try:
+                tokens = self.server.pool(command, argument).tag(data)
+            except Exception as e:
+                self.L.exception('%s request failed', command)
+                message = str(e).replace('\n', ' ') or e.__class__.__name__
+                self.wfile.write('ERROR\t{}\n\n'.format(message).encode())
+            else:
+                self.wfile.write(b'OK\n')
+
+                for token in tokens:
+                    self.wfile.write('\t'.join(token).encode())
+                    self.wfile.write(b'\n')
+
+                self.wfile.write(b'\n')
+
+            self.wfile.flush()
+
+    def _readTokens(self):
+        for line in self.rfile:
+            line = line.decode().rstrip('\r\n')
+
+            if not line:
+                break
+
+            yield Token(*line.split('\t'))
+
+
+class TaggerDaemon(ThreadingMixIn, UnixStreamServer):
+    """
+    A threaded Unix domain socket server keeping warm pools of taggers.
+
+    One pool is maintained per GENIA mode (tokenizing or not) and per NER
+    Suite model, each holding up to *size* tagger processes.
+    """
+
+    L = logging.getLogger("TaggerDaemon")
+
+    daemon_threads = True
+
+    def __init__(self, path=TAGGERD_SOCKET, size=1,
+                 genia=None, nersuite=None, version=''):
+        """
+        :param path: The path of the Unix domain socket to listen on.
+        :param size: The max. number of tagger processes per pool.
+        :param genia: A factory for GENIA taggers, called with the
+                      *tokenize* flag (default: :class:`.GeniaTagger`).
+        :param nersuite: A factory for NER Suite taggers, called with the
+                         model path (default: :class:`.NerSuite`).
+        :param version: A string identifying the tagger binaries, reported
+                        to clients (see :meth:`.TaggerProxy.version`).
+        """
+        self.size = size
+        self.version = version
+        self._genia = genia if genia is not None else \
+            lambda tokenize: GeniaTagger(tokenize=tokenize)
+        self._nersuite = nersuite if nersuite is not None else NerSuite
+        self._pools = {}
+        self._lock = Lock()
+
+        if os.path.exists(path):
+            TaggerDaemon._checkStale(path)
+
+        UnixStreamServer.__init__(self, path, TaggerRequestHandler)
+
+    @staticmethod
+    def _checkStale(path):
+        # Remove the socket file at *path* if no daemon is listening on it.
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError('a daemon is already listening on %s' % path)
+        finally:
+            probe.close()
+
+    def pool(self, command, argument) -> TaggerPool:
+        """Get (or create) the tagger pool for a request *command* and its *argument*."""
+        if command == GENIA:
+            key, factory = command, lambda: self._genia(True)
+        elif command == GENIA_NT:
+            key, factory = command, lambda: self._genia(False)
+        elif command == NERSUITE:
+            key, factory = (command, argument), lambda: self._nersuite(argument)
+        else:
+            raise ValueError('unknown command "%s"' % command)
+
+        with self._lock:
+            if key not in self._pools:
+                self.L.info('creating %s pool for %s', command, argument)
+                self._pools[key] = TaggerPool(factory, self.size)
+
+            return self._pools[key]
+
+    def warm(self, command, argument=''):
+        """Start all tagger processes of a pool ahead of the first request."""
+        pool = self.pool(command, argument)
+        taggers = [pool.acquire() for _ in range(pool.size)]
+
+        for t in taggers:
+            pool.release(t)
+
+    def server_close(self):
+        UnixStreamServer.server_close(self)
+
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+
+            self._pools = {}
+
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class TaggerProxy(object):
+    """
+    Abstract client of the :class:`.TaggerDaemon` implementing the tagger
+    interface (``send`` and iteration over the resulting tokens).
+    """
+
+    L = logging.getLogger("TaggerProxy")
+
+    def __init__(self, path=TAGGERD_SOCKET):
+        """
+        :param path: The path of the daemon's Unix domain socket.
+        :raise OSError: If no daemon is listening on *path*.
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            self._socket.connect(path)
+        except OSError:
+            self._socket.close()
+            raise
+
+        self._stream = self._socket.makefile('rwb')
+        self._pending = False
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """Disconnect from the daemon, interrupting any pending response."""
+        if hasattr(self, '_stream'):
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+            try:
+                self._stream.close()
+                self._socket.close()
+            except OSError:
+                pass
+            finally:
+                delattr(self, '_stream')
+
+    def __iter__(self):
+        return self
+
+    def version(self) -> str:
+        """Return the string identifying the daemon's tagger binaries."""
+        self._request(VERSION, '')
+        self._pending = False
+        status = self._readline()
+        version = self._readline()
+
+        if status != 'OK':
+            raise RuntimeError('taggerd: %s' % status.partition('\t')[2])
+
+        self._readline()  # consume the response terminator
+        return version
+
+    def __next__(self):
+        if self._pending:
+            self._pending = False
+            status = self._readline()
+
+            if status != 'OK':
+                self._readline()  # consume the response terminator
+                raise RuntimeError('taggerd: %s' % status.partition('\t')[2])
+
+        line = self._readline()
+
+        if not line:
+            raise StopIteration
+
+        return Token(*line.split('\t'))
+
+    # To make this module compatible with Python 2:
+    next = __next__
+
+    def _readline(self) -> str:
+        line = self._stream.readline()
+
+        if not line:
+            raise RuntimeError('taggerd closed the connection')
+
+        return line.decode().rstrip('\r\n')
+
+    def _request(self, command, argument, tokens=None):
+        self._stream.write('{}\t{}\n'.format(command, argument).encode())
+
+        if tokens is not None:
+            for t in tokens:
+                self._stream.write('\t'.join(t).encode())
+                self._stream.write(b'\n')
+
+            self._stream.write(b'\n')
+
+        self._stream.flush()
+        self._pending = True
+
+
+class GeniaTaggerProxy(TaggerProxy):
+    """
+    A drop-in replacement for the :class:`.GeniaTagger` using the daemon.
+    """
+
+    def __init__(self, tokenize=True, path=TAGGERD_SOCKET):
+        """
+        :param tokenize: If ``False``, the daemon's geniatagger pool running
+                         without tokenization is used.
+        :param path: The path of the daemon's Unix domain socket.
+        """
+        super(GeniaTaggerProxy, self).__init__(path)
+        self._command = GENIA if tokenize else GENIA_NT
+
+    def send(self, sentence):
+        """
+        Send a single *sentence* (w/o newline) to the tagger.
+        """
+        self.L.debug('sending sentence: "%s"', sentence)
+        self._request(self._command, sentence)
+
+
+class NerSuiteProxy(TaggerProxy):
+    """
+    A drop-in replacement for the :class:`.NerSuite` tagger using the daemon.
+    """
+
+    def __init__(self, model, path=TAGGERD_SOCKET):
+        """
+        :param model: The path to the model to use by the tagger.
+        :param path: The path of the daemon's Unix domain socket.
+        """
+        super(NerSuiteProxy, self).__init__(path)
+        self._model = os.path.abspath(model)
+
+    def send(self, tokens):
+        """
+        Send a single sentence as a list of tokens to the tagger.
+        """
+        self.L.debug('sending tokens for: "%s"', '" "'.join([t.word for t in tokens]))
+        self._request(NERSUITE, self._model, tokens)
@@ -8,9 +8,9 @@
 
 import logging
 import os
-from subprocess import Popen, PIPE, DEVNULL
-from unidecode import unidecode
+from subprocess import Popen, PIPE, DEVNULL, TimeoutExpired
 
+from fnl.text.normalize import Ascii
 from fnl.text.token import Token
 
 NERSUITE_TAGGER = "nersuite"
@@ -61,14 +61,32 @@ d        """
                 break
 
     def __del__(self):
+        self.close()
+
+    def close(self, timeout=1.0):
+        """
+        Terminate the tagger process, killing it if it has not exited after
+        *timeout* seconds.
+        """
         if hasattr(self, '_proc'):
+            proc = self._proc
+            delattr(self, '_proc')
+
             try:
-                self._proc.terminate()
-            except TypeError:
+                proc.terminate()
+                proc.wait(timeout)
+            except TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            except (TypeError, OSError):
                 # already dead...
                 pass
             finally:
-                delattr(self, '_proc')
+                for pipe in (proc.stdin, proc.stdout):
+                    try:
+                        pipe.close()
+                    except OSError:
+                        pass
 
     def __iter__(self):
         return self
@@ -77,11 +95,16 @@ d        """
         status = self._proc.poll()
 
         if status is not None:
-            raise RuntimeError("nersuite exited with status %i" % status * -1)
+            raise RuntimeError("nersuite exited with status %i" % -status)
 
         self.L.debug('reading token')
         # noinspection PyUnresolvedReferences
-        line = self._proc.stdout.readline().decode('ASCII').strip()
+        line = self._proc.stdout.readline()
+
+        if not line:
+            raise RuntimeError("nersuite closed its output")
+
+        line = line.decode('ASCII').strip()
         self.L.debug('fetched line "%s"', line)
 
         if not line:
@@ -102,10 +125,7 @@ d        """
         """
         self.L.debug('sending tokens for: "%s"', '" "'.join([t.word for t in tokens]))
 
-        for t in tokens:
-            self._proc.stdin.write("0\t{}\t".format(len(t.word)).encode('ASCII'))
-            self._proc.stdin.write(unidecode('\t'.join(t[:-1])).encode('ASCII'))
-            self._proc.stdin.write("\n".encode('ASCII'))
-
-        self._proc.stdin.write("\n".encode('ASCII'))
+        lines = ["0\t{}\t{}\n".format(len(t.word), '\t'.join(t[:-1])) for t in tokens]
+        lines.append("\n")
+        self._proc.stdin.write(Ascii(''.join(lines)).encode('ASCII'))
         self._proc.stdin.flush()
@@ -0,0 +1,163 @@
+"""
+.. py:module:: fnl.nlp.genia.supervisor
+   :synopsis: Supervise tagger subprocesses with timeouts and automatic restarts.
+
+A :class:`.SupervisedTagger` wraps any tagger adhering to the interface
+described in :mod:`fnl.nlp` and can be used wherever the wrapped tagger
+would be used::
+
+    tagger = SupervisedTagger(GeniaTagger, timeout=30.0)
+    tagger.send(sentence)
+    tokens = [t for t in tagger]
+
+If the tagger does not respond within the timeout or its process dies, the
+tagger is closed and replaced by a new instance, and the in-flight sentence
+is replayed.
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from time import time
+
+from fnl.utils.timing import Counters, Latencies
+
+LATENCY_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0, 60.0)
+"""
+Upper bounds (in seconds) of the per-sentence latency histogram buckets;
+a final bucket counts all sentences slower than the last bound.
+"""
+
+
+class TaggerStats(Counters):
+    """
+    Counters for sentences, restarts, timeouts, failures, and the
+    per-sentence latencies of a tagger.
+    """
+
+    COUNTERS = ('sentences', 'restarts', 'timeouts', 'failures')
+
+    def __init__(self):
+        super(TaggerStats, self).__init__()
+        self.latency = Latencies(LATENCY_BUCKETS)
+
+    def record(self, seconds:float):
+        """Record the latency of one successfully tagged sentence."""
+        self.sentences += 1
+        self.latency.add(seconds)
+
+    def asDict(self) -> dict:
+        counters = super(TaggerStats, self).asDict()
+        counters['latency'] = self.latency.asDict()
+        return counters
+
+
+class SupervisedTagger(object):
+    """
+    A tagger proxy that enforces per-sentence read timeouts, restarts the
+    wrapped tagger on timeouts or failures, and replays the in-flight
+    sentence on the new tagger.
+    """
+
+    L = logging.getLogger("SupervisedTagger")
+
+    def __init__(self, factory, timeout:float=60.0, retries:int=1):
+        """
+        :param factory: A callable returning a new tagger instance; e.g., the
+                        tagger class itself or a ``lambda`` configuring it.
+        :param timeout: The max. number of seconds to wait for the tags of
+                        one sentence; ``None`` to wait forever.
+        :param retries: The number of times a sentence is replayed on a
+                        restarted tagger before giving up on it.
+        """
+        self.retries = retries
+        self.stats = TaggerStats()
+        self.timeout = timeout
+        self._data = None
+        self._executor = None
+        self._factory = factory
+        self._tagger = None
+        self._tokens = iter(())
+        self._start()
+
+    def __del__(self):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._data is not None:
+            data, self._data = self._data, None
+            self._tokens = iter(self._tag(data))
+
+        return next(self._tokens)
+
+    # To make this module compatible with Python 2:
+    next = __next__
+
+    def close(self):
+        """Close the wrapped tagger."""
+        if self._tagger is not None:
+            tagger, self._tagger = self._tagger, None
+
+            if hasattr(tagger, 'close'):
+                tagger.close()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def restart(self):
+        """Replace the wrapped tagger with a new instance."""
+        self.L.info('restarting tagger')
+        self.stats.restarts += 1
+        self.close()
+        self._start()
+
+    def send(self, data):
+        """
+        Send a single sentence (string or tokens, depending on the wrapped
+        tagger) to the tagger; tagging happens when iterating over the tags.
+        """
+        self._data = data
+        self._tokens = iter(())
+
+    @staticmethod
+    def _roundTrip(tagger, data) -> list:
+        # Tag the *data* with the given *tagger*; bound by the caller, so a
+        # call abandoned after a timeout never touches a restarted tagger.
+        tagger.send(data)
+        return list(tagger)
+
+    def _start(self):
+        # The executor's single thread does the blocking I/O with the tagger,
+        # so the supervisor can give up on it after the timeout.
+        self._tagger = self._factory()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _tag(self, data) -> list:
+        # Tag the *data*, restarting the tagger and replaying the *data*
+        # after failures; raises a RuntimeError if all retries failed.
+        for attempt in range(self.retries + 1):
+            start = time()
+            future = self._executor.submit(self._roundTrip, self._tagger, data)
+
+            try:
+                tokens = future.result(self.timeout)
+            except TimeoutError:
+                self.stats.timeouts += 1
+                self.L.warning('tagger timed out after %.1f s (attempt %i)',
+                               self.timeout, attempt + 1)
+            except Exception as e:
+                self.stats.failures += 1
+                self.L.warning('tagger failed (attempt %i): %s', attempt + 1, e)
+            else:
+                self.stats.record(time() - start)
+                return tokens
+
+            self.restart()
+
+        raise RuntimeError('tagger failed %i times on %r' % (self.retries + 1, data))
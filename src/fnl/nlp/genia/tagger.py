@@ -8,7 +8,7 @@
 
 import logging
 import os
-from subprocess import Popen, PIPE, DEVNULL
+from subprocess import Popen, PIPE, DEVNULL, TimeoutExpired
 
 from fnl.text.token import Token
 
@@ -73,15 +73,32 @@ class GeniaTagger(object):
                 break
 
     def __del__(self):
+        self.close()
+
+    def close(self, timeout=1.0):
+        """
+        Terminate the tagger process, killing it if it has not exited after
+        *timeout* seconds.
+        """
         if hasattr(self, '_proc'):
+            proc = self._proc
+            delattr(self, '_proc')
+
             try:
-                self._proc.terminate()
-            except TypeError:
+                proc.terminate()
+                proc.wait(timeout)
+            except TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            except (TypeError, OSError):
                 # already dead...
                 pass
             finally:
-                delattr(self, '_proc')
-
+                for pipe in (proc.stdin, proc.stdout):
+                    try:
+                        pipe.close()
+                    except OSError:
+                        pass
 
     def __iter__(self):
         return self
@@ -90,11 +107,15 @@ class GeniaTagger(object):
         status = self._proc.poll()
 
         if status is not None:
-            raise RuntimeError("geniatagger exited with %i" % status * -1)
+            raise RuntimeError("geniatagger exited with %i" % -status)
 
         self.L.debug('reading token')
         line = self._proc.stdout.readline()
         self.L.debug('fetched token')
+
+        if not line:
+            raise RuntimeError("geniatagger closed its output")
+
         # noinspection PyUnresolvedReferences
         line = line.decode().strip('\n\r')
 
@@ -1,4 +1,7 @@
-from tempfile import TemporaryFile
+import gzip
+import os
+
+from tempfile import mkstemp, TemporaryFile
 from unittest import main, TestCase
 from fnl.nlp.genia.corpus import Reader
 
@@ -73,5 +76,43 @@ class PosReaderTests(TestCase):
 
         self.assertEqual(2, count)
 
+    def testReadingGzipStream(self):
+        stream = TemporaryFile()
+        stream.write(gzip.compress(PosReaderTests.SAMPLE.encode()))
+        stream.seek(0)
+        self.assertListEqual([i for i, _ in self.reader.toText(self.file)],
+                             [i for i, _ in self.reader.toText(stream)])
+
+    def testReadingPaths(self):
+        for suffix, compress in (('.xml', bytes), ('.xml.gz', gzip.compress)):
+            handle, path = mkstemp(suffix)
+            os.write(handle, compress(PosReaderTests.SAMPLE.encode()))
+            os.close(handle)
+
+            try:
+                texts = list(self.reader.toText(path))
+            finally:
+                os.unlink(path)
+
+            self.assertEqual(2, len(texts))
+            self.assertEqual(295, len(texts[0][1].string))
+
+    def testReadingInParallel(self):
+        handle, path = mkstemp('.xml')
+        os.write(handle, PosReaderTests.SAMPLE.encode())
+        os.close(handle)
+
+        try:
+            parallel = list(self.reader.toTextParallel(path, processes=2, chunksize=1))
+        finally:
+            os.unlink(path)
+
+        serial = list(self.reader.toText(self.file))
+        self.assertListEqual([i for i, _ in serial], [i for i, _ in parallel])
+
+        for (_, expected), (_, text) in zip(serial, parallel):
+            self.assertEqual(expected.string, text.string)
+            self.assertDictEqual(expected.tagsAsDict(), text.tagsAsDict())
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import os
+
+from tempfile import mkdtemp
+from threading import Thread
+from unittest import main, TestCase
+
+from fnl.nlp.genia.daemon import TaggerDaemon, TaggerPool, \
+    GeniaTaggerProxy, NerSuiteProxy
+from fnl.text.token import Token
+
+
+class FakeTagger:
+
+    instances = 0
+
+    def __init__(self, mode):
+        FakeTagger.instances += 1
+        self.mode = mode
+        self.tokens = []
+        self.closed = False
+
+    def __iter__(self):
+        tokens, self.tokens = self.tokens, []
+        return iter(tokens)
+
+    def close(self):
+        self.closed = True
+
+    def send(self, data):
+        if self.mode == 'nersuite':
+            self.tokens = [t.replace(entity='B-gene') for t in data]
+        elif data == 'fail':
+            raise RuntimeError('tagger failure')
+        else:
+            self.tokens = [Token(w, w.lower(), 'NN', 'B-NP', self.mode)
+                           for w in data.split()]
+
+
+class TaggerPoolTests(TestCase):
+
+    def testReusesTaggers(self):
+        pool = TaggerPool(lambda: FakeTagger('O'), 2)
+
+        for dummy in range(3):
+            self.assertEqual(2, len(pool.tag('a b')))
+
+        self.assertEqual(1, len(pool))
+
+    def testDiscardsFailedTaggers(self):
+        taggers = []
+        pool = TaggerPool(lambda: taggers.append(FakeTagger('O')) or taggers[-1], 2)
+        self.assertRaises(RuntimeError, pool.tag, 'fail')
+        self.assertEqual(0, len(pool))
+        self.assertTrue(taggers[0].closed)
+
+    def testCloseStopsIdleTaggers(self):
+        taggers = []
+        pool = TaggerPool(lambda: taggers.append(FakeTagger('O')) or taggers[-1], 2)
+        pool.tag('a b')
+        pool.close()
+        self.assertEqual(0, len(pool))
+        self.assertTrue(all(t.closed for t in taggers))
+
+
+class TaggerDaemonTests(TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(mkdtemp(), 'taggerd.sock')
+        self.daemon = TaggerDaemon(self.path, 1,
+                                   genia=lambda tokenize: FakeTagger('O' if tokenize else 'nt'),
+                                   nersuite=lambda model: FakeTagger('nersuite'),
+                                   version='fake@1')
+        self.thread = Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.server_close()
+        os.rmdir(os.path.dirname(self.path))
+
+    def testGeniaProxy(self):
+        tagger = GeniaTaggerProxy(path=self.path)
+
+        for dummy in range(2):
+            tagger.send('Hello World')
+            self.assertListEqual([
+                Token('Hello', 'hello', 'NN', 'B-NP', 'O'),
+                Token('World', 'world', 'NN', 'B-NP', 'O'),
+            ], list(tagger))
+
+    def testGeniaProxyWithoutTokenization(self):
+        tagger = GeniaTaggerProxy(False, path=self.path)
+        tagger.send('Hello')
+        self.assertEqual('nt', next(tagger).entity)
+
+    def testNerSuiteProxy(self):
+        tagger = NerSuiteProxy('model', path=self.path)
+        tokens = [Token('p53', 'p53', 'NN', 'B-NP', 'O')]
+        tagger.send(tokens)
+        self.assertListEqual([tokens[0].replace(entity='B-gene')], list(tagger))
+
+    def testSharedPool(self):
+        taggers = [GeniaTaggerProxy(path=self.path) for _ in range(3)]
+        instances = FakeTagger.instances
+
+        for t in taggers:
+            t.send('a')
+            self.assertEqual(1, len(list(t)))
+
+        self.assertTrue(FakeTagger.instances - instances <= 1)
+
+    def testFailure(self):
+        tagger = GeniaTaggerProxy(path=self.path)
+        tagger.send('fail')
+        self.assertRaises(RuntimeError, list, tagger)
+        tagger.send('ok')
+        self.assertEqual(1, len(list(tagger)))
+
+    def testVersion(self):
+        tagger = GeniaTaggerProxy(path=self.path)
+        self.assertEqual('fake@1', tagger.version())
+        tagger.send('a b')
+        self.assertEqual(2, len(list(tagger)))
+
+    def testNoDaemon(self):
+        self.assertRaises(OSError, GeniaTaggerProxy, path=self.path + '.missing')
+
+if __name__ == '__main__': main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+from threading import Event
+from unittest import main, TestCase
+
+from fnl.nlp.genia.supervisor import SupervisedTagger
+from fnl.text.token import Token
+
+
+class FakeTagger:
+    """
+    Tags words as nouns, but hangs on "hang", and the first instance dies on
+    "die" and stalls on "stall" until it is closed.
+    """
+
+    instances = []
+
+    def __init__(self):
+        FakeTagger.instances.append(self)
+        self.closed = Event()
+        self.done = Event()
+        self.reads = 0
+        self.sentence = None
+
+    def __iter__(self):
+        self.reads += 1
+        self.done.set()
+
+        if self.sentence == 'hang':
+            self.closed.wait()
+            raise RuntimeError('killed')
+        elif self.sentence == 'die' and len(FakeTagger.instances) < 2:
+            raise RuntimeError('tagger died')
+
+        return iter([Token(w, w, 'NN', 'B-NP', 'O') for w in self.sentence.split()])
+
+    def close(self):
+        self.closed.set()
+
+    def send(self, sentence):
+        if sentence == 'stall' and self is FakeTagger.instances[0]:
+            self.closed.wait()
+
+        self.sentence = sentence
+
+
+class SupervisedTaggerTests(TestCase):
+
+    def setUp(self):
+        FakeTagger.instances = []
+        self.tagger = SupervisedTagger(FakeTagger, timeout=0.1)
+
+    def tearDown(self):
+        self.tagger.close()
+
+    def testTagger(self):
+        for dummy in range(2):
+            self.tagger.send('a b')
+            self.assertListEqual(['a', 'b'], [t.word for t in self.tagger])
+
+        self.assertEqual(2, self.tagger.stats.sentences)
+        self.assertEqual(0, self.tagger.stats.restarts)
+        self.assertEqual(2, sum(self.tagger.stats.latency.histogram))
+
+    def testTimeout(self):
+        self.tagger.send('hang')
+        self.assertRaises(RuntimeError, list, self.tagger)
+        self.assertEqual(2, self.tagger.stats.timeouts)
+        self.assertEqual(2, self.tagger.stats.restarts)
+        self.assertTrue(all(t.closed.is_set() for t in FakeTagger.instances[:2]))
+        self.tagger.send('a')
+        self.assertEqual(1, len(list(self.tagger)))
+
+    def testReplay(self):
+        self.tagger.send('die')
+        self.assertListEqual(['die'], [t.word for t in self.tagger])
+        self.assertEqual(1, self.tagger.stats.failures)
+        self.assertEqual(1, self.tagger.stats.restarts)
+        self.assertEqual(1, self.tagger.stats.sentences)
+
+    def testAbandonedCallUsesOldTagger(self):
+        self.tagger.send('stall')
+        self.assertListEqual(['stall'], [t.word for t in self.tagger])
+        old, new = FakeTagger.instances[:2]
+        self.assertTrue(old.done.wait(1.0))
+        self.assertEqual(1, old.reads)
+        self.assertEqual(1, new.reads)
+
+    def testStatsAsDict(self):
+        self.tagger.send('a')
+        list(self.tagger)
+        stats = self.tagger.stats.asDict()
+        self.assertEqual(1, stats['sentences'])
+        self.assertEqual(1, sum(stats['latency']['histogram'].values()))
+
+if __name__ == '__main__': main()
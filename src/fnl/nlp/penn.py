@@ -99,3 +99,19 @@ REMAPPED = {
 Mapping of tags containing symbol characters in the Penn tag-set to letter
 characters, as they are more versatile in various ways of handling them.
 """
+
+TAGS = tuple(sorted(TAGSET)) + (AMBIGUOUS,)
+"""
+All tags of the Penn tag-set and the :data:`.AMBIGUOUS` tag in a fixed order,
+so that tags can be stored compactly as their index in this tuple (tag ID).
+"""
+
+TAG_IDS = {tag: idx for idx, tag in enumerate(TAGS)}
+"""
+Mapping of tags to their tag ID (index in :data:`.TAGS`).
+"""
+
+REMAPPED_TAGS = tuple(REMAPPED.get(tag, tag) for tag in TAGS)
+"""
+The :data:`.REMAPPED` names of the tags, indexed by tag ID.
+"""
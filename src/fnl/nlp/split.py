@@ -6,16 +6,100 @@
 .. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
 """
 import logging
+import pickle
 import re
+import sys
+
+from itertools import repeat
+from multiprocessing import Pool
+from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktTrainer
+
+from fnl.nlp.strtok import STOP_CHARS
+from fnl.utils.pool import Chunks, Imap
 
 __author__ = "Florian Leitner"
 
+SENTENCE = 'sentence'
+"""The namespace and ID of the sentence tags added by :func:`.SegmentText`."""
+
+TRAINER_SETTINGS = {
+    # cut-off value whether a 'token' is an abbreviation
+    'ABBREV': 0.3,
+    # upper cut-off for Mikheev's (2002) abbreviation detection algorithm
+    'ABBREV_CUTOFF': 5,
+    # minimal log-likelihood value that two tokens need to be considered as a
+    # collocation
+    'COLLOCATION': 7.88,
+    # disables the abbreviation penalty heuristic, which exponentially
+    # disadvantages words that are found at times without a final period
+    'IGNORE_ABBREV_PENALTY': False,
+    # include as potential collocations all word pairs where the first word
+    # is an abbreviation - such collocations override the orthographic
+    # heuristic, but not the sentence starter heuristic
+    'INCLUDE_ABBREV_COLLOCS': True,
+    # this includes as potential collocations all word pairs where the first
+    # word ends in a period - it may be useful in corpora where there is a lot
+    # of variation that makes abbreviations like Mr difficult to identify
+    'INCLUDE_ALL_COLLOCS': False,
+    # minimum bound on the number of times a bigram needs to appear before it
+    # can be considered a collocation - useful when INCLUDE_*_COLLOCS are used
+    'MIN_COLLOC_FREQ': 3,
+    # minimal log-likelihood value that a token requires to be considered as
+    # a frequent sentence starter
+    'SENT_STARTER': 30,
+}
+"""The PunktTrainer configuration used by :func:`.NewTrainer`."""
+
 AUTHOR_PATTERN_TAIL = re.compile(r',(?: [A-Z]\.)+$')
 AUTHOR_PATTERN_HEAD = re.compile(
     r'^(?:[A-Z]\.(?:, [A-Za-z \.\-]+)*|\([12]\d{3}\))'
 )
 
 
+class PrefilteredTokenizer:
+    """
+    A wrapper around a PunktSentenceTokenizer that only calls Punkt for texts
+    with candidate sentence boundaries.
+
+    A candidate is any sentence terminal (the :data:`fnl.nlp.strtok.STOP_CHARS`
+    of :attr:`fnl.nlp.strtok.Category.Ts`, plus Punkt's own sentence end
+    characters) that is not the last (non-space) character of the text.
+    Without a candidate, Punkt cannot find a sentence boundary, so such texts
+    (most titles and short fields) are returned as a single sentence
+    directly, exactly as Punkt would return them.
+    """
+
+    def __init__(self, pst):
+        """
+        :param pst: the PunktSentenceTokenizer model instance to wrap
+        """
+        self.pst = pst
+        chars = STOP_CHARS.union(pst._lang_vars.sent_end_chars)
+        self._candidates = re.compile('[{}]'.format(re.escape(''.join(sorted(chars)))))
+
+    def _end(self, text):
+        # Return the end of the text's only sentence, or None if there are
+        # candidate boundaries.
+        end = len(text.rstrip())
+        return None if self._candidates.search(text, 0, end - 1) else end
+
+    def tokenize(self, text):
+        end = self._end(text)
+
+        if end is None:
+            return self.pst.tokenize(text)
+
+        return [text[:end]] if end else []
+
+    def span_tokenize(self, text):
+        end = self._end(text)
+
+        if end is None:
+            return self.pst.span_tokenize(text)
+
+        return [(0, end)] if end else []
+
+
 def JoinAuthorSplits(sentences):
     """
     Join sentences that were split wrongly in the middle of lists of author
@@ -37,6 +121,57 @@ def JoinAuthorSplits(sentences):
         return sentences
 
 
+def JoinAuthorSpans(text, spans):
+    """
+    Join the `spans` of sentences in the `text` that were split wrongly in the
+    middle of lists of author names, returning the "joined" list of spans.
+
+    This is :func:`.JoinAuthorSplits` for ``(start, end)`` offsets; a joined
+    span covers both sentences and anything in between.
+    """
+    if any(AUTHOR_PATTERN_TAIL.search(text, start, end) for start, end in spans):
+        joined = []
+
+        for start, end in spans:
+            if joined and \
+               AUTHOR_PATTERN_TAIL.search(text, *joined[-1]) and \
+               AUTHOR_PATTERN_HEAD.search(text[start:end]):
+                joined[-1] = (joined[-1][0], end)
+            else:
+                joined.append((start, end))
+
+        return joined
+    else:
+        return spans
+
+
+def SegmentSpans(text, pst):
+    """
+    Segment the `text` into sentences, returning their ``(start, end)``
+    character offsets.
+
+    :param text: the string to segment
+    :param pst: a PunktSentenceTokenizer model instance
+    """
+    return JoinAuthorSpans(text, list(pst.span_tokenize(text)))
+
+
+def SegmentText(text, pst, namespace=SENTENCE):
+    """
+    Segment a :class:`fnl.text.text.Text` into sentences, adding them as tags
+    (with the ID "sentence") to the `namespace`.
+
+    :param text: the Text instance to segment
+    :param pst: a PunktSentenceTokenizer model instance
+    :param namespace: (optional) namespace of the sentence tags
+    :return: the list of ``(start, end)`` sentence spans
+    """
+    spans = SegmentSpans(str(text), pst)
+    text.addSpans(namespace, (SENTENCE,), repeat(0, len(spans)),
+                  (s for s, _ in spans), (e for _, e in spans))
+    return spans
+
+
 def SplitText(stream, pst):
     """
     Split the text on the input `stream` into sentences.
@@ -47,7 +182,7 @@ def SplitText(stream, pst):
     :param pst: a PunktSentenceTokenizer model instance
     """
     for text in stream:
-        for s in JoinAuthorSplits(pst.tokenize(text.strip())):
+        for s in _SplitLine(pst, text):
             print(s)
 
 
@@ -64,15 +199,206 @@ def SplitTextInColumn(stream, pst, column, sep='\t'):
     :param sep: (optional) column separator string to use
     """
     for text in stream:
-        items = text.strip('\r\n').split(sep)
-        prefix = sep.join(items[:column-1])
-        suffix = sep.join(items[column:])
-
         try:
-            sentences = JoinAuthorSplits(pst.tokenize(items[column-1].strip()))
+            rows = _SplitRow(pst, text, column, sep)
         except IndexError:
-            logging.critical('input has no column %s:\n%s', column, items)
+            logging.critical('input has no column %s:\n%s', column, text.strip('\r\n').split(sep))
             break
 
-        for idx, sent in enumerate(sentences):
-            print(sep.join((prefix, str(idx+1), sent, suffix)))
+        for row in rows:
+            print(row)
+
+
+def SplitTextParallel(stream, model, column=None, sep='\t', processes=None,
+                      chunksize=256, output=sys.stdout, prefilter=False):
+    """
+    Split the text on the input `stream` [in a particular `column`] into
+    sentences, using a pool of worker processes.
+
+    Each worker unpickles the Punkt `model` once and segments chunks of
+    `chunksize` input lines; the segmented chunks are written to the
+    `output` in input order, exactly as :func:`.SplitText` (if `column` is
+    ``None``) or :func:`.SplitTextInColumn` would print them. At most a few
+    chunks per process are read ahead, so the input is never loaded
+    into memory as a whole.
+
+    :param stream: iterable stream of text
+    :param model: path to a pickled PunktParameters model file
+    :param column: (optional) the column to split (1-based offset)
+    :param sep: (optional) column separator string to use
+    :param processes: number of worker processes (default: CPU count)
+    :param chunksize: number of input lines per worker task
+    :param output: the stream to write the sentences to
+    :param prefilter: wrap the model in a :class:`.PrefilteredTokenizer`
+    """
+    chunks = ((lines, column, sep) for lines in Chunks(stream, chunksize))
+
+    with Pool(processes, _InitSegmenter, (model, prefilter)) as pool:
+        for text, error in Imap(pool, processes, _SplitChunk, chunks):
+            output.write(text)
+
+            if error is not None:
+                logging.critical('input has no column %s:\n%s', column, error)
+                break
+
+
+def _SplitLine(pst, text):
+    return JoinAuthorSplits(pst.tokenize(text.strip()))
+
+
+def _SplitRow(pst, text, column, sep):
+    items = text.strip('\r\n').split(sep)
+    prefix = sep.join(items[:column-1])
+    suffix = sep.join(items[column:])
+    sentences = JoinAuthorSplits(pst.tokenize(items[column-1].strip()))
+    return [sep.join((prefix, str(idx+1), sent, suffix))
+            for idx, sent in enumerate(sentences)]
+
+
+def NewTrainer():
+    """Return a new PunktTrainer configured with the :data:`.TRAINER_SETTINGS`."""
+    trainer = PunktTrainer()
+
+    for name, value in TRAINER_SETTINGS.items():
+        setattr(trainer, name, value)
+
+    return trainer
+
+
+def MergeTrainers(trainer, other):
+    """
+    Merge the frequency distributions and parameters collected by the `other`
+    PunktTrainer into the `trainer`.
+
+    Counts are summed and the orthographic contexts combined; the
+    abbreviations of both are then reclassified with the merged counts.
+    Afterwards, the `trainer` needs to be finalized again.
+
+    :param trainer: the PunktTrainer to update
+    :param other: the PunktTrainer to merge
+    :return: the updated `trainer`
+    """
+    trainer._type_fdist.update(other._type_fdist)
+    trainer._collocation_fdist.update(other._collocation_fdist)
+    trainer._sent_starter_fdist.update(other._sent_starter_fdist)
+    trainer._num_period_toks += other._num_period_toks
+    trainer._sentbreak_count += other._sentbreak_count
+    params = trainer._params
+    params.abbrev_types.update(other._params.abbrev_types)
+
+    for typ, context in other._params.ortho_context.items():
+        params.ortho_context[typ] |= context
+
+    # pruned counts are kept under a None key
+    types = [t for t in trainer._type_fdist if t is not None]
+
+    for abbr, score, is_add in trainer._reclassify_abbrev_types(types):
+        if score >= trainer.ABBREV:
+            if is_add:
+                params.abbrev_types.add(abbr)
+        elif not is_add:
+            params.abbrev_types.discard(abbr)
+
+    trainer._finalized = False
+    return trainer
+
+
+def TrainPunkt(stream, processes=1, shard_size=10000, prune_every=None):
+    """
+    Train a Punkt model on the text lines from the input `stream`.
+
+    With more than one process, workers train new trainers on disjoint
+    shards of `shard_size` lines and their frequency distributions are
+    merged (see :func:`.MergeTrainers`) in order of the input. Each shard
+    starts with the abbreviations known when it was submitted, because the
+    collocation and sentence starter counts depend on them.
+    If `prune_every` is set, the trainer's ``freq_threshold`` is applied
+    after every so many lines (rounded up to whole shards if parallel) to
+    bound the size of the frequency distributions.
+
+    :param stream: iterable stream of text
+    :param processes: number of worker processes (``None``: CPU count)
+    :param shard_size: number of input lines per worker task
+    :param prune_every: number of lines between pruning the rare types
+    :return: the finalized PunktParameters
+    """
+    lines = 0
+    pruned = 0
+
+    if processes == 1:
+        trainer = NewTrainer()
+
+        for text in stream:
+            trainer.train(text, finalize=False)
+            lines += 1
+
+            if prune_every and lines - pruned >= prune_every:
+                trainer.freq_threshold()
+                pruned = lines
+    else:
+        trainer = None
+        abbrevs = frozenset()
+        # abbrevs is looked up as each shard is submitted
+        shards = ((text, abbrevs) for text in Chunks(stream, shard_size))
+
+        with Pool(processes) as pool:
+            for count, shard in Imap(pool, processes, _TrainShard, shards):
+                trainer = shard if trainer is None else MergeTrainers(trainer, shard)
+                abbrevs = frozenset(trainer._params.abbrev_types)
+                lines += count
+
+                if prune_every and lines - pruned >= prune_every:
+                    trainer.freq_threshold()
+                    pruned = lines
+
+        if trainer is None:
+            trainer = NewTrainer()
+
+    logging.info('trained on %s lines', lines)
+    trainer.finalize_training()
+    return trainer.get_params()
+
+
+def _TrainShard(lines, abbrevs):
+    trainer = NewTrainer()
+    trainer._params.abbrev_types.update(abbrevs)
+
+    for text in lines:
+        trainer.train(text, finalize=False)
+
+    return len(lines), trainer
+
+
+_SEGMENTER = None
+"""The PunktSentenceTokenizer used by a worker process."""
+
+
+def _InitSegmenter(model, prefilter):
+    global _SEGMENTER
+
+    with open(model, 'rb') as file:
+        _SEGMENTER = PunktSentenceTokenizer(pickle.load(file))
+
+    if prefilter:
+        _SEGMENTER = PrefilteredTokenizer(_SEGMENTER)
+
+
+def _SplitChunk(lines, column, sep):
+    # Segment a chunk of lines, returning the output text and the items of
+    # the first row without the column (if any; the text stops before it).
+    buffer = []
+
+    for text in lines:
+        if column is None:
+            buffer.extend(_SplitLine(_SEGMENTER, text))
+        else:
+            try:
+                buffer.extend(_SplitRow(_SEGMENTER, text, column, sep))
+            except IndexError:
+                return _Joined(buffer), text.strip('\r\n').split(sep)
+
+    return _Joined(buffer), None
+
+
+def _Joined(rows):
+    return '\n'.join(rows) + '\n' if rows else ''
@@ -660,12 +660,10 @@ def CategoryIter(string: str) -> iter:
     """
     char_iter = iter(string)
 
-    while True:
-        c = next(char_iter)
-
+    for c in char_iter:
         if '\ud800' <= c < '\udc00':
             # convert the surrogate pair to one single wide character
-            l = next(char_iter)
+            l = next(char_iter, '')
 
             if not '\udc00' <= l < '\ue000':
                 raise UnicodeError('low surrogate character missing')
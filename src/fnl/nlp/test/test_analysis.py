@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+from io import StringIO
+from unittest import main, TestCase
+
+from fnl.nlp.analysis import TextAnalytics
+from fnl.nlp.strtok import WordTokenizer
+from fnl.text.token import Token
+from fnl.utils.timing import Profile
+
+
+def T(word, pos='NN', chunk='B-NP', entity='O', stem=None):
+    return Token(word, word if stem is None else stem, pos, chunk, entity)
+
+
+class AlignmentTests(TestCase):
+
+    def setUp(self):
+        self.tokenizer = WordTokenizer(skipTags={'space'}, skipOrthos={'e'})
+        self.analytics = TextAnalytics(self.tokenizer, None)
+
+    def align(self, tags, text):
+        tokens = list(self.tokenizer.split(text))
+        return tokens, self.analytics._alignToTokens(tags, tokens)
+
+    def testSplitToken(self):
+        tokens, aligned = self.align([T('NF-kappaB', entity='B-gene'), T('.', '.', 'O')],
+                                     'NF-kappaB.')
+        self.assertListEqual(tokens, [t.word for t in aligned])
+        self.assertListEqual(['B-gene', 'I-gene', 'I-gene', 'O'], [t.entity for t in aligned])
+        self.assertListEqual(['B-NP', 'I-NP', 'I-NP', 'O'], [t.chunk for t in aligned])
+        self.assertEqual(1, self.analytics.alignment_stats.split)
+
+    def testJoinTags(self):
+        tokens, aligned = self.align([T('can', 'MD', 'B-VP'), T('not', 'RB', 'I-VP')], 'cannot')
+        self.assertListEqual([T('cannot', 'MD', 'B-VP')], aligned)
+        self.assertEqual(1, self.analytics.alignment_stats.joined)
+
+    def testContraction(self):
+        tags = [T('It', 'PRP'), T('does', 'VBZ', 'B-VP'), T("n't", 'RB', 'I-VP')]
+        tokens, aligned = self.align(tags, "It doesn't")
+        self.assertListEqual(tokens, [t.word for t in aligned])
+        self.assertListEqual(['VBZ', 'VBZ', 'VBZ'], [t.pos for t in aligned[1:]])
+        self.assertListEqual(['B-VP', 'I-VP', 'I-VP'], [t.chunk for t in aligned[1:]])
+
+    def testQuotes(self):
+        tags = [T('``', ':', 'O'), T('a'), T("''", ':', 'O')]
+        tokens, aligned = self.align(tags, '"a"')
+        self.assertListEqual(['"', 'a', '"'], [t.word for t in aligned])
+
+    def testUnidecodedTags(self):
+        tags = [T('Muller-cells'), T('in'), T('TNF-alpha')]
+        tokens, aligned = self.align(tags, 'Müller-cells in TNF–alpha')
+        self.assertListEqual(tokens, [t.word for t in aligned])
+        self.assertEqual('in', aligned[2].word)
+
+    def testDroppedDash(self):
+        tags = [T('10'), T('-', ':', 'O'), T('20'), T('-'), T('25')]
+        tokens, aligned = self.align(tags, '10 - 20 -25')
+        self.assertListEqual(['10', '20', '25'], [t.word for t in aligned])
+        self.assertEqual(2, self.analytics.alignment_stats.dropped)
+
+    def testRescue(self):
+        tokens, aligned = self.align([T('a', entity='B-gene'), T('b')], 'a \U0001F600 b')
+        self.assertListEqual(tokens, [t.word for t in aligned])
+        self.assertEqual('B-gene', aligned[1].entity)
+        self.assertEqual(1, self.analytics.alignment_stats.rescued)
+
+    def testFallback(self):
+        tags = [T('a'), T('b')]
+        self.assertRaises(Exception, self.align, tags, 'a c d')
+        self.assertEqual(1, self.analytics.alignment_stats.fallbacks)
+
+class EchoTagger:
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def send(self, text):
+        self.tokens = [T(w) for w in text.split()]
+
+
+class ProfileTests(TestCase):
+
+    def testStages(self):
+        profile = Profile(progress=0.0, stream=StringIO())
+        analytics = TextAnalytics(WordTokenizer(skipTags={'space'}), EchoTagger(),
+                                  profile=profile)
+
+        for dummy in range(2):
+            analytics.analyze('a b c')
+
+        self.assertSetEqual({'tokenize', 'pos', 'dictionary', 'normalize', 'sentences'},
+                            set(profile.stages))
+        self.assertEqual(2, profile['sentences'].calls)
+        self.assertEqual(6, profile['pos'].items)
+        self.assertEqual(2, sum(profile.asDict()['stages']['pos']['latency']['histogram'].values()))
+        self.assertTrue(profile.stream.getvalue().startswith('1 sentences in '))
+
+if __name__ == '__main__': main()
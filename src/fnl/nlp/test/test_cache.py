@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import os
+
+from tempfile import mkdtemp
+from unittest import main, TestCase
+
+from fnl.nlp.analysis import TextAnalytics
+from fnl.nlp.cache import AnalysisCache, TaggerVersion
+from fnl.nlp.strtok import WordTokenizer
+from fnl.text.token import Token
+
+
+class CountingTagger:
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = []
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def send(self, text):
+        self.calls += 1
+        self.tokens = [Token(w, w, 'NN', 'B-NP', 'O') for w in text.split()]
+
+
+class AnalysisCacheTests(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.path = os.path.join(self.dir, 'cache.db')
+        self.cache = AnalysisCache(self.path, version='v1', commit_every=1)
+        self.tokens = [[Token('p53', 'p53', 'NN', 'B-NP', 'B-gene')]]
+
+    def tearDown(self):
+        self.cache.close()
+        os.unlink(self.path)
+        os.rmdir(self.dir)
+
+    def testGetAndPut(self):
+        self.assertIsNone(self.cache.get('p53'))
+        self.cache.put('p53', self.tokens)
+        self.assertListEqual(self.tokens, self.cache.get('p53'))
+        self.assertIsInstance(self.cache.get('p53')[0][0], Token)
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(1, self.cache.stats.misses)
+        self.assertEqual(2, self.cache.stats.hits)
+
+    def testPersistence(self):
+        self.cache.put('p53', self.tokens)
+        self.cache.close()
+        self.cache = AnalysisCache(self.path, version='v1')
+        self.assertTrue('p53' in self.cache)
+        self.cache.close()
+        self.cache = AnalysisCache(self.path, version='v2')
+        self.assertFalse('p53' in self.cache)
+
+    def testEviction(self):
+        self.cache.max_size = 3
+
+        for i in range(3):
+            self.cache.put(str(i), self.tokens)
+
+        self.cache.get('0')
+        self.cache.put('3', self.tokens)
+        self.assertEqual(3, len(self.cache))
+        self.assertEqual(1, self.cache.stats.evictions)
+        self.assertTrue('0' in self.cache)
+        self.assertFalse('1' in self.cache)
+
+    def testReplaceDoesNotGrow(self):
+        self.cache.put('a', self.tokens)
+
+        for dummy in range(3):
+            self.cache.put('b', self.tokens)
+
+        self.assertEqual(2, len(self.cache))
+
+    def testTaggerVersion(self):
+        version = TaggerVersion(self.path, 'no-such-tagger')
+        path, _, mtime = version.split()[0].partition('@')
+        self.assertEqual(os.path.abspath(self.path), path)
+        self.assertTrue(mtime.isdigit())
+        self.assertEqual('no-such-tagger', version.split()[1])
+
+    def testHitRate(self):
+        self.cache.put('a', self.tokens)
+        self.cache.get('a')
+        self.cache.get('b')
+        self.assertEqual(0.5, self.cache.stats.asDict()['hit_rate'])
+
+    def testTextAnalytics(self):
+        tagger = CountingTagger()
+        analytics = TextAnalytics(WordTokenizer(skipTags={'space'}), tagger, cache=self.cache)
+        result = analytics.analyze('p53 binds DNA')
+        self.assertEqual(result, analytics.analyze('p53 binds DNA'))
+        self.assertEqual(1, tagger.calls)
+
+if __name__ == '__main__': main()
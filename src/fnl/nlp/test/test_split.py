@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import os
+import pickle
+
+from contextlib import redirect_stdout
+from io import StringIO
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import main, TestCase
+
+from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktTrainer
+
+from fnl.nlp.split import JoinAuthorSpans, JoinAuthorSplits, \
+        MergeTrainers, NewTrainer, PrefilteredTokenizer, SegmentSpans, \
+        SegmentText, SplitText, SplitTextInColumn, SplitTextParallel, \
+        TrainPunkt
+from fnl.text.text import Text
+
+TRAINING = "The protein binds to p53 in vitro. Dr. Smith et al. showed " \
+           "that e.g. the kinase activity is reduced. See Fig. 2 for the " \
+           "results. The cells were grown in medium. " * 50
+
+LINES = [
+    "The protein binds to p53. Dr. Smith showed that it is reduced.\n",
+    "Only one sentence here.\n",
+    "Smith, J. A. and Doe, B. reported it. It was confirmed.\n",
+] * 20
+
+SAMPLE = LINES[:3] + [
+    "", "  ", "A title without a terminal", "A title with a terminal.",
+    "  Leading and trailing space.  ", "Is it?! Yes.", "Why? Because.",
+    "See (Fig. 2.) The end", "x.)", "The end.\n", "Mr. Smith", "e.g. this",
+    "Nested (quote.\") and more", "A full stop\u3002Then more",
+    "Ends with two!!", "Trailing. ", "Dots... and more",
+]
+
+
+class UncallablePunkt(PunktSentenceTokenizer):
+
+    def tokenize(self, text):
+        raise AssertionError('Punkt called for ' + repr(text))
+
+    span_tokenize = tokenize
+
+
+class SplitTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        trainer = PunktTrainer()
+        trainer.train(TRAINING, finalize=True)
+        cls.params = trainer.get_params()
+        cls.dir = mkdtemp()
+        cls.model = os.path.join(cls.dir, 'punkt.pickle')
+
+        with open(cls.model, 'wb') as file:
+            pickle.dump(cls.params, file)
+
+    @classmethod
+    def tearDownClass(cls):
+        rmtree(cls.dir)
+
+    def setUp(self):
+        self.pst = PunktSentenceTokenizer(self.params)
+
+    def sequential(self, fun, *args, **kwds):
+        output = StringIO()
+
+        with redirect_stdout(output):
+            fun(*args, **kwds)
+
+        return output.getvalue()
+
+    def testJoinAuthorSplits(self):
+        self.assertEqual(['Smith, J. A. B. Doe reported it.'],
+                         JoinAuthorSplits(['Smith, J. A.', 'B. Doe reported it.']))
+
+    def testJoinAuthorSpans(self):
+        text = 'Smith, J. A.  B. Doe reported it. It was confirmed.'
+        self.assertEqual([(0, 33), (34, 51)],
+                         JoinAuthorSpans(text, [(0, 12), (14, 33), (34, 51)]))
+
+    def testSegmentSpans(self):
+        for line in LINES[:3]:
+            text = line.strip()
+            spans = SegmentSpans(text, self.pst)
+            self.assertEqual(JoinAuthorSplits(self.pst.tokenize(text)),
+                             [text[s:e] for s, e in spans])
+
+    def testSegmentText(self):
+        text = Text(LINES[0])
+        spans = SegmentText(text, self.pst)
+        self.assertEqual([(0, 25), (26, 62)], spans)
+        self.assertEqual(['The protein binds to p53.',
+                          'Dr. Smith showed that it is reduced.'],
+                         [t.text for t in text.iter('sentence')])
+        self.assertEqual([('sentence', 'sentence', (0, 25)),
+                          ('sentence', 'sentence', (26, 62))],
+                         [tag for tag, _ in text.get('sentence')])
+
+    def testPrefilterParity(self):
+        prefiltered = PrefilteredTokenizer(self.pst)
+
+        for text in SAMPLE:
+            self.assertEqual(self.pst.tokenize(text), prefiltered.tokenize(text))
+            self.assertEqual(list(self.pst.span_tokenize(text)),
+                             list(prefiltered.span_tokenize(text)))
+
+    def testPrefilterSkipsPunkt(self):
+        prefiltered = PrefilteredTokenizer(UncallablePunkt(self.params))
+
+        for text in ("", "A title", " A title. ", "Why?\n"):
+            self.assertEqual(self.pst.tokenize(text), prefiltered.tokenize(text))
+
+        self.assertRaises(AssertionError, prefiltered.tokenize, "A. Title")
+
+    def testPrefilteredParallel(self):
+        expected = self.sequential(SplitText, SAMPLE * 3, self.pst)
+        output = StringIO()
+        SplitTextParallel(SAMPLE * 3, self.model, processes=2, chunksize=5,
+                          output=output, prefilter=True)
+        self.assertEqual(expected, output.getvalue())
+
+    def testMergeTrainers(self):
+        lines = TRAINING.replace('results. ', 'results.\n').splitlines(True)
+        trainer, left, right = NewTrainer(), NewTrainer(), NewTrainer()
+
+        for idx, text in enumerate(lines):
+            trainer.train(text, finalize=False)
+            (left if idx % 2 else right).train(text, finalize=False)
+
+        merged = MergeTrainers(left, right)
+        self.assertEqual(trainer._type_fdist, merged._type_fdist)
+        self.assertEqual(trainer._num_period_toks, merged._num_period_toks)
+        self.assertEqual(trainer._params.abbrev_types, merged._params.abbrev_types)
+
+    def testTrainPunktInShards(self):
+        lines = TRAINING.replace('results. ', 'results.\n').splitlines(True) * 10
+        expected = TrainPunkt(lines)
+        self.assertTrue({'al', 'dr', 'e.g', 'fig'} <= expected.abbrev_types)
+
+        for prune_every in (None, 50):
+            params = TrainPunkt(lines, processes=2, shard_size=7,
+                                prune_every=prune_every)
+
+            for name in ('abbrev_types', 'collocations', 'sent_starters'):
+                self.assertEqual(getattr(expected, name), getattr(params, name))
+
+    def testSplitText(self):
+        output = self.sequential(SplitText, LINES[:2], self.pst)
+        self.assertEqual(['The protein binds to p53.',
+                          'Dr. Smith showed that it is reduced.',
+                          'Only one sentence here.'],
+                         output.splitlines())
+
+    def testSplitTextParallel(self):
+        expected = self.sequential(SplitText, LINES, self.pst)
+        output = StringIO()
+        SplitTextParallel(LINES, self.model, processes=2, chunksize=7, output=output)
+        self.assertEqual(expected, output.getvalue())
+
+    def testSplitTextInColumnParallel(self):
+        lines = ['{}\t{}\tx'.format(i, l) for i, l in enumerate(LINES)]
+        expected = self.sequential(SplitTextInColumn, lines, self.pst, 2)
+        output = StringIO()
+        SplitTextParallel(lines, self.model, 2, processes=2, chunksize=7, output=output)
+        self.assertEqual(expected, output.getvalue())
+
+    def testParallelStopsAtMissingColumn(self):
+        lines = ['0\tA sentence.\n', 'only\n', '2\tNever seen.\n']
+        output = StringIO()
+        SplitTextParallel(lines, self.model, 2, processes=2, chunksize=1, output=output)
+        self.assertEqual('0\t1\tA sentence.\t\n', output.getvalue())
+
+
+if __name__ == '__main__':
+    main()
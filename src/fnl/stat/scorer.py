@@ -0,0 +1,245 @@
+"""
+.. py:module:: fnl.stat.scorer
+   :synopsis: Compact, memory-mapped linear models for fast scoring.
+
+A fitted sklearn pipeline of a vectorizer, optional feature selection
+steps, and a linear classifier can be exported to a directory with
+:func:`.ExportLinearModel`. Near-zero coefficients are pruned, and the
+remaining features are stored as a sorted array of 64-bit key hashes
+(``keys.npy``) with their weights (``weights.npy``) next to the intercepts,
+classes, and vectorizer settings (``model.json``)::
+
+    ExportLinearModel(pipeline, 'model')
+    scorer = LinearScorer('model')
+    scorer.decision({'gene-count': 2, 'binds': 1})  # for dict features
+    scorer.decision(['gene', 'binds', 'promoter'])  # for token lists
+    scorer.predict(scorer.analyze('a gene binds the promoter'))  # for text
+
+Loading a model only maps the two arrays into memory, and scoring an
+instance only looks up its features, without any vectorizer transforms.
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import json
+import os
+
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+from fnl.stat.sketch import Hashes
+
+KEYS = 'keys.npy'
+WEIGHTS = 'weights.npy'
+META = 'model.json'
+
+ANALYZER_PARAMS = ('analyzer', 'lowercase', 'ngram_range', 'stop_words',
+                   'strip_accents', 'token_pattern')
+"""The (JSON-serializable) settings of a text vectorizer's analyzer."""
+
+
+def Keys(features) -> np.ndarray:
+    """Return the 64-bit (murmur3) hash keys of a sequence of feature names."""
+    h1, h2 = Hashes(features)
+    return (h1.astype(np.uint64) << np.uint64(32)) | h2.astype(np.uint64)
+
+
+def _FeatureNames(vectorizer) -> np.ndarray:
+    if hasattr(vectorizer, 'feature_names_'):
+        names = vectorizer.feature_names_
+    elif hasattr(vectorizer, 'vocabulary_'):
+        names = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    else:
+        raise ValueError('vectorizer {} has no vocabulary'.format(
+            vectorizer.__class__.__name__
+        ))
+
+    return np.array(names, dtype=object)
+
+
+def _VectorizerSettings(vectorizer) -> dict:
+    if hasattr(vectorizer, 'feature_names_'):
+        return {'input': 'dict', 'separator': vectorizer.separator}
+
+    params = vectorizer.get_params()
+    settings = {'input': 'text', 'binary': params['binary']}
+
+    for name in ANALYZER_PARAMS:
+        value = params[name]
+
+        if name == 'stop_words' and value is not None and not isinstance(value, str):
+            value = sorted(value)
+        elif name == 'ngram_range':
+            value = list(value)
+
+        settings[name] = value
+
+    if not isinstance(settings['analyzer'], str) or \
+            params['preprocessor'] is not None or params['tokenizer'] is not None:
+        raise ValueError('cannot export a custom analyzer, preprocessor, or tokenizer')
+
+    return settings
+
+
+def ExportLinearModel(pipeline, directory:str, threshold:float=1e-6) -> int:
+    """
+    Export a fitted `pipeline` to `directory`, pruning all features with
+    coefficients no larger than `threshold` (in absolute terms), and return
+    the number of features kept.
+
+    The first step of the pipeline must be a ``DictVectorizer`` or
+    ``CountVectorizer`` (or a subclass), the last a linear classifier (with
+    ``coef_`` and ``intercept_``), and any steps in between must be feature
+    selectors (with ``get_support``).
+
+    :raise ValueError: If the pipeline cannot be expressed as a linear model.
+    """
+    steps = [step for _, step in pipeline.steps]
+    vectorizer, classifier = steps[0], steps[-1]
+    settings = _VectorizerSettings(vectorizer)
+    names = _FeatureNames(vectorizer)
+
+    for step in steps[1:-1]:
+        if not hasattr(step, 'get_support'):
+            raise ValueError('cannot export a pipeline with a {} step'.format(
+                step.__class__.__name__
+            ))
+
+        names = names[step.get_support()]
+
+    if not hasattr(classifier, 'coef_'):
+        raise ValueError('{} is not a linear classifier'.format(
+            classifier.__class__.__name__
+        ))
+
+    coef = classifier.coef_
+    coef = coef.toarray() if sp.issparse(coef) else np.asarray(coef)
+    coef = np.atleast_2d(coef)
+
+    if coef.shape[1] != len(names):
+        raise ValueError('classifier has {} coefficients for {} features'.format(
+            coef.shape[1], len(names)
+        ))
+
+    keep = np.abs(coef).max(axis=0) > threshold
+    keys = Keys(names[keep])
+    order = np.argsort(keys)
+    keys = keys[order]
+
+    if len(keys) and (keys[1:] == keys[:-1]).any():
+        raise ValueError('hash collision between two feature names')
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    np.save(os.path.join(directory, KEYS), keys)
+    np.save(os.path.join(directory, WEIGHTS), coef[:, keep].T[order].astype(np.float32))
+    settings['classes'] = np.asarray(classifier.classes_).tolist()
+    settings['intercept'] = np.atleast_1d(classifier.intercept_).astype(float).tolist()
+
+    with open(os.path.join(directory, META), 'w') as f:
+        json.dump(settings, f, indent=1, sort_keys=True)
+
+    return len(keys)
+
+
+class LinearScorer:
+    """
+    Score instances with a linear model exported by :func:`.ExportLinearModel`.
+
+    Instances are given as feature dictionaries (for models of a
+    ``DictVectorizer``) or as lists of tokens (for models of a
+    ``CountVectorizer``); features not in the model are ignored.
+    """
+
+    def __init__(self, directory:str, mmap:bool=True):
+        """
+        :param directory: The directory the model was exported to.
+        :param mmap: Memory-map the keys and weights instead of reading them.
+        """
+        mode = 'r' if mmap else None
+        self.keys = np.load(os.path.join(directory, KEYS), mmap_mode=mode)
+        self.weights = np.load(os.path.join(directory, WEIGHTS), mmap_mode=mode)
+
+        with open(os.path.join(directory, META)) as f:
+            self.settings = json.load(f)
+
+        self.classes = self.settings['classes']
+        self.intercept = np.array(self.settings['intercept'])
+        self._analyzer = None
+
+    def __repr__(self) -> str:
+        return '<{} {} features, classes={}>'.format(
+            LinearScorer.__name__, len(self.keys), self.classes
+        )
+
+    def analyze(self, text:str) -> list:
+        """Tokenize a `text` into features as the model's ``CountVectorizer`` did."""
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            params = dict((name, self.settings[name]) for name in ANALYZER_PARAMS)
+            params['ngram_range'] = tuple(params['ngram_range'])
+            self._analyzer = CountVectorizer(**params).build_analyzer()
+
+        return self._analyzer(text)
+
+    def _counts(self, instance) -> (list, list):
+        # The feature names and their values of a single instance.
+        if isinstance(instance, dict):
+            sep = self.settings.get('separator', '=')
+            names, values = [], []
+
+            for f, v in instance.items():
+                if isinstance(v, str):
+                    f = '{}{}{}'.format(f, sep, v)
+                    v = 1
+
+                names.append(f)
+                values.append(v)
+
+            return names, values
+
+        counts = Counter(instance)
+
+        if self.settings.get('binary'):
+            return list(counts), [1] * len(counts)
+
+        return list(counts), list(counts.values())
+
+    def decision(self, instance):
+        """
+        Return the decision value of an `instance` (feature dictionary or
+        token list): a float for binary models, or an array with one value
+        per class otherwise.
+        """
+        names, values = self._counts(instance)
+        scores = self.intercept.copy()
+
+        if names and len(self.keys):
+            keys = Keys(names)
+            idx = np.searchsorted(self.keys, keys)
+            idx[idx == len(self.keys)] = 0
+            found = self.keys[idx] == keys
+
+            if found.any():
+                scores += np.dot(np.array(values, dtype=np.float64)[found],
+                                 self.weights[idx[found]])
+
+        return scores[0] if len(scores) == 1 else scores
+
+    def decisions(self, instances) -> np.ndarray:
+        """Return the decision values of a sequence of `instances`."""
+        return np.array([self.decision(i) for i in instances])
+
+    def predict(self, instance):
+        """Return the predicted class of an `instance`."""
+        score = self.decision(instance)
+
+        if np.ndim(score) == 0:
+            return self.classes[1] if score > 0 else self.classes[0]
+
+        return self.classes[int(np.argmax(score))]
@@ -0,0 +1,97 @@
+"""
+.. py:module:: fnl.stat.sketch
+   :synopsis: Approximate frequency counts of strings in constant memory.
+
+A count-min sketch counts (string) keys in a fixed table of ``depth`` rows
+of ``width`` counters; the estimated count of a key is the minimum over its
+counter in each row. Estimates are never too low, and with a probability of
+at least ``1 - 0.5 ** depth``, too high by no more than ``2 / width`` times
+the total of all counts::
+
+    sketch = CountMinSketch(1 << 20)
+    sketch.add(Hashes(['a', 'b', 'a']))
+    sketch.estimate(Hashes(['a', 'c']))  # array([2, 0])
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import numpy as np
+
+from sklearn.utils import murmurhash3_32
+
+
+def Hashes(keys) -> (np.ndarray, np.ndarray):
+    """
+    Return two arrays of independent, positive 32-bit (murmur3) hash values
+    for a sequence of (string) `keys`.
+
+    The first hash can be used directly as a (feature) index of the key;
+    both together yield the row indices of a :class:`.CountMinSketch`.
+    """
+    n = len(keys)
+    h1 = np.fromiter((murmurhash3_32(k, 0, True) for k in keys), np.int64, n)
+    h2 = np.fromiter((murmurhash3_32(k, 1, True) for k in keys), np.int64, n)
+    return h1, h2
+
+
+class CountMinSketch:
+    """
+    A count-min sketch of ``depth`` rows with ``width`` 32-bit counters each.
+
+    Keys are given as their :func:`.Hashes`; the counter in each row is chosen
+    by double hashing, so only two hash values are needed per key.
+    """
+
+    def __init__(self, width:int=1 << 20, depth:int=4):
+        """
+        :param width: The number of counters per row.
+        :param depth: The number of rows (i.e., hash functions).
+        """
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self.total = 0
+
+    def __repr__(self) -> str:
+        return '<{} {}x{} total={}>'.format(
+            CountMinSketch.__name__, self.depth, self.width, self.total
+        )
+
+    def _columns(self, hashes) -> np.ndarray:
+        # The counter indices of each key (columns) in each row (rows).
+        h1, h2 = hashes
+        rows = np.arange(self.depth, dtype=np.int64)[:, np.newaxis]
+        return (h1 + rows * (h2 | 1)) % self.width
+
+    def add(self, hashes, count:int=1):
+        """
+        Add a *count* for each key given by its `hashes`.
+
+        If the same key is given several times, it is counted each time.
+        """
+        rows = np.arange(self.depth)[:, np.newaxis]
+        np.add.at(self.table, (rows, self._columns(hashes)), count)
+        self.total += count * len(hashes[0])
+
+    def estimate(self, hashes) -> np.ndarray:
+        """
+        Return the estimated counts of the keys given by their `hashes`.
+        """
+        rows = np.arange(self.depth)[:, np.newaxis]
+        return self.table[rows, self._columns(hashes)].min(axis=0)
+
+    def merge(self, other):
+        """
+        Add the counts of an `other` sketch of the same size to this sketch.
+
+        :raise ValueError: If the sketches differ in width or depth.
+        """
+        if self.table.shape != other.table.shape:
+            raise ValueError('cannot merge a {}x{} sketch into a {}x{} sketch'.format(
+                other.depth, other.width, self.depth, self.width
+            ))
+
+        self.table += other.table
+        self.total += other.total
+        return self
@@ -0,0 +1,109 @@
+from fnl.stat.scorer import ExportLinearModel, LinearScorer
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import main, TestCase
+
+import numpy as np
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.feature_selection import SelectKBest, chi2
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+__author__ = 'Florian Leitner'
+
+TEXTS = [
+    'the gene binds the promoter',
+    'a protein binds the gene promoter',
+    'the gene regulates the target',
+    'cells grow in the dish',
+    'the dish is on the table',
+    'cells and tables and dishes',
+]
+LABELS = [1, 1, 1, 0, 0, 0]
+DICTS = [
+    {'gene-count': 2, 'binds': 1, 'kind': 'a'},
+    {'gene-count': 1, 'binds': 2, 'kind': 'a'},
+    {'gene-count': 3, 'kind': 'b'},
+    {'cells': 1, 'kind': 'c'},
+    {'dish': 2, 'kind': 'c'},
+    {'cells': 1, 'dish': 1, 'kind': 'b'},
+]
+
+
+class LinearScorerTests(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def export(self, pipeline, X, y, **kwargs):
+        pipeline.fit(X, y)
+        ExportLinearModel(pipeline, self.dir, **kwargs)
+        return LinearScorer(self.dir)
+
+    def testDictFeatures(self):
+        pipeline = Pipeline([('extractor', DictVectorizer()),
+                             ('classifier', LogisticRegression())])
+        scorer = self.export(pipeline, DICTS, LABELS)
+        instances = DICTS + [{'kind': 'x', 'unknown': 1}]
+        expected = pipeline.decision_function(instances)
+        self.assertTrue(np.allclose(expected, scorer.decisions(instances), atol=1e-5))
+        self.assertEqual(list(pipeline.predict(DICTS)),
+                         [scorer.predict(d) for d in DICTS])
+
+    def testTextWithFeatureSelection(self):
+        pipeline = Pipeline([('extract', CountVectorizer(ngram_range=(1, 2),
+                                                         stop_words=['the', 'a'])),
+                             ('select', SelectKBest(chi2, k=5)),
+                             ('classifier', LogisticRegression())])
+        scorer = self.export(pipeline, TEXTS, LABELS)
+        self.assertEqual(5, len(scorer.keys))
+        tokens = [scorer.analyze(t) for t in TEXTS]
+        self.assertTrue(np.allclose(pipeline.decision_function(TEXTS),
+                                    scorer.decisions(tokens), atol=1e-5))
+
+    def testMultiClass(self):
+        labels = ['x', 'x', 'y', 'z', 'z', 'y']
+        pipeline = Pipeline([('extract', CountVectorizer(binary=True)),
+                             ('classifier', LogisticRegression())])
+        scorer = self.export(pipeline, TEXTS, labels)
+        self.assertEqual(['x', 'y', 'z'], scorer.classes)
+        tokens = [scorer.analyze(t) for t in TEXTS]
+        self.assertTrue(np.allclose(pipeline.decision_function(TEXTS),
+                                    scorer.decisions(tokens), atol=1e-5))
+        self.assertEqual(list(pipeline.predict(TEXTS)),
+                         [scorer.predict(t) for t in tokens])
+
+    def testPruning(self):
+        pipeline = Pipeline([('extract', CountVectorizer()),
+                             ('classifier', LogisticRegression())])
+        pipeline.fit(TEXTS, LABELS)
+        n_features = len(pipeline.named_steps['extract'].vocabulary_)
+        coef = np.abs(pipeline.named_steps['classifier'].coef_[0])
+        threshold = np.median(coef)
+        kept = ExportLinearModel(pipeline, self.dir, threshold=threshold)
+        self.assertEqual((coef > threshold).sum(), kept)
+        self.assertLess(kept, n_features)
+        self.assertEqual(kept, len(LinearScorer(self.dir, mmap=False).weights))
+
+    def testEmptyModel(self):
+        pipeline = Pipeline([('extract', CountVectorizer()),
+                             ('classifier', LogisticRegression())])
+        scorer = self.export(pipeline, TEXTS, LABELS, threshold=np.inf)
+        self.assertEqual(0, len(scorer.keys))
+        intercept = pipeline.named_steps['classifier'].intercept_[0]
+        self.assertAlmostEqual(intercept, scorer.decision(['gene']))
+
+    def testNonLinearPipeline(self):
+        pipeline = Pipeline([('extract', CountVectorizer()),
+                             ('transform', TfidfTransformer()),
+                             ('classifier', LogisticRegression())])
+        pipeline.fit(TEXTS, LABELS)
+        self.assertRaises(ValueError, ExportLinearModel, pipeline, self.dir)
+
+
+if __name__ == '__main__':
+    main()
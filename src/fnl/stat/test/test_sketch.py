@@ -0,0 +1,63 @@
+from collections import Counter
+from fnl.stat.sketch import CountMinSketch, Hashes
+from unittest import main, TestCase
+
+import numpy as np
+
+__author__ = 'Florian Leitner'
+
+
+class HashesTests(TestCase):
+
+    def testTwoPositiveHashesPerKey(self):
+        h1, h2 = Hashes(['a', 'b', 'a'])
+        self.assertEqual(3, len(h1))
+        self.assertEqual(h1[0], h1[2])
+        self.assertNotEqual(h1[0], h1[1])
+        self.assertNotEqual(h1[0], h2[0])
+        self.assertTrue((h1 >= 0).all() and (h2 >= 0).all())
+
+    def testNoKeys(self):
+        h1, h2 = Hashes([])
+        self.assertEqual(0, len(h1))
+        self.assertEqual(0, len(h2))
+
+
+class CountMinSketchTests(TestCase):
+
+    def testExactCountsWithoutCollisions(self):
+        sketch = CountMinSketch(1 << 16)
+        sketch.add(Hashes(['a', 'b', 'a']))
+        sketch.add(Hashes(['a']), count=2)
+        self.assertEqual([4, 1, 0], list(sketch.estimate(Hashes(['a', 'b', 'c']))))
+        self.assertEqual(5, sketch.total)
+
+    def testNeverUnderestimates(self):
+        keys = ['w{}'.format(i % 997) for i in range(20000)]
+        counts = Counter(keys)
+        sketch = CountMinSketch(256, depth=4)
+        sketch.add(Hashes(keys))
+        unique = sorted(counts)
+        estimates = sketch.estimate(Hashes(unique))
+        expected = np.array([counts[k] for k in unique])
+        self.assertTrue((estimates >= expected).all())
+        # the deeper sketch is at least as accurate as a single row
+        single = CountMinSketch(256, depth=1)
+        single.add(Hashes(keys))
+        self.assertLessEqual((estimates - expected).sum(),
+                             (single.estimate(Hashes(unique)) - expected).sum())
+
+    def testMerge(self):
+        left, right = CountMinSketch(64), CountMinSketch(64)
+        left.add(Hashes(['a', 'b']))
+        right.add(Hashes(['a']))
+        left.merge(right)
+        self.assertEqual([2, 1], list(left.estimate(Hashes(['a', 'b']))))
+        self.assertEqual(3, left.total)
+
+    def testMergeRequiresSameShape(self):
+        self.assertRaises(ValueError, CountMinSketch(64).merge, CountMinSketch(32))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,480 @@
+from fnl.stat.sketch import Hashes
+from fnl.stat.textclass import \
+    asDict, CachedData, Data, featureDicts, sentenceChunks, Fold, interleave, \
+    IncrementalClassify, ReadInstances, Classify, fitFold, Digest, GridSearch, \
+    Scorer, Predict, PredictStream, HashedNames, HashingMinFreqVectorizer, \
+    MinFreqDictVectorizer, Report, maskLines
+from fnl.text.sentence import SentenceParser
+from ast import literal_eval
+from contextlib import redirect_stdout
+from io import StringIO
+from random import Random
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import main, TestCase
+
+import os
+import re
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.cross_validation import StratifiedKFold
+from sklearn.externals import joblib
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.grid_search import ParameterGrid
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+__author__ = 'Florian Leitner'
+
+WORDS = ('gene', 'binds', 'activates', 'the', 'promoter', 'of', 'target',
+         'cells', 'grow', 'in', 'a', 'dish', 'protein', 'expression')
+
+
+def Dicts(n, seed=1):
+    """Return `n` random feature dictionaries with string and numeric values."""
+    rng = Random(seed)
+    return [dict(('f%d' % rng.randint(0, 100), rng.choice([1, 2, 'a', 'b', 0.5]))
+                 for _ in range(rng.randint(0, 12))) for _ in range(n)]
+
+
+def Texts(n, seed=1, words=WORDS):
+    """Return `n` random, ID-prefixed plain-text lines of `words`."""
+    rng = Random(seed)
+    return ['{}\t{}'.format(i, ' '.join(rng.choice(words) for _ in range(rng.randint(3, 9))))
+            for i in range(n)]
+
+
+TEXT_GROUPS = (['%s\n' % l for l in Texts(60, 1, WORDS[5:])],
+               ['%s\n' % l for l in Texts(35, 2, WORDS[:9])])
+
+
+def BioNer(n, seed=1):
+    """Return the lines of `n` random BIO-NER sentences with two ID columns."""
+    rng = Random(seed)
+    lines = []
+
+    for idx in range(n):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 9))]
+
+        for i, w in enumerate(words):
+            lines.append('\t'.join((
+                'doc%d' % (idx // 10), str(idx % 10), w, w, 'NN' if i % 2 else 'VBZ',
+                'B-NP', 'B-gene' if w == 'gene' else 'O',
+                'B-FACTOR' if i == 0 else 'O', 'B-TARGET' if i == len(words) - 1 else 'O'
+            )) + '\n')
+
+        lines.append('\n')
+
+    return lines
+
+
+def Output(fun, *args, **kwargs):
+    """Return the result of calling `fun` and what it printed."""
+    with redirect_stdout(StringIO()) as stream:
+        result = fun(*args, **kwargs)
+
+    return result, stream.getvalue()
+
+
+class GroupFiles:
+    """Write the `groups` (lists of lines) to files in a temporary directory."""
+
+    def setUpGroups(self, *groups):
+        self.dir = mkdtemp()
+        self.paths = []
+
+        for num, lines in enumerate(groups):
+            self.paths.append(os.path.join(self.dir, 'group%d' % num))
+
+            with open(self.paths[-1], 'w') as f:
+                f.writelines(lines)
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def data(self, **options):
+        files = [open(path) for path in self.paths]
+
+        try:
+            return Data(*files, **options)
+        finally:
+            for f in files:
+                f.close()
+
+
+class MinFreqDictVectorizerTests(TestCase):
+
+    def setUp(self):
+        self.dicts = Dicts(300) + [{}]
+
+    def testFitTransformMatchesFitAndTransform(self):
+        for min_freq in (1, 2, 5, 20, 1000):
+            expected = MinFreqDictVectorizer(min_freq=min_freq).fit(self.dicts)
+            vectorizer = MinFreqDictVectorizer(min_freq=min_freq)
+            result = vectorizer.fit_transform(self.dicts)
+            self.assertEqual(expected.feature_names_, vectorizer.feature_names_)
+            self.assertEqual(expected.vocabulary_, vectorizer.vocabulary_)
+            self.assertEqual(0, (expected.transform(self.dicts) != result).nnz)
+
+    def testDenseFitTransform(self):
+        expected = MinFreqDictVectorizer(min_freq=3, sparse=False).fit(self.dicts)
+        result = MinFreqDictVectorizer(min_freq=3, sparse=False).fit_transform(self.dicts)
+        self.assertIsInstance(result, np.ndarray)
+        self.assertTrue(np.array_equal(expected.transform(self.dicts), result))
+
+    def testJoinedNamesCountOncePerInstance(self):
+        dicts = [{'a': 'b=c', 'a=b': 'c'}, {'a=b=c': 1, 'd': 2}, {'d': 1}]
+        expected = MinFreqDictVectorizer(min_freq=2).fit(dicts)
+        vectorizer = MinFreqDictVectorizer(min_freq=2)
+        result = vectorizer.fit_transform(dicts)
+        self.assertEqual(['a=b=c', 'd'], expected.feature_names_)
+        self.assertEqual(expected.feature_names_, vectorizer.feature_names_)
+        self.assertTrue(np.array_equal(expected.transform(dicts).toarray(), result.toarray()))
+        self.assertEqual([], MinFreqDictVectorizer(min_freq=3).fit(dicts).feature_names_)
+        vectorizer = MinFreqDictVectorizer(min_freq=3)
+        self.assertEqual((3, 0), vectorizer.fit_transform(dicts).shape)
+
+    def testNoFeatures(self):
+        vectorizer = MinFreqDictVectorizer()
+        self.assertEqual((2, 0), vectorizer.fit_transform([{}, {}]).shape)
+        self.assertEqual([], vectorizer.feature_names_)
+
+
+class HashingMinFreqVectorizerTests(TestCase):
+
+    def setUp(self):
+        self.dicts = Dicts(300)
+
+    def assertHashed(self, expected, names, hashing, matrix):
+        # compare the hashed columns to a vocabulary's (collision-free) columns
+        columns = Hashes(names)[0] % hashing.n_features
+        self.assertEqual(len(columns), len(set(columns)))
+        self.assertEqual(expected.nnz, matrix.nnz)
+        self.assertTrue(np.array_equal(expected.toarray(), matrix[:, columns].toarray()))
+
+    def testMatchesMinFreqDictVectorizer(self):
+        for min_freq in (1, 3, 20):
+            vectorizer = MinFreqDictVectorizer(min_freq=min_freq).fit(self.dicts)
+            hashing = HashingMinFreqVectorizer(min_freq=min_freq)
+            self.assertHashed(vectorizer.transform(self.dicts), vectorizer.feature_names_,
+                              hashing, hashing.fit_transform(self.dicts))
+
+    def testMatchesCountVectorizer(self):
+        texts = Texts(200)
+        vectorizer = CountVectorizer(min_df=3)
+        expected = vectorizer.fit_transform(texts)
+        names = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        hashing = HashingMinFreqVectorizer(min_freq=3, vectorizer=CountVectorizer())
+        self.assertHashed(expected, names, hashing, hashing.fit_transform(texts))
+
+    def testFitTransformMatchesFitAndTransform(self):
+        hashing = HashingMinFreqVectorizer(min_freq=3)
+        expected = hashing.fit(self.dicts).transform(self.dicts)
+        self.assertEqual(0, (expected != hashing.fit_transform(self.dicts)).nnz)
+
+    def testPartialFitMatchesFit(self):
+        expected = HashingMinFreqVectorizer(min_freq=3).fit_transform(self.dicts)
+        hashing = HashingMinFreqVectorizer(min_freq=3)
+        hashing.partial_fit(self.dicts[:100]).partial_fit(self.dicts[100:])
+        self.assertEqual(0, (expected != hashing.transform(self.dicts)).nnz)
+
+    def testSketchWidthIsBounded(self):
+        hashing = HashingMinFreqVectorizer(n_features=1 << 31, min_freq=3,
+                                           sketch_width=1 << 10).fit(self.dicts)
+        self.assertEqual((4, 1 << 10), hashing.sketch_.table.shape)
+        hashing = HashingMinFreqVectorizer(n_features=1 << 8, min_freq=3).fit(self.dicts)
+        self.assertEqual((4, 1 << 8), hashing.sketch_.table.shape)
+        self.assertIsNone(HashingMinFreqVectorizer(1 << 31).fit(self.dicts).sketch_)
+
+    def testHashedNames(self):
+        names = HashingMinFreqVectorizer(n_features=10).get_feature_names()
+        self.assertEqual(10, len(names))
+        self.assertEqual('#3', names[3])
+        self.assertEqual('#9', names[np.int64(-1)])
+        self.assertEqual(['#0', '#9'], list(names[[0, -1]]))
+        self.assertEqual(['#7', '#8', '#9'], list(names[7:]))
+        self.assertEqual(['#1'], list(names[np.arange(10) == 1]))
+        self.assertEqual([], list(names[[]]))
+        self.assertRaises(IndexError, names.__getitem__, 10)
+
+    def testHashedNamesOfManyFeatures(self):
+        names = HashedNames(1 << 31)
+        self.assertEqual('#2147483647', names[-1])
+        self.assertEqual(['#5', '#0'], list(names[np.array([5, 0])]))
+
+
+class BioNerDataTests(GroupFiles, TestCase):
+
+    def setUp(self):
+        self.setUpGroups(BioNer(40, 1), BioNer(25, 2))
+        self.chunk_size = Data.CHUNK_SIZE
+        Data.CHUNK_SIZE = 7
+
+    def tearDown(self):
+        Data.CHUNK_SIZE = self.chunk_size
+        GroupFiles.tearDown(self)
+
+    def testParallelMatchesSequentialFeatureDicts(self):
+        data = self.data(columns=2)
+        ids, instances = [], []
+
+        for path in reversed(self.paths):  # the minority group first
+            with open(path) as f:
+                for sid, sentence in SentenceParser(f, ('FACTOR', 'TARGET'), id_columns=2):
+                    ids.append(sid)
+                    instances.append(asDict(sentence))
+
+        self.assertEqual(65, len(data.instances))
+        self.assertEqual(ids, list(data.ids))
+        self.assertEqual(instances, list(data.instances))
+        self.assertEqual([25, 40], data.sizes)
+
+    def testSingleChunkMatchesChunks(self):
+        expected = self.data(columns=2)
+        Data.CHUNK_SIZE = 1000
+        data = self.data(columns=2)
+        self.assertEqual(list(expected.ids), list(data.ids))
+        self.assertEqual(list(expected.instances), list(data.instances))
+        self.assertEqual([], featureDicts([], 2, 2))
+
+    def testChunksMatchAllLines(self):
+        lines = BioNer(20)
+        chunks = list(sentenceChunks(lines, 3))
+        self.assertEqual(7, len(chunks))
+        self.assertEqual(lines, [l for c in chunks for l in c])
+        self.assertEqual(featureDicts(lines, 2, 2),
+                         [d for c in chunks for d in featureDicts(c, 2, 2)])
+
+
+class IncrementalClassifyTests(GroupFiles, TestCase):
+
+    REPORT = Report(False, 0, 0, False, False, True, 3)
+
+    def setUp(self):
+        self.setUpGroups(*TEXT_GROUPS)
+
+    def testFold(self):
+        folds = [Fold(i, 3) for i in range(100)]
+        self.assertEqual(folds, [Fold(str(i), 3) for i in range(100)])
+        self.assertEqual({0, 1, 2}, set(folds))
+
+    def testInterleave(self):
+        self.assertEqual(list('adebfc'), list(interleave([iter('abc'), iter('d'), iter('ef')])))
+        self.assertEqual([], list(interleave([])))
+
+    def testFinalModelMatchesBatchModel(self):
+        for min_freq in (1, 3):
+            data = self.data()
+            vectorizer = HashingMinFreqVectorizer(1 << 10, min_freq, vectorizer=CountVectorizer())
+            expected = MultinomialNB().fit(vectorizer.fit_transform(data.instances), data.labels)
+            vectorizer = HashingMinFreqVectorizer(1 << 10, min_freq, vectorizer=CountVectorizer())
+            final, output = Output(IncrementalClassify, self.paths, vectorizer, MultinomialNB(),
+                                   self.REPORT, batch_size=7)
+            self.assertEqual(list(expected.class_count_), list(final.class_count_))
+            self.assertTrue(np.array_equal(expected.feature_count_, final.feature_count_))
+            self.assertIn('F1-score', output)
+
+
+    def testEmptyFoldsAreSkipped(self):
+        paths = []
+
+        for num, words in enumerate((WORDS[5:], WORDS[:9])):
+            paths.append(os.path.join(self.dir, 'small%d' % num))
+
+            with open(paths[-1], 'w') as f:
+                f.writelines('%s\n' % l for l in Texts(3, num, words))
+
+        vectorizer = HashingMinFreqVectorizer(1 << 10, vectorizer=CountVectorizer())
+        report = Report(False, 0, 0, False, False, False, 20)
+
+        with self.assertLogs(level='WARNING') as logs:
+            output = Output(IncrementalClassify, paths, vectorizer, MultinomialNB(), report)[1]
+
+        self.assertTrue(logs.output)
+        self.assertNotIn('nan', output)
+
+    def testReadInstancesMatchesData(self):
+        for lines in (['a b\n', '1\tc d\n', '2\te\n'], ['1\ta b\n', 'c d\n', '2\te\n']):
+            with open(self.paths[0], 'w') as f:
+                f.writelines(lines)
+
+            data = self.data()
+            ids, instances = zip(*ReadInstances(self.paths[0]))
+            self.assertEqual(list(data.ids[:3]), list(ids))
+            self.assertEqual(list(data.instances[:3]), list(instances))
+
+
+class ClassifyTests(GroupFiles, TestCase):
+
+    REPORT = Report(False, 0, 0, False, False, True, 3)
+
+    def setUp(self):
+        self.setUpGroups(*TEXT_GROUPS)
+        self.data = self.data().extract(CountVectorizer())
+
+    def testFitFoldOfMappedFeatures(self):
+        path = os.path.join(self.dir, 'features.pkl')
+        joblib.dump(self.data.features, path)
+        train, test = np.arange(0, 95, 2), np.arange(1, 95, 2)
+        expected = fitFold(MultinomialNB(), self.data.features, self.data.labels, train, test)
+        result = fitFold(MultinomialNB(), path, self.data.labels, train, test, keep=False)
+        self.assertIsNone(result[0])
+        self.assertTrue(np.array_equal(expected[1], result[1]))
+
+    def testParallelMatchesSequentialFolds(self):
+        results = []
+
+        for n_jobs in (1, 2):
+            classifier = LogisticRegression()
+            np.random.seed(1)  # the same shuffled folds
+            results.append((classifier, Output(Classify, self.data, classifier,
+                                               self.REPORT, n_jobs=n_jobs)[1]))
+
+        (sequential, expected), (parallel, output) = results
+        self.assertEqual(expected, output)
+        self.assertTrue(np.allclose(sequential.coef_, parallel.coef_))
+
+
+class GridSearchTests(GroupFiles, TestCase):
+
+    REPORT = Report(False, 0, 0, False, False, False, 3)
+    PARAMETERS = {
+        'extract__min_df': [1, 3],
+        'extract__binary': [False, True],
+        'classifier__C': [0.1, 10.0],
+    }
+
+    def setUp(self):
+        self.setUpGroups(*TEXT_GROUPS)
+        self.data = self.data()
+        self.pipeline = Pipeline([('extract', CountVectorizer()),
+                                  ('classifier', LogisticRegression())])
+
+    def search(self, cache=None):
+        # the best score and parameters printed by GridSearch
+        output = Output(GridSearch, self.data, self.pipeline, self.PARAMETERS,
+                        self.REPORT, cache=cache)[1].splitlines()
+        self.assertTrue(output[1].startswith('best score: '))
+        params = dict(line.split(':\t') for line in output[2:])
+        return float(output[1][12:]), dict((k, literal_eval(v)) for k, v in params.items())
+
+    def testMatchesSequentialSearch(self):
+        instances, labels = self.data.instances, self.data.labels
+        cross_val = list(StratifiedKFold(labels, n_folds=self.REPORT.folds))
+        scores = {}
+
+        for params in ParameterGrid(self.PARAMETERS):
+            weighted = 0.0
+
+            for train, test in cross_val:
+                pipeline = clone(self.pipeline).set_params(**params)
+                pipeline.fit([instances[i] for i in train], labels[train])
+                weighted += len(test) * Scorer(pipeline, [instances[i] for i in test],
+                                               labels[test])
+
+            scores[tuple(sorted(params.items()))] = weighted / len(labels)
+
+        best_score, best_params = self.search()
+        self.assertAlmostEqual(max(scores.values()), best_score)
+        self.assertAlmostEqual(best_score, scores[tuple(sorted(best_params.items()))])
+
+    def testCachedFeaturesMatch(self):
+        expected = self.search()
+        cache = os.path.join(self.dir, 'cache')
+        self.assertEqual(expected, self.search(cache))
+        self.assertTrue(os.listdir(cache))
+        self.assertEqual(expected, self.search(cache))
+
+    def testDigest(self):
+        instances, labels = list(self.data.instances), self.data.labels
+        expected = Digest(instances, labels)
+        self.assertEqual(expected, Digest(list(instances), labels.copy()))
+        self.assertNotEqual(expected, Digest(instances[:-1] + ['x'], labels))
+        self.assertNotEqual(expected, Digest(instances, labels[::-1]))
+        self.assertNotEqual(Digest([{'a': 1}], [0]), Digest([{'a': 2}], [0]))
+
+
+class PredictStreamTests(GroupFiles, TestCase):
+
+    def setUp(self):
+        self.setUpGroups(*TEXT_GROUPS)
+        self.data = self.data()
+        self.pipeline = Pipeline([('extract', CountVectorizer()),
+                                  ('classifier', LogisticRegression())])
+        self.pipeline.fit(self.data.instances, self.data.labels)
+        self.model = os.path.join(self.dir, 'model.pkl')
+        joblib.dump(self.pipeline, self.model)
+
+    def testMatchesPredict(self):
+        expected = Output(Predict, self.data, self.pipeline)[1]
+        self.assertEqual(95, len(expected.splitlines()))
+        paths = list(reversed(self.paths))  # in the order of Data
+
+        for n_jobs in (1, 2):
+            output = StringIO()
+            PredictStream(paths, self.model, output=output, chunk_size=7, n_jobs=n_jobs)
+            self.assertEqual(expected, output.getvalue())
+
+
+class CachedDataTests(GroupFiles, TestCase):
+
+    def setUp(self):
+        self.setUpGroups(*TEXT_GROUPS)
+
+    def assertSameData(self, expected, data):
+        self.assertEqual(0, (expected.features != data.features).nnz)
+        self.assertTrue(np.array_equal(expected.labels, data.labels))
+        self.assertEqual(list(expected.ids), list(data.ids))
+        self.assertEqual(list(expected.names), list(data.names))
+        self.assertEqual(expected.classes, data.classes)
+
+    def testSaveAndLoad(self):
+        vectorizer = CountVectorizer()
+        expected = self.data().extract(vectorizer)
+        directory = os.path.join(self.dir, 'data')
+        expected.save(directory, vectorizer)
+        data, vectorizer = Data.load(directory)
+        self.assertSameData(expected, data)
+        self.assertIsNone(data.instances)
+        self.assertEqual(0, (expected.features != vectorizer.transform(expected.instances)).nnz)
+
+    def testCachedDataMatchesExtractedData(self):
+        cache = os.path.join(self.dir, 'cache')
+        expected = self.data(decap=True).extract(CountVectorizer())
+
+        for cached in (False, True):
+            data, vectorizer = CachedData(cache, self.paths, CountVectorizer(), decap=True)
+            self.assertSameData(expected, data)
+            self.assertEqual(cached, data.instances is None)
+            self.assertEqual(1, len(os.listdir(cache)))
+
+        CachedData(cache, self.paths, CountVectorizer(binary=True), decap=True)
+        CachedData(cache, self.paths, CountVectorizer())
+        self.assertEqual(3, len(os.listdir(cache)))
+
+
+class MaskLinesTests(GroupFiles, TestCase):
+
+    PATTERNS = re.compile(r'\b(gene|protein|target)\b')
+
+    def setUp(self):
+        self.setUpGroups(*TEXT_GROUPS)
+
+    def testMatchesSequentialSubstitution(self):
+        lines = Texts(100)
+        expected = [(l, self.PATTERNS.sub('MASK', l)) for l in lines]
+        self.assertEqual(expected, list(maskLines(iter(lines), self.PATTERNS, 'MASK', 7, 2)))
+        self.assertEqual([], list(maskLines(iter([]), self.PATTERNS, 'MASK', 7, 2)))
+
+    def testMaskedData(self):
+        data = self.data(patterns=self.PATTERNS, mask='MASK')
+        expected = self.data()
+        self.assertEqual(expected.raw, data.raw)
+        self.assertEqual([self.PATTERNS.sub('MASK', l) for l in expected.instances],
+                         list(data.instances))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,24 +6,40 @@
 .. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
 """
 
-from collections import defaultdict, namedtuple, Counter
-from itertools import chain
+import hashlib
+import json
+import logging
+import os
+import sys
+
+from array import array
+from collections import defaultdict, deque, namedtuple, Counter
+from itertools import chain, islice
 from functools import partial
+from multiprocessing import Pool
+from shutil import rmtree
+from tempfile import mkdtemp
+from zlib import crc32
 
 import numpy as np
+import scipy.sparse as sp
 
 from sklearn import metrics
+from sklearn.base import BaseEstimator, TransformerMixin, clone
 from sklearn.externals import joblib, six
 from sklearn.cross_validation import StratifiedKFold
 from sklearn.externals.joblib import delayed
 from sklearn.feature_extraction import DictVectorizer
-from sklearn.grid_search import GridSearchCV
+from sklearn.grid_search import ParameterGrid
+from sklearn.pipeline import Pipeline
 
 # Note: the minority label (always first, i.e., at index 0)
 # should be used as the positive label to ensure
 # precision and recall produce meaningful results
 # and that the F-score is robust.
+from fnl.stat.sketch import CountMinSketch, Hashes
 from fnl.text.sentence import SentenceParser, Sentence
+from fnl.utils.pool import Chunks, Imap
 
 
 METRICS = [
@@ -194,11 +210,77 @@ UNMASK = frozenset({
 Report = namedtuple('Report',
                     'parameters top worst fn fp classification folds')
 
+# Stand-in for the Data instance when reporting features of streamed data.
+FeatureNames = namedtuple('FeatureNames', 'names')
+
 
 def subAll(patterns, mask, lines):
     return [patterns.sub(mask, line) for line in lines]
 
 
+def maskLines(lines, patterns, mask, size, processes=None):
+    """
+    Yield ``(line, masked line)`` pairs for all `lines` in order, replacing
+    the regex `patterns` with the `mask` in contiguous chunks of `size`
+    lines in a pool of worker `processes` (default: CPU count).
+    """
+    chunks = deque()
+
+    def tasks():
+        for chunk in Chunks(lines, size):
+            chunks.append(chunk)
+            yield chunk,
+
+    with Pool(processes, initMasker, (patterns, mask)) as pool:
+        for masked in Imap(pool, processes, maskChunk, tasks()):
+            yield from zip(chunks.popleft(), masked)
+
+
+# The patterns and mask used by maskChunk (in each worker process).
+_masker = None
+
+
+def initMasker(patterns, mask):
+    global _masker
+    _masker = (patterns, mask)
+
+
+def maskChunk(lines):
+    return subAll(_masker[0], _masker[1], lines)
+
+
+def sentenceChunks(lines, size):
+    """Yield lists of `lines` with `size` (blank line terminated) sentences each."""
+    chunk = []
+    count = 0
+
+    for line in lines:
+        chunk.append(line)
+
+        if not line.strip():
+            count += 1
+
+            if count >= size:
+                yield chunk
+                chunk = []
+                count = 0
+
+    if chunk:
+        yield chunk
+
+
+def featureDicts(lines, columns, ngrams):
+    """Parse the sentences in `lines` and convert them with :func:`.asDict`."""
+    # FIXME: instead of two hardcoded entity masks,
+    # FIXME: this has to be dynamic or generic...
+    sentences = SentenceParser(lines, ('FACTOR', 'TARGET'), id_columns=columns)
+
+    if not columns:
+        return [asDict(s, ngrams) for s in sentences]
+    else:
+        return [(sid, asDict(s, ngrams)) for sid, s in sentences]
+
+
 def asDict(sentence: Sentence, ngrams=2):
     """Convert a :class:`fnl.text.sentence.Sentence` into a feature dictionary."""
     d = {'gene-count': sentence.countEntity('B-gene')}
@@ -214,8 +296,7 @@ def asDict(sentence: Sentence, ngrams=2):
 
     while ngrams > 1:
         ngrams =- 1
-        tokens = Counter('{} {}'.format(s, g) for s, g in zip(stems, gram[1:]))
-        d.update(tokens)
+        d.update(Counter(map('{} {}'.format, stems, gram[1:])))
 
     return d
 
@@ -226,6 +307,9 @@ class Data:
     """
     # FIXME: this class is coder's hell...
 
+    CHUNK_SIZE = 1000
+    """Number of BIO-NER sentences converted per parallel task."""
+
     def __init__(self, *files, columns=None, ngrams=2, decap=False, patterns=None, mask=None):
         """
         Create a new data object with the following attributes:
@@ -251,38 +335,46 @@ class Data:
         """
         try:
             if columns is None:
-                inputs = [[l.strip('\r\n') for l in f] for f in files]
+                self.instances = []
 
-                if decap:
-                    for i in range(len(inputs)):
-                        inputs[i] = ["{}{}".format(l[0].lower(), l[1:])
-                                     for l in inputs[i] if len(l)]
-
-                if patterns and mask:
-                    self.instances = []
-                    splits = joblib.cpu_count()
-
-                    for lines in inputs:
-                        jobs = tuple(lines[i::splits] for i in range(splits))
-                        jobs = joblib.Parallel(n_jobs=splits)(
-                            delayed(subAll)(patterns, mask, lines) for lines in jobs
-                        )
-                        self.instances.append(list(zip(lines, chain(*jobs))))
-                else:
-                    self.instances = [list(zip(lines, lines)) for lines in inputs]
+                for f in files:
+                    lines = (l.strip('\r\n') for l in f)
+
+                    if decap:
+                        lines = ("{}{}".format(l[0].lower(), l[1:]) for l in lines if len(l))
+
+                    if patterns and mask:
+                        self.instances.append(list(maskLines(lines, patterns, mask,
+                                                             Data.CHUNK_SIZE)))
+                    else:
+                        self.instances.append([(l, l) for l in lines])
 
             else:
                 self.instances = []
 
+                n_jobs = joblib.cpu_count()
+
                 for f in files:
-                    # FIXME: instead of two hardcoded entity masks,
-                    # FIXME: this has to be dynamic or generic...
-                    sentences = SentenceParser(f, ('FACTOR', 'TARGET'), id_columns=columns)
+                    chunks = sentenceChunks(f, Data.CHUNK_SIZE)
+                    first = next(chunks, [])
+                    second = next(chunks, None)
+
+                    if second is None:
+                        # a single chunk is not worth starting a pool
+                        chunks = [featureDicts(first, columns, ngrams)]
+                    else:
+                        # parse and convert chunks of sentences in parallel,
+                        # reading the file only as fast as the workers go
+                        chunks = joblib.Parallel(n_jobs=n_jobs, pre_dispatch='2*n_jobs')(
+                            delayed(featureDicts)(lines, columns, ngrams)
+                            for lines in chain((first, second), chunks)
+                        )
+
+                    data = list(chain.from_iterable(chunks))
 
                     if not columns:
-                        sentences = list(enumerate(sentences, start=1))
+                        data = list(enumerate(data, start=1))
 
-                    data = [(sid, asDict(s, ngrams)) for sid, s in sentences]
                     self.instances.append(data)
         except UnicodeDecodeError as e:
             import sys
@@ -315,7 +407,8 @@ class Data:
     def extract(self, vectorizer):
         """Extract the features from the instances using a Vectorizer."""
         self.features = vectorizer.fit_transform(self.instances, self.labels)
-        self.names = np.asarray(vectorizer.get_feature_names())
+        names = vectorizer.get_feature_names()
+        self.names = names if isinstance(names, HashedNames) else np.asarray(names)
         return self
 
     def transform(self, method):
@@ -323,6 +416,32 @@ class Data:
         self.features = method.fit_transform(self.features, self.labels)
         return self
 
+    def save(self, directory, vectorizer):
+        """
+        Store the extracted features (as a sparse ``.npz`` matrix), labels,
+        IDs, and names, together with the fitted `vectorizer`, in `directory`.
+        """
+        os.makedirs(directory)
+        sp.save_npz(os.path.join(directory, 'features.npz'), sp.csr_matrix(self.features))
+        np.save(os.path.join(directory, 'labels.npy'), self.labels)
+        joblib.dump({'classes': self.classes, 'ids': self.ids, 'names': self.names},
+                    os.path.join(directory, 'meta.pkl'))
+        joblib.dump(vectorizer, os.path.join(directory, 'vectorizer.pkl'))
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Restore the data object (without its raw instances) and the fitted
+        vectorizer stored in `directory` by :meth:`.save`.
+        """
+        data = cls.__new__(cls)
+        data.features = sp.load_npz(os.path.join(directory, 'features.npz'))
+        data.labels = np.load(os.path.join(directory, 'labels.npy'))
+        data.__dict__.update(joblib.load(os.path.join(directory, 'meta.pkl')))
+        data.instances = None
+        data.raw = None
+        return data, joblib.load(os.path.join(directory, 'vectorizer.pkl'))
+
     @property
     def n_features(self):
         """The number of features."""
@@ -346,6 +465,70 @@ class Data:
         return [counter[l] for l in sorted(counter.keys())]
 
 
+def CachedData(directory, paths, vectorizer, **options):
+    """
+    Return a :class:`.Data` object for the group files at `paths` with the
+    features extracted by the `vectorizer`, and the fitted vectorizer.
+
+    Both are loaded from a subdirectory of the cache `directory` named after
+    a hash of the contents of the files, the `options` for :class:`.Data`,
+    and the vectorizer's settings, or extracted and stored there if missing.
+    """
+    key = hashlib.sha1()
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                key.update(block)
+
+        key.update(b'\0')
+
+    settings = dict(options)
+
+    if settings.get('patterns') is not None:
+        settings['patterns'] = settings['patterns'].pattern
+
+    settings = [vectorizer.__class__.__name__, settings, vectorizer.get_params()]
+    key.update(json.dumps(settings, sort_keys=True, default=_setting).encode('utf-8'))
+    cache = os.path.join(directory, key.hexdigest())
+
+    if os.path.isdir(cache):
+        return Data.load(cache)
+
+    files = [open(path) for path in paths]
+
+    try:
+        data = Data(*files, **options)
+    finally:
+        for f in files:
+            f.close()
+
+    data.extract(vectorizer)
+    # store atomically, in case another run fills the same cache entry
+    os.makedirs(directory, exist_ok=True)
+    tmp = mkdtemp(dir=directory)
+    data.save(os.path.join(tmp, 'data'), vectorizer)
+
+    try:
+        os.rename(os.path.join(tmp, 'data'), cache)
+    except OSError:
+        pass  # already cached by another run
+    finally:
+        rmtree(tmp)
+
+    return data, vectorizer
+
+
+def _setting(value):
+    # A JSON- and hash-stable representation of a vectorizer setting.
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    elif hasattr(value, 'get_params'):
+        return value.__class__.__name__  # its parameters are included, too
+    else:
+        return repr(value)
+
+
 class MinFreqDictVectorizer(DictVectorizer):
     """
     Add `text.CountVectorizer` min. document frequency filtering ability to the `DictVectorizer`.
@@ -359,9 +542,15 @@ class MinFreqDictVectorizer(DictVectorizer):
         features = defaultdict(int)
 
         for x in X:
+            names = set()
+
             for f, v in six.iteritems(x):
                 if isinstance(v, six.string_types):
                     f = "%s%s%s" % (f, self.separator, v)
+                names.add(f)
+
+            # count document frequencies, even if two keys join to one name
+            for f in names:
                 features[f] += 1
 
         if self.min_freq > 1:
@@ -374,15 +563,468 @@ class MinFreqDictVectorizer(DictVectorizer):
         self.feature_names_ = feature_names
         return self
 
+    def fit_transform(self, X, y=None):
+        """
+        Fit and transform `X` in a single pass: while accumulating the CSR
+        matrix, features get provisional column ids in order of appearance;
+        at the end, the columns below `min_freq` are dropped and the others
+        reordered to the (sorted) vocabulary.
+        """
+        provisional = {}
+        indices = array('l')
+        values = array('d')
+        indptr = array('l', [0])
+
+        for x in X:
+            for f, v in six.iteritems(x):
+                if isinstance(v, six.string_types):
+                    f = "%s%s%s" % (f, self.separator, v)
+                    v = 1
+
+                try:
+                    indices.append(provisional[f])
+                except KeyError:
+                    indices.append(len(provisional))
+                    provisional[f] = len(provisional)
+
+                values.append(v)
+
+            indptr.append(len(indices))
+
+        matrix = sp.csr_matrix((np.array(values, dtype=np.float64),
+                                np.array(indices, dtype=np.intp),
+                                np.array(indptr, dtype=np.intp)),
+                               shape=(len(indptr) - 1, len(provisional)))
+        # two keys might join to the same name: count each column once per row
+        matrix.sum_duplicates()
+        df = np.bincount(matrix.indices, minlength=len(provisional))
+        feature_names = sorted(f for f, i in six.iteritems(provisional)
+                               if df[i] >= self.min_freq)
+        columns = [provisional[f] for f in feature_names]
+        del provisional
+        result = matrix[:, columns].astype(self.dtype)
+        self.vocabulary_ = dict((f, i) for i, f in enumerate(feature_names))
+        self.feature_names_ = feature_names
+        return result if self.sparse else result.toarray()
+
+
+class HashingMinFreqVectorizer(BaseEstimator, TransformerMixin):
+    """
+    Hash features to `n_features` columns, dropping features seen in less than
+    `min_freq` documents, without holding a vocabulary in memory.
+
+    The instances are either plain text, tokenized with the analyzer of an
+    (unfitted) `text.CountVectorizer` given as the `vectorizer`, or feature
+    dictionaries (as for the `DictVectorizer`) if no `vectorizer` is given.
+
+    The document frequencies are approximated with a
+    :class:`fnl.stat.sketch.CountMinSketch` of `depth` rows of (at most)
+    `sketch_width` counters, so features might be kept although they are
+    (slightly) rarer than `min_freq`, but frequent features are never
+    dropped. Fitting takes one pass over the instances.
+    """
+
+    def __init__(self, n_features=1 << 20, min_freq=1, depth=4,
+                 vectorizer=None, separator='=', sketch_width=1 << 22):
+        self.n_features = n_features
+        self.min_freq = min_freq
+        self.depth = depth
+        self.sketch_width = sketch_width
+        self.vectorizer = vectorizer
+        self.separator = separator
+
+    def _features(self, X):
+        # Yield the feature names and values (lists) of each instance in X.
+        if self.vectorizer is not None:
+            analyze = self.vectorizer.build_analyzer()
+            binary = self.vectorizer.binary
+
+            for x in X:
+                counts = Counter(analyze(x))
+                yield list(counts.keys()), [1 if binary else c for c in counts.values()]
+        else:
+            for x in X:
+                names, values = [], []
+
+                for f, v in six.iteritems(x):
+                    if isinstance(v, six.string_types):
+                        names.append("%s%s%s" % (f, self.separator, v))
+                        values.append(1)
+                    else:
+                        names.append(f)
+                        values.append(v)
+
+                yield names, values
+
+    def _hash(self, X, sketch=None):
+        # Hash the features of all instances, adding their (unique) names to
+        # the sketch, if any, and returning the hashes and values per row.
+        rows = []
+
+        for names, values in self._features(X):
+            h1, h2 = Hashes(names)
+            rows.append((h1, h2, np.asarray(values, dtype=np.float64)))
+
+            if sketch is not None:
+                sketch.add((h1, h2))
+
+        return rows
+
+    def _matrix(self, rows):
+        # Build a CSR matrix from the hashed rows, pruning rare features.
+        indptr = [0]
+        indices = [np.zeros(0, dtype=np.int64)]
+        data = [np.zeros(0)]
+
+        sketch = getattr(self, 'sketch_', None)
+
+        for h1, h2, values in rows:
+            if sketch is not None and len(values):
+                keep = sketch.estimate((h1, h2)) >= self.min_freq
+                h1, values = h1[keep], values[keep]
+
+            indices.append(h1 % self.n_features)
+            data.append(values)
+            indptr.append(indptr[-1] + len(values))
+
+        X = sp.csr_matrix((np.concatenate(data), np.concatenate(indices), indptr),
+                          shape=(len(rows), self.n_features))
+        X.sum_duplicates()
+        return X
+
+    def _sketch(self):
+        if self.min_freq > 1:
+            return CountMinSketch(min(self.n_features, self.sketch_width), self.depth)
+        else:
+            return None
+
+    def fit(self, X, y=None):
+        self.sketch_ = self._sketch()
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """
+        Add the document frequencies of the features in `X` to the sketch;
+        an unfitted vectorizer does not prune any features at all.
+        """
+        if not hasattr(self, 'sketch_'):
+            self.sketch_ = self._sketch()
+
+        if self.sketch_ is not None:
+            for names, _ in self._features(X):
+                self.sketch_.add(Hashes(names))
+
+        return self
+
+    def fit_transform(self, X, y=None):
+        self.sketch_ = self._sketch()
+        return self._matrix(self._hash(X, self.sketch_))
+
+    def transform(self, X, y=None):
+        return self._matrix(self._hash(X))
+
+    def get_feature_names(self):
+        """The feature names are the (hash) column numbers: "#0", "#1", ..."""
+        return HashedNames(self.n_features)
+
+
+class HashedNames:
+    """
+    The feature names of hashed features, "#<column>", created only when
+    indexed (like a `numpy` array), instead of millions of strings at once.
+    """
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+
+    def __len__(self):
+        return self.n_features
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return '#%d' % range(self.n_features)[idx]
+        elif isinstance(idx, slice):
+            columns = range(self.n_features)[idx]
+        else:
+            columns = np.asarray(idx)
+
+            if columns.dtype == bool:
+                columns = np.flatnonzero(columns)
+            else:
+                columns = np.where(columns < 0, columns + self.n_features, columns)
+
+        return np.array(['#%d' % c for c in columns], dtype=object)
+
+
+def CountInstances(path, columns=None):
+    """Count the instances (lines or BIO-NER sentences) in the file at `path`."""
+    with open(path) as f:
+        if columns is None:
+            return sum(1 for _ in f)
+
+        count = 0
+        inside = False
+
+        for line in f:
+            if line.strip():
+                inside = True
+            elif inside:
+                count += 1
+                inside = False
+
+        return count + inside
+
+
+def ReadInstances(path, columns=None, ngrams=2, decap=False, patterns=None, mask=None):
+    """
+    Yield the ``(id, instance)`` pairs in the file at `path` one at a time,
+    as :class:`.Data` would extract them (see there for the parameters).
+    """
+    with open(path) as f:
+        if columns is None:
+            split = None
+
+            for line in f:
+                line = line.strip('\r\n')
+
+                if decap:
+                    if not line:
+                        continue
+
+                    line = "{}{}".format(line[0].lower(), line[1:])
+
+                if split is None:
+                    # as Data, use the first column as ID if the first line has one
+                    split = '\t' in line
+
+                instance = patterns.sub(mask, line) if patterns and mask else line
+                yield line.split('\t', 1)[0] if split else line, instance
+        else:
+            for num, sentence in enumerate(SentenceParser(f, ('FACTOR', 'TARGET'),
+                                                          id_columns=columns), start=1):
+                if columns:
+                    sid, sentence = sentence
+                    yield '\t'.join(sid), asDict(sentence, ngrams)
+                else:
+                    yield num, asDict(sentence, ngrams)
+
+
+def Fold(instance_id, folds):
+    """Assign an instance to one of the CV `folds` by hashing its ID."""
+    return crc32(str(instance_id).encode('utf-8')) % folds
+
+
+def interleave(iterators):
+    """Yield the items of all `iterators` in turns until all are exhausted."""
+    iterators = list(iterators)
+
+    while iterators:
+        for it in list(iterators):
+            try:
+                yield next(it)
+            except StopIteration:
+                iterators.remove(it)
+
+
+def IncrementalClassify(groups, vectorizer, classifier, report, batch_size=1000,
+                        **options):
+    """
+    Evaluate a `classifier` that supports ``partial_fit`` with cross-validation
+    on instances streamed from the `groups` files, producing output as given
+    by `report`, and return the classifier trained on all instances.
+
+    Instances are read from all groups in turns, vectorized with a stateless
+    (hashing) `vectorizer` in mini-batches of `batch_size`, and assigned to
+    folds by hashing their IDs (see :func:`.Fold`), so memory use does not
+    depend on the size of the input. If the `vectorizer` prunes rare
+    features, a first pass fills its sketch. Folds without any test
+    instances are skipped (with a warning). The `options` are passed on to
+    :func:`.ReadInstances`.
+    """
+    sizes = [CountInstances(path, options.get('columns')) for path in groups]
+    # ensure the minority label(s) come first, as in Data
+    paths = [groups[i] for i in sorted(range(len(groups)), key=lambda i: sizes[i])]
+    classes = np.arange(len(paths))
+    models = [clone(classifier) for _ in range(report.folds)]
+    final = clone(classifier)
+
+    def labeled(label, path):
+        for iid, instance in ReadInstances(path, **options):
+            yield label, iid, instance
+
+    def batches():
+        stream = interleave(labeled(label, path) for label, path in enumerate(paths))
+
+        for batch in iter(lambda: list(islice(stream, batch_size)), []):
+            labels, ids, instances = zip(*batch)
+            folds = np.fromiter((Fold(i, report.folds) for i in ids), np.int_, len(ids))
+            yield np.asarray(labels, dtype=np.uint8), ids, folds, instances
+
+    if getattr(vectorizer, 'min_freq', 1) > 1:
+        for _, _, _, instances in batches():
+            vectorizer.partial_fit(instances)
+
+    for labels, _, folds, instances in batches():
+        X = vectorizer.transform(instances)
+        final.partial_fit(X, labels, classes)
+
+        for step, model in enumerate(models):
+            train = folds != step
+
+            if train.any():
+                model.partial_fit(X[train], labels[train], classes)
+
+    # confusion counts per fold instead of all predictions
+    confusion = np.zeros((report.folds, len(classes), len(classes)), dtype=np.int64)
+
+    for labels, ids, folds, instances in batches():
+        X = vectorizer.transform(instances)
+
+        for step, model in enumerate(models):
+            test = np.flatnonzero(folds == step)
+
+            if not len(test):
+                continue
+
+            predictions = model.predict(X[test])
+            np.add.at(confusion[step], (labels[test], predictions), 1)
+
+            for idx, target, prediction in zip(test, labels[test], predictions):
+                if target != prediction:
+                    if target == 0 and report.fn:
+                        print("FN:", ids[idx])
+                    elif target != 0 and report.fp:
+                        print("FP:", ids[idx])
+
+    # folds without any test instances cannot be scored
+    evaluated = [step for step in range(report.folds) if confusion[step].any()]
+
+    for step in range(report.folds):
+        if step not in evaluated:
+            logging.warning('skipping fold %d: it has no test instances', step + 1)
+
+    results = {}
+    scores = {n: np.zeros(len(evaluated)) for n, f in METRICS}
+    results[classifier.__class__.__name__] = scores
+    targets, predictions = np.divmod(np.arange(len(classes) ** 2), len(classes))
+
+    for idx, step in enumerate(evaluated):
+        weights = confusion[step].ravel()
+
+        for measure, scoring_function in METRICS:
+            if len(classes) > 2 and measure == 'MCC score':
+                scores[measure][idx] = 0.0
+            else:
+                scores[measure][idx] = scoring_function(
+                    targets, predictions, sample_weight=weights
+                )
+
+        if report.classification:
+            print(metrics.classification_report(targets, predictions,
+                                                sample_weight=weights))
+
+    if (report.top or report.worst):
+        print()
+        PrintFeatures(final, FeatureNames(vectorizer.get_feature_names()), report)
+
+    print()
+    EvaluationReport(results)
+    return final
+
+
+def extractFold(steps, parameters, instances, labels, train, test, digest=None):
+    """
+    Fit the feature extraction `steps` (a pipeline without the classifier)
+    with `parameters` to the `train` instances, returning the transformed
+    train and `test` matrices.
+
+    The `digest` of the instances and labels (see :func:`.Digest`) is not
+    used here, but keys the cached results instead of the instances.
+    """
+    steps = clone(steps).set_params(**parameters)
+    X_train = steps.fit_transform([instances[i] for i in train], labels[train])
+    return X_train, steps.transform([instances[i] for i in test])
 
-def GridSearch(data, pipeline, parameters, report):
-    """Do a gird search for the `parameters` of a `pipeline`."""
-    grid = GridSearchCV(pipeline, parameters, scoring=Scorer,
-                        cv=report.folds, refit=False, n_jobs=4, verbose=1)
-    grid.fit(data.instances, data.labels)
 
-    print("best score:", grid.best_score_)
-    for name, value in grid.best_params_.items():
+def Digest(instances, labels):
+    """Return a (SHA-1) hex digest of the `instances` and their `labels`."""
+    key = hashlib.sha1()
+
+    for instance in instances:
+        key.update(json.dumps(instance, sort_keys=True).encode('utf-8'))
+        key.update(b'\n')
+
+    key.update(np.asarray(labels).tobytes())
+    return key.hexdigest()
+
+
+def scoreFold(classifier, parameters, X_train, y_train, X_test, y_test):
+    """Fit a `classifier` with `parameters` and return its test set score."""
+    classifier = clone(classifier).set_params(**parameters)
+    classifier.fit(X_train, y_train)
+    return Scorer(classifier, X_test, y_test)
+
+
+def GridSearch(data, pipeline, parameters, report, cache=None):
+    """
+    Do a gird search for the `parameters` of a `pipeline`.
+
+    The features are extracted only once per fold and combination of
+    feature parameters, in parallel, and reused for all classifier
+    parameters; with a `cache` directory, the extracted matrices are also
+    kept on disk and reused by later searches on the same data.
+    """
+    steps = Pipeline(pipeline.steps[:-1])
+    name, classifier = pipeline.steps[-1]
+    prefix = name + '__'
+    feature_grid = list(ParameterGrid({k: v for k, v in parameters.items()
+                                       if not k.startswith(prefix)}))
+    classifier_grid = list(ParameterGrid({k[len(prefix):]: v for k, v in parameters.items()
+                                          if k.startswith(prefix)}))
+    cross_val = list(StratifiedKFold(data.labels, n_folds=report.folds))
+    weights = np.array([len(test) for _, test in cross_val], dtype=float)
+    extract = extractFold
+    digest = None
+
+    if cache is not None:
+        # key the cache by a digest instead of hashing all instances per call
+        memory = joblib.Memory(cachedir=cache, verbose=0)
+        extract = memory.cache(extractFold, ignore=['instances', 'labels'])
+        digest = Digest(data.instances, data.labels)
+
+    print('Fitting {} folds for each of {} candidates, totalling {} fits'.format(
+        len(cross_val), len(feature_grid) * len(classifier_grid),
+        len(cross_val) * len(feature_grid) * len(classifier_grid)
+    ))
+
+    folds = joblib.Parallel(n_jobs=4)(
+        delayed(extract)(steps, features, data.instances, data.labels, train, test, digest)
+        for features in feature_grid for train, test in cross_val
+    )
+
+    def tasks():
+        # fit all classifiers to the extracted features of each fold
+        for step in range(len(feature_grid)):
+            matrices = folds[step * len(cross_val):(step + 1) * len(cross_val)]
+
+            for params in classifier_grid:
+                for (train, test), (X_train, X_test) in zip(cross_val, matrices):
+                    yield delayed(scoreFold)(classifier, params,
+                                             X_train, data.labels[train],
+                                             X_test, data.labels[test])
+
+    scores = joblib.Parallel(n_jobs=4, pre_dispatch='2*n_jobs')(tasks())
+    scores = np.array(scores).reshape(-1, len(cross_val))
+    # test set size weighted mean scores, as the GridSearchCV default
+    means = (scores * weights).sum(axis=1) / weights.sum()
+    best = int(np.argmax(means))
+    best_score = means[best]
+    best_params = dict(feature_grid[best // len(classifier_grid)])
+    best_params.update((prefix + k, v) for k, v in
+                       classifier_grid[best % len(classifier_grid)].items())
+
+    print("best score:", best_score)
+    for name, value in best_params.items():
         print('{}:\t{}'.format(name, repr(value)))
 
 
@@ -392,55 +1034,141 @@ def Predict(data, pipeline, sep='\t'):
     In addition, a confidence value for each label is printed.
     The lines, the label, and the confidenve value are separated by `sep`.
     """
-    labels = pipeline.predict(data.instances)
+    ids = data.raw if data.ids is None else data.ids
+    print(predictChunk(pipeline, ids, data.instances, sep), end='')
+
+
+def PredictStream(paths, model, output=sys.stdout, chunk_size=1000, n_jobs=1,
+                  sep='\t', **options):
+    """
+    Predict and print the labels of the instances in the files at `paths`
+    in chunks of `chunk_size`, as :func:`.Predict` would print them.
+
+    Instances are read with :func:`.ReadInstances` (see there and
+    :class:`.Data` for the `options`) and each chunk is written to `output`
+    as soon as it is predicted, so memory use does not depend on the size
+    of the input. With more than one job, the chunks are predicted in a
+    process pool where each worker loads the model once; `n_jobs` may be
+    ``None`` to use all CPUs.
+
+    :param paths: the input files, predicted in the given order
+    :param model: the path of a ``joblib.dump``-ed pipeline
+    """
+    instances = chain.from_iterable(ReadInstances(path, **options) for path in paths)
+    chunks = ((chunk, sep) for chunk in Chunks(instances, chunk_size))
 
-    # find an appropriate confidence score method given the predictor
+    if n_jobs == 1:
+        initPredictor(model)
+
+        for args in chunks:
+            output.write(predictInstances(*args))
+    else:
+        with Pool(n_jobs, initPredictor, (model,)) as pool:
+            for text in Imap(pool, n_jobs, predictInstances, chunks):
+                output.write(text)
+
+
+def scoreMethod(pipeline):
+    """Find an appropriate confidence score method given the predictor."""
     if hasattr(pipeline, "decision_function"):
-        scorer = pipeline.decision_function
+        return pipeline.decision_function
     elif hasattr(pipeline, "predict_log_proba"):
-        scorer = pipeline.predict_log_proba
+        return pipeline.predict_log_proba
     elif hasattr(pipeline, "predict_proba"):
-        scorer = pipeline.predict_proba
+        return pipeline.predict_proba
     else:
         # no known method; default to a "100%" confidence
-        scorer = lambda X: [1.0] * len(X)
+        return lambda X: [1.0] * len(X)
 
-    scores = scorer(data.instances)
 
-    if data.ids is None:
-        get = lambda d, idx: d.raw[idx]
-    else:
-        if isinstance(data.ids[0], int):
-            get = lambda d, idx: d.ids[idx]
-        else:
-            get = lambda d, idx: sep.join(d.ids[idx])
+def predictChunk(pipeline, ids, instances, sep='\t'):
+    """
+    Return the `sep`-separated ID, confidence value, and label lines
+    of the `instances` as predicted by the `pipeline`.
+    """
+    labels = pipeline.predict(instances)
+    scores = scoreMethod(pipeline)(instances)
+    lines = []
 
-    for i, (l, s) in enumerate(zip(labels, scores)):
+    for i, l, s in zip(ids, labels, scores):
         # for multi-label problems, get the score of the final label
         s = s[l] if isinstance(s, np.ndarray) else s
-        print(get(data, i), s, l, sep=sep)
+        i = i if isinstance(i, (int, str)) else sep.join(i)
+        lines.append('{}{sep}{}{sep}{}\n'.format(i, s, l, sep=sep))
+
+    return ''.join(lines)
+
+
+# The pipeline used by predictInstances (in each worker process).
+_predictor = None
+
+
+def initPredictor(model):
+    global _predictor
+    _predictor = joblib.load(model)
+
 
+def predictInstances(chunk, sep):
+    ids, instances = zip(*chunk)
+    return predictChunk(_predictor, ids, instances, sep)
 
-def Classify(data, classifier, report):
+
+def fitFold(classifier, features, labels, train, test, keep=True):
+    """
+    Fit the `classifier` to the `train` rows of the `features` and predict
+    the `test` rows, returning the classifier (if `keep`) and predictions.
+
+    The `features` may also be the path of a ``joblib.dump``-ed matrix that
+    is then memory-mapped, so parallel workers share the same copy.
+    """
+    if isinstance(features, str):
+        features = joblib.load(features, mmap_mode='r')
+
+    classifier.fit(features[train], labels[train])
+    return classifier if keep else None, classifier.predict(features[test])
+
+
+def Classify(data, classifier, report, n_jobs=1):
     """
     Classify `data` using some sklearn `classifier`,
     producing output as given by `report`.
+
+    With `n_jobs` other than 1, the folds are fitted in parallel (-1: one job
+    per CPU) and the features are shared via a memory-mapped file; the
+    `classifier` is then updated with the state fitted to the last fold.
     """
     results = {}
     scores = {n: np.zeros(report.folds) for n, f in METRICS}
     results[classifier.__class__.__name__] = scores
-    cross_val = StratifiedKFold(data.labels, n_folds=report.folds, shuffle=True)
+    cross_val = list(StratifiedKFold(data.labels, n_folds=report.folds, shuffle=True))
+    last = len(cross_val) - 1
     test = None
     predictions = None
     targets = None
 
+    if n_jobs == 1:
+        folds = [fitFold(classifier, data.features, data.labels, train, test)
+                 for train, test in cross_val]
+    else:
+        folder = mkdtemp()
+
+        try:
+            path = os.path.join(folder, 'features.pkl')
+            joblib.dump(data.features, path)
+            folds = joblib.Parallel(n_jobs=n_jobs)(
+                delayed(fitFold)(classifier, path, data.labels, train, test, step == last)
+                for step, (train, test) in enumerate(cross_val)
+            )
+        finally:
+            rmtree(folder, ignore_errors=True)
+
+        classifier.__dict__.update(folds[last][0].__dict__)
+
     if report.classification:
         print()
 
-    for step, (train, test) in enumerate(cross_val):
-        classifier.fit(data.features[train], data.labels[train])
+    for step, ((train, test), (_, predictions)) in enumerate(zip(cross_val, folds)):
         targets = data.labels[test]
-        predictions = classifier.predict(data.features[test])
 
         for measure, scoring_function in METRICS:
             if data.classes > 2 and measure == 'MCC score':
@@ -16,8 +16,8 @@ from html.parser import HTMLParser, HTMLParseError
 from logging import getLogger
 from mimetypes import guess_type
 from socket import gethostname
-from unicodedata import normalize
 
+from fnl.text.normalize import NFC
 from fnl.text.text import Text
 from fnl.text.symbols import GREEK_LOWER, GREEK_UPPER
 
@@ -71,7 +71,7 @@ def Extract(filename: str, encoding: str=None, mime_type: str=None) -> Text:
     elif mime_type == 'text/plain':
         encoding = encoding or 'utf-8'
         plain_text = open(filename, 'rb', encoding=encoding).read()
-        text = Text(normalize('NFC', plain_text))
+        text = Text(NFC(plain_text))
     else:
         msg = 'no extraction rules for MIME type {}'.format(mime_type)
         raise RuntimeError(msg)
@@ -319,7 +319,7 @@ class HtmlExtractor(HTMLParser):
                 string = attrs['title'].strip()
                 del attrs['title']
 
-            self._string.append(normalize('NFC', string))
+            self._string.append(NFC(string))
         else:
             self._string.append(HtmlExtractor.OBJECT_REPLACEMENT)
 
@@ -470,7 +470,7 @@ class HtmlExtractor(HTMLParser):
                 data = data.lstrip()
 
             if data:
-                self._string.append(normalize('NFC', data))
+                self._string.append(NFC(data))
 
     def handle_pi(self, data: str):
         pass
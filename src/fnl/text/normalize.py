@@ -0,0 +1,87 @@
+"""
+.. py:module:: fnl.text.normalize
+   :synopsis: Fast Greek letter expansion, ASCII projection, and NFC normalization.
+
+The Greek expansion and transliteration to ASCII are compiled into
+:meth:`str.translate` tables and skip pure ASCII strings altogether; the
+per-token ASCII projection is memoized and also provides the mapping of
+character offsets::
+
+    >>> ExpandGreek('NF-κB')
+    'NF-kappaB'
+    >>> AsciiProjection('Müller')
+    ('Muller', (0, 1, 2, 3, 4, 5, 6))
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import re
+
+from functools import lru_cache
+from unicodedata import normalize
+from unidecode import unidecode
+
+from fnl.text.symbols import LATIN
+
+NON_ASCII = re.compile('[^\x00-\x7F]')
+"""Finds the first non-ASCII character (``str.isascii`` needs Python 3.7)."""
+
+GREEK_TABLE = str.maketrans(LATIN)
+"""A translation table expanding Greek letters to their Latin names."""
+
+
+class AsciiTable(dict):
+    """
+    A translation table from Unicode to ASCII characters that is filled with
+    the ``unidecode`` of each character on its first lookup.
+    """
+
+    def __missing__(self, key):
+        self[key] = value = unidecode(chr(key))
+        return value
+
+
+ASCII_TABLE = AsciiTable()
+"""The (lazily filled) translation table used by :func:`.Ascii`."""
+
+
+def ExpandGreek(text: str) -> str:
+    """Replace all Greek letters in the *text* with their Latin names."""
+    return text if not NON_ASCII.search(text) else text.translate(GREEK_TABLE)
+
+
+def Ascii(text: str) -> str:
+    """Return the ``unidecode`` of the *text*."""
+    return text if not NON_ASCII.search(text) else text.translate(ASCII_TABLE)
+
+
+@lru_cache(maxsize=1 << 16)
+def AsciiProjection(token: str) -> (str, tuple):
+    """
+    Return the ``unidecode`` of a *token* together with the offsets of each
+    character's transliteration in it (plus the length of the ASCII string).
+
+    The result is memoized, so repeated tokens are only transliterated once.
+    """
+    if not NON_ASCII.search(token):
+        return token, tuple(range(len(token) + 1))
+
+    offsets = [0]
+    ascii = []
+
+    for char in token:
+        ascii.append(ASCII_TABLE[ord(char)])
+        offsets.append(offsets[-1] + len(ascii[-1]))
+
+    return ''.join(ascii), tuple(offsets)
+
+
+def NFC(text: str) -> str:
+    """
+    Return the NFC normalization of the *text*.
+
+    (:func:`unicodedata.normalize` already has a quick check for normalized
+    text, so there is no extra fast path for ASCII text here.)
+    """
+    return normalize('NFC', text)
@@ -0,0 +1,35 @@
+from unicodedata import normalize
+from unidecode import unidecode
+from unittest import main, TestCase
+
+from fnl.text.normalize import Ascii, AsciiProjection, ExpandGreek, NFC
+from fnl.text.symbols import LATIN
+
+
+class NormalizeTests(TestCase):
+
+    TEXTS = ['plain ASCII', 'NF-κB and TNF-α', 'Müller’s “cells” – 一 \U0001F600', 'Αβγ']
+
+    def testExpandGreek(self):
+        for text in self.TEXTS:
+            self.assertEqual(''.join(LATIN[c] if c in LATIN else c for c in text),
+                             ExpandGreek(text))
+
+    def testAscii(self):
+        for text in self.TEXTS:
+            self.assertEqual(unidecode(text), Ascii(text))
+
+    def testAsciiProjection(self):
+        ascii, offsets = AsciiProjection('Mü一x')
+        self.assertEqual(unidecode('Mü一x'), ascii)
+        self.assertEqual((0, 1, 2, 5, 6), offsets)
+        self.assertEqual('Yi ', ascii[offsets[2]:offsets[3]])
+
+    def testAsciiProjectionOfAscii(self):
+        self.assertEqual(('ab', (0, 1, 2)), AsciiProjection('ab'))
+
+    def testNFC(self):
+        for text in self.TEXTS + ['Müller']:
+            self.assertEqual(normalize('NFC', text), NFC(text))
+
+if __name__ == '__main__': main()
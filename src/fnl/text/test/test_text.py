@@ -1,3 +1,4 @@
+from array import array
 from collections import OrderedDict
 from hashlib import md5
 from binascii import b2a_base64
@@ -189,6 +190,17 @@ class TextTests(TestCase):
             (('ns2', 'id1', (0, 4)), { 'k': 'l'}),
         ], list(text.get()))
 
+    def testAddSpans(self):
+        text = Text('abcd')
+        names = ('id1', 'id2')
+        text.addSpans('ns', names, array('B', [0, 1]), array('l', [0, 2]), array('l', [2, 4]))
+        text.addSpans('ns', names, [0], [1], [3])
+        self.assertListEqual([
+            (('ns', 'id1', (0, 2)), None),
+            (('ns', 'id1', (1, 3)), None),
+            (('ns', 'id2', (2, 4)), None),
+        ], list(text.get()))
+
     def testGet(self):
         tag1 = ('ns1', 'key1', (0, 3))
         tag2 = ('ns1', 'key2', (1, 2))
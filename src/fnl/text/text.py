@@ -407,6 +407,30 @@ class Text:
 
             self._add(ns, sorted(tag_attrs, key=lambda ta: Text.Key(ta[0])))
 
+    def addSpans(self, namespace:str, names:tuple, ids:iter, starts:iter,
+                 ends:iter):
+        """
+        Add tags without attributes for one *namespace* at once from parallel
+        sequences (e.g., arrays, see :mod:`array`) of tag IDs and start and end
+        offsets.
+
+        As with :meth:`.add`, tags for a new namespace are assumed to be in
+        order already.
+
+        :param namespace: The namespace of all tags.
+        :param names: The tag names, indexed by the tag IDs.
+        :param ids: The tag ID of each tag.
+        :param starts: The start offset of each tag.
+        :param ends: The end offset of each tag.
+        """
+        tags = [(namespace, names[i], (s, e)) for i, s, e in zip(ids, starts, ends)]
+
+        if namespace in self._tags:
+            self._add(namespace, [(t, None) for t in tags])
+        else:
+            self._tags[namespace] = tags
+            self.attributes[namespace] = dict()
+
     def _add(self, namespace:str, tags:iter):
         # Add new or update existing tags and attributes in *namespace* with
         # additional *tags* and their attributes.
@@ -0,0 +1,50 @@
+"""
+.. py:module:: fnl.utils.pool
+   :synopsis: Streaming chunks of input through a process pool.
+
+Pool.imap consumes its whole input before the first result is returned,
+so these helpers only submit a few chunks per process ahead instead::
+
+    with Pool(processes) as pool:
+        tasks = ((lines,) for lines in Chunks(stream, 1000))
+
+        for result in Imap(pool, processes, fun, tasks):
+            ...
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+from collections import deque
+from itertools import islice
+from multiprocessing import cpu_count
+
+
+def Chunks(stream, size:int):
+    """Iterate over lists of `size` items from the `stream`."""
+    stream = iter(stream)
+    return iter(lambda: list(islice(stream, size)), [])
+
+
+def Imap(pool, processes, fun, tasks):
+    """
+    Like ``Pool.imap`` for tuples of arguments, but only submitting a few
+    `tasks` per process ahead, so they are consumed as the results are.
+
+    :param pool: a :class:`multiprocessing.Pool`
+    :param processes: the number of processes in the pool (or ``None``)
+    :param fun: the function to apply to each task's arguments
+    :param tasks: an iterable of argument tuples
+    :return: an iterator over the results, in the order of the `tasks`
+    """
+    pending = deque()
+    window = 4 * (processes or cpu_count())
+
+    for args in tasks:
+        pending.append(pool.apply_async(fun, args))
+
+        if len(pending) >= window:
+            yield pending.popleft().get()
+
+    while pending:
+        yield pending.popleft().get()
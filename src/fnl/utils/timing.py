@@ -0,0 +1,194 @@
+"""
+.. py:module:: fnl.utils.timing
+   :synopsis: Low-overhead timers and counters for the stages of a pipeline.
+
+A :class:`.Profile` collects, per named stage, the number of calls and
+processed items (e.g., sentences and tokens), and the total and max. time
+spent with a histogram of the :class:`.Latencies`::
+
+    profile = Profile(progress=10.0)
+    start = profile.clock()
+    ...
+    profile.record('pos', start, items=len(tokens))
+    json.dump(profile.asDict(), stream)
+
+If a progress interval is set, recording the stage named by
+:attr:`.Profile.progress_stage` periodically writes a progress line with
+the overall rate to STDERR.
+
+.. moduleauthor:: Florian Leitner <florian.leitner@gmail.com>
+.. License: GNU Affero GPL v3 (http://www.gnu.org/licenses/agpl.html)
+"""
+
+import sys
+from bisect import bisect_left
+from time import perf_counter
+
+BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+"""
+Upper bounds (in seconds) of the latency histogram buckets; a final bucket
+counts all calls slower than the last bound.
+"""
+
+
+class Counters:
+    """
+    Base class for a set of integer counters, named by :attr:`.COUNTERS`,
+    that can be reported as a JSON-serializable `dict`.
+    """
+
+    COUNTERS = ()
+    """The names of the counters, in reporting order."""
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, ' '.join(
+            '{}={}'.format(name, getattr(self, name)) for name in self.COUNTERS
+        ))
+
+    def asDict(self) -> dict:
+        """
+        Return a `dict` of all counters that can be serialized as JSON.
+        """
+        return dict((name, getattr(self, name)) for name in self.COUNTERS)
+
+
+class Latencies:
+    """
+    The total, max., and a histogram of a number of latencies (in seconds).
+    """
+
+    __slots__ = ('buckets', 'count', 'total', 'max', 'histogram')
+
+    def __init__(self, buckets:tuple=BUCKETS):
+        """
+        :param buckets: The (sorted) upper bounds of the histogram buckets;
+                        a final bucket counts all latencies above the last.
+        """
+        self.buckets = buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(buckets) + 1)
+
+    def __repr__(self):
+        return '<{} count={} total={:.3f}>'.format(
+            Latencies.__name__, self.count, self.total
+        )
+
+    def add(self, seconds:float):
+        """Record one latency of *seconds*."""
+        self.count += 1
+        self.total += seconds
+        self.histogram[bisect_left(self.buckets, seconds)] += 1
+
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        """The mean latency."""
+        return self.total / self.count if self.count else 0.0
+
+    def asDict(self) -> dict:
+        bounds = ['<={}'.format(b) for b in self.buckets]
+        bounds.append('>{}'.format(self.buckets[-1]))
+        return {
+            'total': self.total,
+            'mean': self.mean,
+            'max': self.max,
+            'histogram': dict(zip(bounds, self.histogram)),
+        }
+
+
+class StageStats(Counters):
+    """
+    Counters for the calls, items, and latencies of one stage.
+    """
+
+    COUNTERS = ('calls', 'items')
+
+    def __init__(self):
+        super(StageStats, self).__init__()
+        self.latency = Latencies(BUCKETS)
+
+    def add(self, seconds:float, items:int=1):
+        """Record one call that took *seconds* and processed *items*."""
+        self.calls += 1
+        self.items += items
+        self.latency.add(seconds)
+
+    def asDict(self) -> dict:
+        counters = super(StageStats, self).asDict()
+        counters['latency'] = self.latency.asDict()
+        return counters
+
+
+class Profile:
+    """
+    Timers and counters for any number of named stages.
+    """
+
+    clock = staticmethod(perf_counter)
+    """The clock used for all measurements."""
+
+    def __init__(self, progress:float=None, progress_stage:str='sentences', stream=sys.stderr):
+        """
+        :param progress: The interval (in seconds) between progress lines;
+                         ``None`` to never write any.
+        :param progress_stage: The stage whose calls are reported as progress.
+        :param stream: The stream to write the progress lines to.
+        """
+        self.progress = progress
+        self.progress_stage = progress_stage
+        self.stages = {}
+        self.stream = stream
+        self._started = perf_counter()
+        self._reported = self._started
+
+    def __getitem__(self, stage:str) -> StageStats:
+        try:
+            return self.stages[stage]
+        except KeyError:
+            self.stages[stage] = stats = StageStats()
+            return stats
+
+    def record(self, stage:str, start:float, items:int=1) -> float:
+        """
+        Record a call of a *stage* that started at the *start* time (as
+        returned by :meth:`.clock`) and processed *items*.
+
+        :return: the current time, so it can be used to start the next stage
+        """
+        now = perf_counter()
+        self[stage].add(now - start, items)
+
+        if self.progress is not None and stage == self.progress_stage and \
+                now - self._reported >= self.progress:
+            self.report(now)
+
+        return now
+
+    def report(self, now:float=None):
+        """Write a progress line to the stream."""
+        now = perf_counter() if now is None else now
+        stats = self[self.progress_stage]
+        elapsed = now - self._started
+        self._reported = now
+        print('{} {} in {:.1f} s ({:.1f}/s; {} items)'.format(
+            stats.calls, self.progress_stage, elapsed,
+            stats.calls / elapsed if elapsed else 0.0, stats.items
+        ), file=self.stream)
+        self.stream.flush()
+
+    def asDict(self) -> dict:
+        """
+        Return a `dict` of all stages that can be serialized as JSON.
+        """
+        return {
+            'elapsed': perf_counter() - self._started,
+            'stages': {name: stats.asDict() for name, stats in self.stages.items()},
+        }